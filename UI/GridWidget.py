@@ -1,10 +1,37 @@
+import math
+from time import perf_counter
+
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import Qt, QRectF, QEvent, QPoint
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtCore import Qt, QRect, QRectF, QEvent, QPoint, QPointF
+from PyQt5.QtGui import QPainter, QColor, QImage, QPen, QPolygonF
 from PyQt5.QtWidgets import QWidget
 from PyQt5 import QtCore
 
 from node import Node
+from search_log import SearchReplay
+from terrain import OPEN, BARRIER, FOREST, DESERT
+
+# color table indices of GridUI.image, terrain codes are their own indices
+EXPANDED_INDEX = 4
+FRONTIER_INDEX = 5
+PATH_INDEX = 6
+START_INDEX = 7
+END_INDEX = 8
+COLOR_TABLE = {
+    OPEN: QColor(Qt.white),
+    BARRIER: QColor(Qt.black),
+    FOREST: QColor(Qt.darkGreen),
+    DESERT: QColor(255, 140, 0),
+    EXPANDED_INDEX: QColor(173, 216, 230),
+    FRONTIER_INDEX: QColor(Qt.blue),
+    PATH_INDEX: QColor(Qt.yellow),
+    START_INDEX: QColor(Qt.green),
+    END_INDEX: QColor(Qt.red),
+}
+GRID_LINE_MIN_SIZE = 4  # squares smaller than this many pixels are drawn without grid lines
+MIN_ZOOM = 1 / 64  # pixels per cell
+MAX_ZOOM = 64
+ZOOM_STEP = 1.25  # zoom factor of one mouse wheel notch
 
 
 class GridUI(QWidget):
@@ -16,71 +43,90 @@ class GridUI(QWidget):
         self.rows = rows
         self.graph = graph
         self.visualize_algorithm = True
+        self.replay: SearchReplay = None  # replay of the last search log, None shows graph.path_nodes
+        self.replay_speed = 500  # events per second
+        self.replay_paused = False
+        self._replay_clock = 0.0
+        self._replay_carry = 0.0  # fraction of an event left over from the previous advance
+        self.search_stats = None  # SearchStats of the last search, shown in an overlay
+        self.show_stats = True
+
+        # view transform: a cell is zoom pixels wide and the widget's top left corner shows
+        # the point (offset_x, offset_y) in cell coordinates
+        self.zoom = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self._fitted = True  # follow the window size until the user zooms or pans
+        self._pan_position: QPoint = None
+
+        # one pixel per cell, scaled up when painted; only cells changed since the last frame are redrawn
+        self.image = QImage(columns, rows, QImage.Format_Indexed8)
+        self.image.setColorTable([COLOR_TABLE[index].rgb() for index in range(len(COLOR_TABLE))])
+        self._image_generation = 0  # incremented whenever image changes
+        self._level_of_detail_cache = (None, None)
+        self._dirty_cells: set = set()
+        self._full_redraw = True
+        self._drawn_endpoints = (graph.startpoint_node, graph.endpoint_node)
+        graph.terrain_listeners.append(self._terrain_changed)
 
     def resizeEvent(self, event) -> None:
-        # compute the square size based on the aspect ratio, assuming that the
-        # column and row numbers are fixed
-        reference = self.width() * self.rows / self.columns
-        if reference > self.height():
-            # the window is larger than the aspect ratio
-            # use the height as a reference (minus 1 pixel)
-            self.square_size = (self.height() - 1) / self.rows
-        else:
-            # the opposite
-            self.square_size = (self.width() - 1) / self.columns
-        self.grid_width = self.square_size * self.columns
-        self.grid_height = self.square_size * self.rows
+        if self._fitted:
+            self.fit_to_window()
 
     def paintEvent(self, event) -> None:
+        self._flush_image()
         qp = QPainter(self)
-        qp.translate(.5, .5)  # translate the painter by half a pixel to ensure correct line painting
-        qp.setRenderHints(qp.Antialiasing)
+        zoom = self.zoom
 
-        # center the grid
-        left = (self.width() - self.grid_width) / 2
-        top = (self.height() - self.grid_height) / 2
-        x, y = left, top
-        # we need to add 1 to draw the topmost right/bottom lines too
-        for row in range(self.rows + 1):
-            qp.drawLine(left, y, left + self.grid_width, y)
-            y += self.square_size
-        for column in range(self.columns + 1):
-            qp.drawLine(x, top, x, top + self.grid_height)
-            x += self.square_size
-
-        self.paint_rectangles(qp, Qt.black, self.graph.barrier_nodes)
-        self.paint_rectangles(qp, Qt.darkGreen, self.graph.forest_nodes)
-        self.paint_rectangles(qp, QColor(255, 140, 0), self.graph.desert_nodes)
-        self.paint_rectangles(qp, Qt.yellow, self.graph.path_nodes)
-        self.paint_rectangles(qp, Qt.blue, self.graph.frontier_nodes)
-        self.paint_rectangles(qp, Qt.green, (self.graph.startpoint_node,))
-        self.paint_rectangles(qp, Qt.red, (self.graph.endpoint_node,))
+        # cull everything outside of the widget, only the visible cells are drawn
+        first_column = max(0, math.floor(self.offset_x))
+        first_row = max(0, math.floor(self.offset_y))
+        last_column = min(self.columns, math.ceil(self.offset_x + self.width() / zoom))
+        last_row = min(self.rows, math.ceil(self.offset_y + self.height() / zoom))
+        if first_column < last_column and first_row < last_row:
+            source = QRect(first_column, first_row, last_column - first_column, last_row - first_row)
+            left, top = self._to_widget(first_column, first_row)
+            target = QRectF(left, top, source.width() * zoom, source.height() * zoom)
 
-    def eventFilter(self, QObject, event) -> bool:
-        if event.type() == QEvent.MouseButtonPress or event.type() == QEvent.MouseMove:
-            mouse_position = event.pos()
-            col = int(event.x() // self.square_size)
-            row = int(event.y() // self.square_size)
+            if zoom >= 1:
+                qp.drawImage(target, self.image, QRectF(source))
+            else:
+                # several cells share a pixel, draw an area-averaged copy and keep the path visible on top
+                qp.drawImage(target.topLeft(), self._level_of_detail(source, target.size().toSize()))
+                self._paint_overlay(qp)
 
-            self.add_node(col, row, mouse_position)
-        return False
+            if zoom >= GRID_LINE_MIN_SIZE:
+                self._paint_grid_lines(qp, left, top, target, first_column, first_row, last_column, last_row)
+        if self.show_stats and self.search_stats is not None:
+            self._paint_stats(qp)
 
-    def paint_rectangles(self, qp: QPainter, color: QColor, nodes) -> None:
-        left = (self.width() - self.grid_width) / 2
-        top = (self.height() - self.grid_height) / 2
+    def wheelEvent(self, event) -> None:
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_at(event.pos(), ZOOM_STEP ** steps)
 
-        # create a smaller rectangle
-        object_size = self.square_size * .95
-        margin = 0
-        object_rect = QRectF(margin, margin, object_size, object_size)
+    def eventFilter(self, QObject, event) -> bool:
+        event_type = event.type()
+        if event_type not in (QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.MouseButtonRelease):
+            return False
 
-        qp.setBrush(color)
-        for node in nodes:
-            qp.drawRect(object_rect.translated(
-                left + node.x * self.square_size, top + node.y * self.square_size))
+        mouse_position = event.pos()
+        if event_type == QEvent.MouseButtonRelease:
+            if event.button() in (Qt.RightButton, Qt.MiddleButton):
+                self._pan_position = None
+        elif event.buttons() & (Qt.RightButton | Qt.MiddleButton):
+            # drag with the right or middle button to pan
+            if self._pan_position is not None:
+                delta = mouse_position - self._pan_position
+                self.pan(-delta.x() / self.zoom, -delta.y() / self.zoom)
+            self._pan_position = mouse_position
+        elif event.buttons() & Qt.LeftButton:
+            col, row = self._cell_at(mouse_position)
+            self.add_node(col, row, mouse_position)
+        return False
 
     def add_node(self, col: int, row: int, mouse_position) -> None:
-        if self.rect().contains(mouse_position):
+        if self.rect().contains(mouse_position) and 0 <= col < self.columns and 0 <= row < self.rows:
             node = Node(col, row)
             modifiers = QtWidgets.QApplication.keyboardModifiers()
             if modifiers == QtCore.Qt.ControlModifier:
@@ -91,3 +137,240 @@ class GridUI(QWidget):
                 self.graph.add_forest_node(node)
             else:
                 self.graph.add_barrier_node(node)
+
+    def fit_to_window(self) -> None:
+        """
+        Public function used to zoom and center the view so the whole grid is visible
+        """
+        self.zoom = max(MIN_ZOOM, min((self.width() - 1) / self.columns, (self.height() - 1) / self.rows))
+        self.offset_x = (self.columns - self.width() / self.zoom) / 2
+        self.offset_y = (self.rows - self.height() / self.zoom) / 2
+        self._fitted = True
+        self.update()
+
+    def zoom_at(self, position: QPoint, factor: float) -> None:
+        """
+        Public function used to zoom by factor, keeping the cell under position in place
+        """
+        x, y = self.offset_x + position.x() / self.zoom, self.offset_y + position.y() / self.zoom
+        self.zoom = max(MIN_ZOOM, min(self.zoom * factor, MAX_ZOOM))
+        self.offset_x = x - position.x() / self.zoom
+        self.offset_y = y - position.y() / self.zoom
+        self._fitted = False
+        self.update()
+
+    def pan(self, dx: float, dy: float) -> None:
+        """
+        Public function used to move the view by dx, dy cells
+        """
+        self.offset_x += dx
+        self.offset_y += dy
+        self._fitted = False
+        self.update()
+
+    def has_changes(self) -> bool:
+        """
+        Public function used to determine if the next frame differs from the last painted one
+        """
+        return (self._full_redraw or bool(self._dirty_cells)
+                or self._drawn_endpoints != (self.graph.startpoint_node, self.graph.endpoint_node))
+
+    def start_replay(self, log) -> None:
+        """
+        Public function used to replay a search log from its first event,
+        a log of None shows the graph's path without replay
+        """
+        self.replay = SearchReplay(log) if log is not None else None
+        self.replay_paused = False
+        self._replay_clock = perf_counter()
+        self._replay_carry = 0.0
+        self._full_redraw = True
+        self.update()
+
+    def clear_replay(self) -> None:
+        self.replay = None
+        self._full_redraw = True
+        self.update()
+
+    def advance_replay(self) -> None:
+        """
+        Public function used to move the replay forward by the events due since the last call
+        """
+        now = perf_counter()
+        elapsed, self._replay_clock = now - self._replay_clock, now
+        if self.replay is None or self.replay_paused or self.replay.finished:
+            return
+        due = elapsed * self.replay_speed + self._replay_carry
+        count = int(due)
+        self._replay_carry = due - count
+        self.seek_replay(self.replay.position + count)
+
+    def step_replay(self) -> None:
+        """
+        Public function used to pause the replay and move it forward by a single event
+        """
+        if self.replay is not None:
+            self.replay_paused = True
+            self.seek_replay(self.replay.position + 1)
+
+    def seek_replay(self, position: int) -> None:
+        replay = self.replay
+        if replay is None:
+            return
+        previous = replay.position
+        replay.seek(position)
+        if replay.position < previous or replay.position - previous > self.columns * self.rows // 4:
+            self._full_redraw = True
+        else:
+            self._dirty_cells.update(replay.log.nodes[previous:replay.position])
+
+    def _terrain_changed(self, node_id) -> None:
+        """
+        Private function used as terrain listener, edits are painted on the next frame
+        """
+        if node_id is None:
+            self._full_redraw = True
+        else:
+            self._dirty_cells.add(node_id)
+        self.update()
+
+    def _flush_image(self) -> None:
+        """
+        Private function used to bring the off-screen image up to date, either the dirty cells
+        or, after changes touching much of the grid, every cell
+        """
+        graph = self.graph
+        columns = self.columns
+        endpoints = (graph.startpoint_node, graph.endpoint_node)
+        if endpoints != self._drawn_endpoints:
+            self._dirty_cells.update(graph.get_node_id(node) for node in self._drawn_endpoints + endpoints
+                                     if graph._in_bounds(node))
+            self._drawn_endpoints = endpoints
+
+        replay = self.replay
+        if replay is not None:
+            path = set(replay.path)
+        else:
+            path = set(map(graph.get_node_id, graph.path_nodes))
+
+        if self._full_redraw:
+            self._full_redraw = False
+            self._dirty_cells.clear()
+            # terrain codes are color indices, copy them a row at a time and overlay the rest
+            bits = self.image.bits()
+            bits.setsize(self.image.byteCount())
+            stride = self.image.bytesPerLine()
+            terrain = graph.terrain
+            for row in range(self.rows):
+                bits[row * stride:row * stride + columns] = bytes(terrain[row * columns:(row + 1) * columns])
+            cells = set(path)
+            if replay is not None:
+                cells.update(replay.expanded, replay.frontier)
+            cells.update(graph.get_node_id(node) for node in endpoints if graph._in_bounds(node))
+            self._image_generation += 1
+        else:
+            cells, self._dirty_cells = self._dirty_cells, set()
+
+        start, end = (graph.get_node_id(node) if graph._in_bounds(node) else None for node in endpoints)
+        for node_id in cells:
+            y, x = divmod(node_id, columns)
+            self.image.setPixel(x, y, self._cell_index(node_id, path, start, end))
+        if cells:
+            self._image_generation += 1
+
+    def _cell_index(self, node_id: int, path: set, start: int, end: int) -> int:
+        """
+        Private function used to pick the color index of a cell, in the order the layers are stacked
+        """
+        graph = self.graph
+        replay = self.replay
+        if node_id == end:
+            return END_INDEX
+        if node_id == start:
+            return START_INDEX
+        if replay is not None and node_id in replay.frontier:
+            return FRONTIER_INDEX
+        if node_id in path:
+            return PATH_INDEX
+        code = graph.terrain[node_id]
+        if code == OPEN and replay is not None and node_id in replay.expanded:
+            return EXPANDED_INDEX
+        return code
+
+    def _to_widget(self, x: float, y: float) -> tuple:
+        """
+        Private function used to map cell coordinates to widget pixel coordinates
+        """
+        return (x - self.offset_x) * self.zoom, (y - self.offset_y) * self.zoom
+
+    def _cell_at(self, position: QPoint) -> tuple:
+        """
+        Private function used to map a widget pixel position to the column and row under it
+        """
+        return (math.floor(self.offset_x + position.x() / self.zoom),
+                math.floor(self.offset_y + position.y() / self.zoom))
+
+    def _level_of_detail(self, source: QRect, size) -> QImage:
+        """
+        Private function used to shrink the source cells of image to size pixels,
+        averaging the colors of the cells that fall into each pixel
+        """
+        key = (source.getRect(), (size.width(), size.height()), self._image_generation)
+        cached_key, cached_image = self._level_of_detail_cache
+        if key != cached_key:
+            cached_image = (self.image.copy(source).convertToFormat(QImage.Format_RGB32)
+                            .scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+            self._level_of_detail_cache = (key, cached_image)
+        return cached_image
+
+    def _paint_overlay(self, qp: QPainter) -> None:
+        """
+        Private function used to draw the path and endpoints as points when cells are smaller than a pixel
+        """
+        graph = self.graph
+        path = self.replay.path if self.replay is not None else map(graph.get_node_id, graph.path_nodes)
+        columns = self.columns
+        points = QPolygonF()
+        for node_id in path:
+            y, x = divmod(node_id, columns)
+            points.append(QPointF(*self._to_widget(x + .5, y + .5)))
+        qp.setPen(QPen(COLOR_TABLE[PATH_INDEX], 2))
+        qp.drawPoints(points)
+        for node, index in (graph.startpoint_node, START_INDEX), (graph.endpoint_node, END_INDEX):
+            qp.setPen(QPen(COLOR_TABLE[index], 5))
+            qp.drawPoint(QPointF(*self._to_widget(node.x + .5, node.y + .5)))
+
+    def _paint_grid_lines(self, qp: QPainter, left: float, top: float, target: QRectF,
+                          first_column: int, first_row: int, last_column: int, last_row: int) -> None:
+        zoom = self.zoom
+        qp.save()
+        qp.translate(.5, .5)  # translate the painter by half a pixel to ensure correct line painting
+        qp.setRenderHints(qp.Antialiasing)
+        right = left + target.width()
+        bottom = top + target.height()
+        y = top
+        # we need to add 1 to draw the bottommost/rightmost visible lines too
+        for row in range(first_row, last_row + 1):
+            qp.drawLine(QPointF(left, y), QPointF(right, y))
+            y += zoom
+        x = left
+        for column in range(first_column, last_column + 1):
+            qp.drawLine(QPointF(x, top), QPointF(x, bottom))
+            x += zoom
+        qp.restore()
+
+    def _paint_stats(self, qp: QPainter) -> None:
+        """
+        Private function used to draw the stats of the last search in the top left corner
+        """
+        lines = self.search_stats.summary()
+        metrics = qp.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 16
+        height = line_height * len(lines) + 12
+        qp.setPen(Qt.NoPen)
+        qp.setBrush(QColor(0, 0, 0, 160))
+        qp.drawRect(QRectF(8, 8, width, height))
+        qp.setPen(Qt.white)
+        for index, line in enumerate(lines):
+            qp.drawText(QPointF(16, 14 + metrics.ascent() + index * line_height), line)
@@ -1,52 +1,62 @@
 import sys
 
-from PyQt5.QtCore import QThread, pyqtSignal, QObject, pyqtSlot
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QWidget
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal, QObject, pyqtSlot
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QWidget, QSlider, \
+    QSpinBox, QLabel, QFileDialog, QMessageBox
 
 from graph import WeightedGraph
+from map_io import load_map, save_map
 from node import Node
+from search_budget import SearchBudget, CancellationToken
 from UI.GridWidget import GridUI
 from UI.ParametersDialog import ParametersPopup
 
 
-class UIQObj(QObject):
-    start = pyqtSignal()
-    update = pyqtSignal()
+MAP_SAVE_FILTER = 'Binary maps (*.pfmap);;Text maps (*.txt)'
+MAP_OPEN_FILTER = 'Maps (*.pfmap *.txt *.map);;Binary maps (*.pfmap);;Text maps (*.txt);;Moving AI maps (*.map)'
 
-    def __init__(self):
-        super(UIQObj, self).__init__()
-
-    @pyqtSlot()
-    def run(self):
-        while True:
-            QThread.usleep(50)
-            self.update.emit()
+# repaint timer interval in milliseconds: one frame while the grid changes,
+# doubling up to the idle interval while it does not
+FRAME_INTERVAL = 16
+IDLE_INTERVAL = 250
 
 
 class PathQObj(QObject):
-    start = pyqtSignal(WeightedGraph, str, Node, Node)
+    # the graph, the algorithm option, the endpoints and the SearchBudget of the search
+    start = pyqtSignal(WeightedGraph, str, Node, Node, object)
+    # the search log of the finished search (None when not recorded), its SearchStats, path nodes and SearchBudget
+    finished = pyqtSignal(object, object, object, object)
 
     def __init__(self):
         super(PathQObj, self).__init__()
 
-    @pyqtSlot(WeightedGraph, str, Node, Node)
-    def run(self, graph, option, start, end):
-        if option == 'a':
-            graph.a_star(start, end)
-        elif option == "d":
-            graph.dijkstra(start, end)
-        else:
-            graph.bfs(start, end)
+    @pyqtSlot(WeightedGraph, str, Node, Node, object)
+    def run(self, graph, option, start, end, budget):
+        graph.budget = budget
+        try:
+            if option == 'a':
+                graph.a_star(start, end)
+            elif option == "d":
+                graph.dijkstra(start, end)
+            elif option == "j":
+                graph.jump_point_search(start, end)
+            elif option == "i":
+                graph.d_star_lite(start, end)
+            elif option == "r":
+                graph.anytime_a_star(start, end)
+            else:
+                graph.bfs(start, end)
+        finally:
+            graph.budget = None
+        self.finished.emit(graph.search_log, graph.search_stats, list(graph.path_nodes), budget)
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, columns: int = 40, rows: int = 30):
         super().__init__()
         self.setWindowTitle("Pathfinding Algorithm Visualizer")
         self.layout = QVBoxLayout()
 
-        columns = 40
-        rows = 30
         self.graph = WeightedGraph(columns, rows)
         self.grid_ui = GridUI(self.graph, columns, rows)
         self.grid_ui.setContentsMargins(0, 0, 0, 0)
@@ -54,15 +64,47 @@ class MainWindow(QMainWindow):
 
         self.buttons_layout = QHBoxLayout()
         self.start_button = QPushButton('Start')
+        self.stop_button = QPushButton('Stop')
         self.reset_button = QPushButton('Reset grid')
         self.path_button = QPushButton('Clear path')
         self.change_button = QPushButton('Change parameters')
+        self.fit_button = QPushButton('Fit view')
+        self.open_button = QPushButton('Open map')
+        self.save_button = QPushButton('Save map')
         self.buttons_layout.addWidget(self.start_button)
+        self.buttons_layout.addWidget(self.stop_button)
         self.buttons_layout.addWidget(self.reset_button)
         self.buttons_layout.addWidget(self.path_button)
         self.buttons_layout.addWidget(self.change_button)
+        self.buttons_layout.addWidget(self.fit_button)
+        self.buttons_layout.addWidget(self.open_button)
+        self.buttons_layout.addWidget(self.save_button)
+
+        self.replay_layout = QHBoxLayout()
+        self.pause_button = QPushButton('Pause')
+        self.step_button = QPushButton('Step')
+        self.speed_label = QLabel('Events/s:')
+        self.speed_box = QSpinBox()
+        self.speed_box.setRange(1, 1000000)
+        self.speed_box.setValue(self.grid_ui.replay_speed)
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setEnabled(False)
+        self.export_button = QPushButton('Export log')
+        self.export_button.setEnabled(False)
+        self.stats_button = QPushButton('Stats')
+        self.stats_button.setCheckable(True)
+        self.stats_button.setChecked(True)
+        self.replay_layout.addWidget(self.pause_button)
+        self.replay_layout.addWidget(self.step_button)
+        self.replay_layout.addWidget(self.speed_label)
+        self.replay_layout.addWidget(self.speed_box)
+        self.replay_layout.addWidget(self.replay_slider)
+        self.replay_layout.addWidget(self.export_button)
+        self.replay_layout.addWidget(self.stats_button)
+
         self.layout.addWidget(self.grid_ui)
         self.layout.addLayout(self.buttons_layout)
+        self.layout.addLayout(self.replay_layout)
         self.widget = QWidget()
         self.widget.setLayout(self.layout)
         self.setCentralWidget(self.widget)
@@ -70,24 +112,34 @@ class MainWindow(QMainWindow):
         self.reset_button.clicked.connect(self.clear_grid)
         self.change_button.clicked.connect(self.show_parameter_popup)
         self.start_button.clicked.connect(self.generate_path)
+        self.stop_button.clicked.connect(self.stop_path)
         self.path_button.clicked.connect(self.clear_path)
+        self.fit_button.clicked.connect(self.fit_view)
+        self.open_button.clicked.connect(self.open_map)
+        self.save_button.clicked.connect(self.save_map)
+        self.pause_button.clicked.connect(self.toggle_replay_pause)
+        self.step_button.clicked.connect(self.step_replay)
+        self.speed_box.valueChanged.connect(self.set_replay_speed)
+        self.replay_slider.sliderMoved.connect(self.seek_replay)
+        self.replay_slider.sliderPressed.connect(self.pause_replay)
+        self.export_button.clicked.connect(self.export_search_log)
+        self.stats_button.toggled.connect(self.show_stats)
 
         self.parameters = ParametersPopup()
+        self.parameters.set_graph_values(self.graph)
         self.parameters.buttonBox.accepted.connect(self.update_graph_with_parameters)
 
-        self.ui_thread = QThread()
-        self.ui_thread.start()
-        self.ui_QObj = UIQObj()
-        self.ui_QObj.moveToThread(self.ui_thread)
-        self.ui_QObj.update.connect(self.handle_ui_update)
-        self.ui_QObj.start.connect(self.ui_QObj.run)
-        self.ui_QObj.start.emit()
+        self.repaint_timer = QTimer(self)
+        self.repaint_timer.timeout.connect(self.handle_ui_update)
+        self.repaint_timer.start(FRAME_INTERVAL)
 
+        self.search_token: CancellationToken = None  # token of the last started search
         self.path_thread = QThread()
         self.path_thread.start()
         self.path_QObj = PathQObj()
         self.path_QObj.moveToThread(self.path_thread)
         self.path_QObj.start.connect(self.path_QObj.run)
+        self.path_QObj.finished.connect(self.start_replay)
 
     def closeEvent(self, event) -> None:
         sys.exit()
@@ -98,7 +150,52 @@ class MainWindow(QMainWindow):
 
     def clear_path(self) -> None:
         self.graph.clear_path_nodes()
-        self.graph.clear_frontier_nodes()
+        self.grid_ui.search_stats = None
+        self.grid_ui.clear_replay()
+        self.replay_slider.setEnabled(False)
+        self.export_button.setEnabled(False)
+
+    def fit_view(self) -> None:
+        self.grid_ui.fit_to_window()
+
+    def open_map(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(self, 'Open map', '', MAP_OPEN_FILTER)
+        if not path:
+            return
+        try:
+            graph = load_map(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Open map', str(e))
+            return
+        self.set_graph(graph)
+
+    def save_map(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, 'Save map', 'map.pfmap', MAP_SAVE_FILTER)
+        if not path:
+            return
+        try:
+            save_map(self.graph, path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Save map', str(e))
+
+    def set_graph(self, graph: WeightedGraph) -> None:
+        """
+        Public function used to show another graph, e.g. a loaded map, in a new grid widget
+        """
+        self.stop_path()
+        graph.visualize_algorithm = self.parameters.visualize_checkBox.isChecked()
+        self.graph = graph
+        grid_ui = GridUI(graph, graph.columns, graph.rows)
+        grid_ui.setContentsMargins(0, 0, 0, 0)
+        grid_ui.setStyleSheet('background-color: white;')
+        grid_ui.replay_speed = self.speed_box.value()
+        grid_ui.show_stats = self.stats_button.isChecked()
+        self.layout.replaceWidget(self.grid_ui, grid_ui)
+        self.grid_ui.deleteLater()
+        self.grid_ui = grid_ui
+        self.parameters.set_graph_values(graph)
+        self.replay_slider.setEnabled(False)
+        self.export_button.setEnabled(False)
 
     def show_parameter_popup(self) -> None:
         self.parameters.raise_()
@@ -111,9 +208,9 @@ class MainWindow(QMainWindow):
         end_col = self.parameters.end_col
         self.graph.startpoint_node = Node(start_col, start_row)
         self.graph.endpoint_node = Node(end_col, end_row)
-        self.graph.desert_weight = self.parameters.desert_weight
-        self.graph.forest_weight = self.parameters.forest_weight
+        self.graph.set_weights(self.parameters.forest_weight, self.parameters.desert_weight)
         self.graph.visualize_algorithm = self.parameters.visualize_checkBox.isChecked()
+        self.grid_ui.update()
 
     def generate_path(self) -> None:
         start = self.graph.startpoint_node
@@ -123,17 +220,96 @@ class MainWindow(QMainWindow):
             option = "a"
         elif self.parameters.dijkstra_radio.isChecked():
             option = "d"
+        elif self.parameters.jps_radio.isChecked():
+            option = "j"
+        elif self.parameters.d_star_lite_radio.isChecked():
+            option = "i"
+        elif self.parameters.anytime_a_star_radio.isChecked():
+            option = "r"
+
+        # a new search replaces the running one instead of queueing behind it
+        self.stop_path()
+        self.search_token = CancellationToken()
+        time_limit = self.parameters.budget / 1000 if self.parameters.budget > 0 else None
+        budget = SearchBudget(time_limit=time_limit, token=self.search_token)
+        # the search runs on a snapshot of the terrain, edits made meanwhile do not reach it
+        self.path_QObj.start.emit(self.graph.snapshot(), option, start, end, budget)
 
-        self.path_QObj.start.emit(self.graph, option, start, end)
+    def stop_path(self) -> None:
+        if self.search_token is not None:
+            self.search_token.cancel()
+
+    @pyqtSlot(object, object, object, object)
+    def start_replay(self, log, stats, path_nodes, budget) -> None:
+        # results of a stopped or replaced search may belong to another graph, e.g. before Open map
+        if budget.token is not self.search_token or budget.token.cancelled:
+            return
+        self.graph.clear_path_nodes()
+        self.graph.path_nodes.extend(path_nodes)
+        self.graph.path_cost = stats.path_cost
+        self.grid_ui.search_stats = stats
+        self.grid_ui.start_replay(log)
+        self.repaint_timer.setInterval(FRAME_INTERVAL)
+        self.pause_button.setText('Pause')
+        self.replay_slider.setEnabled(log is not None)
+        self.replay_slider.setRange(0, len(log) if log is not None else 0)
+        self.export_button.setEnabled(log is not None)
+
+    def toggle_replay_pause(self) -> None:
+        if self.grid_ui.replay_paused:
+            self.grid_ui.replay_paused = False
+            self.pause_button.setText('Pause')
+        else:
+            self.pause_replay()
+
+    def pause_replay(self) -> None:
+        self.grid_ui.replay_paused = True
+        self.pause_button.setText('Resume')
+
+    def show_stats(self, shown: bool) -> None:
+        self.grid_ui.show_stats = shown
+        self.grid_ui.update()
+
+    def step_replay(self) -> None:
+        self.grid_ui.step_replay()
+
+    def seek_replay(self, position: int) -> None:
+        self.grid_ui.seek_replay(position)
+
+    def set_replay_speed(self, speed: int) -> None:
+        self.grid_ui.replay_speed = speed
+
+    def export_search_log(self) -> None:
+        replay = self.grid_ui.replay
+        if replay is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, 'Export search log', 'search.pfsl', 'Search logs (*.pfsl)')
+        if path:
+            replay.log.save(path)
 
     @pyqtSlot()
     def handle_ui_update(self):
-        self.grid_ui.update()
+        self.grid_ui.advance_replay()
+        replay = self.grid_ui.replay
+        if replay is not None and not self.replay_slider.isSliderDown():
+            self.replay_slider.blockSignals(True)
+            self.replay_slider.setValue(replay.position)
+            self.replay_slider.blockSignals(False)
+        if self.grid_ui.replay_paused and self.pause_button.text() != 'Resume':
+            self.pause_button.setText('Resume')
+
+        replaying = replay is not None and not replay.finished and not self.grid_ui.replay_paused
+        if self.grid_ui.has_changes():
+            self.grid_ui.update()
+            self.repaint_timer.setInterval(FRAME_INTERVAL)
+        elif replaying:
+            self.repaint_timer.setInterval(FRAME_INTERVAL)
+        else:
+            self.repaint_timer.setInterval(min(self.repaint_timer.interval() * 2, IDLE_INTERVAL))
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    window.setFixedSize(window.size())
     app.exec_()
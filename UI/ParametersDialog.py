@@ -1,3 +1,5 @@
+from math import isfinite
+
 from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QDialog, QButtonGroup
@@ -6,7 +8,7 @@ from PyQt5.QtWidgets import QDialog, QButtonGroup
 class ParametersPopup(QDialog):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.setFixedHeight(200)
+        self.setFixedHeight(260)
         self.setFixedWidth(315)
         self.setFocusPolicy(Qt.StrongFocus)
         self.setAttribute(Qt.WA_QuitOnClose, True)
@@ -18,7 +20,7 @@ class ParametersPopup(QDialog):
         self.a_star_radio.setGeometry(QtCore.QRect(250, 50, 82, 17))
         self.a_star_radio.setObjectName("a_star_radio")
         self.buttonBox = QtWidgets.QDialogButtonBox(self)
-        self.buttonBox.setGeometry(QtCore.QRect(0, 170, 311, 23))
+        self.buttonBox.setGeometry(QtCore.QRect(0, 230, 311, 23))
         self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.Cancel | QtWidgets.QDialogButtonBox.Ok)
         self.buttonBox.setCenterButtons(True)
         self.buttonBox.setObjectName("buttonBox")
@@ -44,6 +46,15 @@ class ParametersPopup(QDialog):
         self.dijkstra_radio = QtWidgets.QRadioButton(self)
         self.dijkstra_radio.setGeometry(QtCore.QRect(250, 80, 82, 16))
         self.dijkstra_radio.setObjectName("dijkstra_radio")
+        self.jps_radio = QtWidgets.QRadioButton(self)
+        self.jps_radio.setGeometry(QtCore.QRect(250, 140, 82, 17))
+        self.jps_radio.setObjectName("jps_radio")
+        self.d_star_lite_radio = QtWidgets.QRadioButton(self)
+        self.d_star_lite_radio.setGeometry(QtCore.QRect(250, 170, 82, 17))
+        self.d_star_lite_radio.setObjectName("d_star_lite_radio")
+        self.anytime_a_star_radio = QtWidgets.QRadioButton(self)
+        self.anytime_a_star_radio.setGeometry(QtCore.QRect(250, 200, 82, 17))
+        self.anytime_a_star_radio.setObjectName("anytime_a_star_radio")
         self.visualize_checkBox = QtWidgets.QCheckBox(self)
         self.visualize_checkBox.setGeometry(QtCore.QRect(150, 10, 121, 17))
         self.visualize_checkBox.setObjectName("visualize_checkBox")
@@ -63,6 +74,14 @@ class ParametersPopup(QDialog):
         self.forest_label = QtWidgets.QLabel(self)
         self.forest_label.setGeometry(QtCore.QRect(10, 90, 81, 16))
         self.forest_label.setObjectName("forest_label")
+        self.budget_label = QtWidgets.QLabel(self)
+        self.budget_label.setGeometry(QtCore.QRect(10, 170, 81, 16))
+        self.budget_label.setObjectName("budget_label")
+        self.budget_textbox = QtWidgets.QPlainTextEdit(self)
+        self.budget_textbox.setGeometry(QtCore.QRect(90, 170, 40, 21))
+        self.budget_textbox.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.budget_textbox.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.budget_textbox.setObjectName("budget_textbox")
 
         QtCore.QMetaObject.connectSlotsByName(self)
 
@@ -73,12 +92,17 @@ class ParametersPopup(QDialog):
         self.algorithm_label.setText("Select an algorithm:")
         self.end_label.setText("End point:")
         self.dijkstra_radio.setText("Dijkstra")
+        self.jps_radio.setText("JPS")
+        self.d_star_lite_radio.setText("D* Lite")
+        self.anytime_a_star_radio.setText("ARA*")
         self.start_textbox.setPlainText("0, 0")
         self.end_textbox.setPlainText("39, 29")
         self.desert_label.setText("Orange Weight:")
         self.forest_label.setText("Green Weight:")
         self.desert_textbox.setPlainText("3")
         self.forest_textbox.setPlainText("2")
+        self.budget_label.setText("Budget (ms):")
+        self.budget_textbox.setPlainText("0")  # 0 for no time limit
         self.visualize_checkBox.setText("visualize algorithm")
         self.visualize_checkBox.setChecked(True)
         self.bfs_radio.setChecked(True)
@@ -93,6 +117,9 @@ class ParametersPopup(QDialog):
         self.group.addButton(self.a_star_radio)
         self.group.addButton(self.bfs_radio)
         self.group.addButton(self.dijkstra_radio)
+        self.group.addButton(self.jps_radio)
+        self.group.addButton(self.d_star_lite_radio)
+        self.group.addButton(self.anytime_a_star_radio)
 
         self.buttonBox.accepted.connect(self.accept)
         self.buttonBox.rejected.connect(self.reject)
@@ -114,6 +141,7 @@ class ParametersPopup(QDialog):
         self.visualize_checkBox.setChecked(self.previous_visualize)
         self.forest_textbox.setPlainText(self.previous_forest_text)
         self.desert_textbox.setPlainText(self.previous_desert_text)
+        self.budget_textbox.setPlainText(self.previous_budget_text)
 
         # set setExclusive to False so radio states can be reset to previous state
         # otherwise radio buttons cannot be set to False individually
@@ -121,19 +149,37 @@ class ParametersPopup(QDialog):
         self.a_star_radio.setChecked(self.previous_a_star_radio_state)
         self.bfs_radio.setChecked(self.previous_bfs_radio_state)
         self.dijkstra_radio.setChecked(self.previous_dijkstra_radio_state)
+        self.jps_radio.setChecked(self.previous_jps_radio_state)
+        self.d_star_lite_radio.setChecked(self.previous_d_star_lite_radio_state)
+        self.anytime_a_star_radio.setChecked(self.previous_anytime_a_star_radio_state)
         self.group.setExclusive(True)
 
         self.close()
 
+    def set_graph_values(self, graph):
+        # show the endpoints and weights of a graph, e.g. a non-default grid size or a loaded map
+        start = graph.startpoint_node
+        end = graph.endpoint_node
+        self.start_textbox.setPlainText(f"{start.x}, {start.y}")
+        self.end_textbox.setPlainText(f"{end.x}, {end.y}")
+        self.forest_textbox.setPlainText(f"{graph.forest_weight:g}")
+        self.desert_textbox.setPlainText(f"{graph.desert_weight:g}")
+        self.set_number_values_from_text()
+        self.set_previous_variables()
+
     def set_previous_variables(self):
         self.previous_start_text = self.start_textbox.toPlainText()
         self.previous_end_text = self.end_textbox.toPlainText()
         self.previous_visualize = self.visualize_checkBox.isChecked()
         self.previous_forest_text = self.forest_textbox.toPlainText()
         self.previous_desert_text = self.desert_textbox.toPlainText()
+        self.previous_budget_text = self.budget_textbox.toPlainText()
         self.previous_a_star_radio_state = self.a_star_radio.isChecked()
         self.previous_bfs_radio_state = self.bfs_radio.isChecked()
         self.previous_dijkstra_radio_state = self.dijkstra_radio.isChecked()
+        self.previous_jps_radio_state = self.jps_radio.isChecked()
+        self.previous_d_star_lite_radio_state = self.d_star_lite_radio.isChecked()
+        self.previous_anytime_a_star_radio_state = self.anytime_a_star_radio.isChecked()
 
     def set_number_values_from_text(self):
         try:
@@ -145,6 +191,10 @@ class ParametersPopup(QDialog):
             self.end_row = int(end_point_values[1].strip())
             self.forest_weight = float(self.forest_textbox.toPlainText())
             self.desert_weight = float(self.desert_textbox.toPlainText())
+            budget = float(self.budget_textbox.toPlainText())
+            if not isfinite(budget) or budget < 0:
+                return False
+            self.budget = budget
             return True
         except (ValueError, IndexError) as e:
             return False
@@ -1,3 +1,4 @@
+import argparse
 import sys
 
 from PyQt5.QtWidgets import QApplication
@@ -5,8 +6,12 @@ from PyQt5.QtWidgets import QApplication
 from UI.MainWindow import MainWindow
 
 
-q_app = QApplication(sys.argv)
-window = MainWindow()
+parser = argparse.ArgumentParser(description="Visualize pathfinding algorithms on a grid.")
+parser.add_argument('--columns', type=int, default=40, help="grid width in cells (default 40)")
+parser.add_argument('--rows', type=int, default=30, help="grid height in cells (default 30)")
+args, qt_args = parser.parse_known_args()
+
+q_app = QApplication(sys.argv[:1] + qt_args)
+window = MainWindow(args.columns, args.rows)
 window.show()
-window.setFixedSize(window.size())
 q_app.exec_()
@@ -0,0 +1,324 @@
+import argparse
+import json
+import sys
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+
+from graph import WeightedGraph
+from landmarks import HEURISTICS, LANDMARKS, MANHATTAN
+from map_io import load_map
+from node import Node
+from priority_queues import FRONTIER_QUEUES, HEAP
+from search_budget import SearchBudget
+from search_stats import PROFILERS
+
+"""
+Headless batch runner: loads a map, reads path queries and writes one JSON result per line.
+
+Each query line is either a JSON object
+    {"start": [x, y], "end": [x, y], "algorithm": "a_star"}
+or whitespace separated values
+    start_x start_y end_x end_y [algorithm]
+The algorithm is optional and defaults to the --algorithm argument.
+
+With --processes the queries are fanned out to a ParallelQueryExecutor. The terrain is copied
+once into a multiprocessing.shared_memory block and every worker builds a WeightedGraph whose
+terrain is a zero-copy memoryview of that block, so no terrain is pickled per query.
+
+--time-budget and --expansion-budget limit every search. Interrupted searches report
+"interrupted": true in their stats and no path, except anytime_a_star, which keeps its best path.
+"""
+
+# query algorithm name -> WeightedGraph method name
+ALGORITHMS = {
+    'bfs': 'bfs',
+    'b': 'bfs',
+    'dijkstra': 'dijkstra',
+    'd': 'dijkstra',
+    'a_star': 'a_star',
+    'a': 'a_star',
+    'anytime_a_star': 'anytime_a_star',
+    'ara': 'anytime_a_star',
+    'jump_point_search': 'jump_point_search',
+    'jps': 'jump_point_search',
+    'j': 'jump_point_search',
+    'bidirectional_dijkstra': 'bidirectional_dijkstra',
+    'bidirectional_a_star': 'bidirectional_a_star',
+    'hierarchical_a_star': 'hierarchical_a_star',
+    'hpa': 'hierarchical_a_star',
+    'd_star_lite': 'd_star_lite',
+    'contraction_hierarchies': 'contraction_hierarchies',
+    'ch': 'contraction_hierarchies',
+}
+
+
+def parse_query(line: str, default_algorithm: str) -> (Node, Node, str):
+    """
+    Public function used to parse a single query line.
+
+    Returns:
+    --------
+    <value> : tuple
+        start node, end node and algorithm name
+    """
+    if line.lstrip().startswith('{'):
+        query = json.loads(line)
+        start = Node(*map(int, query['start']))
+        end = Node(*map(int, query['end']))
+        algorithm = query.get('algorithm', default_algorithm)
+    else:
+        values = line.split()
+        if len(values) not in (4, 5):
+            raise ValueError(f"expected 'start_x start_y end_x end_y [algorithm]', got {line.strip()!r}")
+        start = Node(int(values[0]), int(values[1]))
+        end = Node(int(values[2]), int(values[3]))
+        algorithm = values[4] if len(values) == 5 else default_algorithm
+
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm {algorithm!r}")
+    return start, end, algorithm
+
+
+def run_query(graph: WeightedGraph, start: Node, end: Node, algorithm: str) -> dict:
+    """
+    Public function used to run one query and describe its result.
+
+    Returns:
+    --------
+    <value> : dict
+        JSON serializable result with the full path (start and end included),
+        its cost (None when end is unreachable), the search time in milliseconds
+        and the SearchStats of the search
+    """
+    begin = perf_counter()
+    stats = graph.cached_search(ALGORITHMS[algorithm], start, end)
+    elapsed = perf_counter() - begin
+
+    found = graph.path_cost != float('inf')
+    path = []
+    if found:
+        path = [start.get_coordinates()]
+        path.extend(node.get_coordinates() for node in graph.path_nodes)
+        if end != start:
+            path.append(end.get_coordinates())
+    return {
+        'start': start.get_coordinates(),
+        'end': end.get_coordinates(),
+        'algorithm': ALGORITHMS[algorithm],
+        'found': found,
+        'cost': graph.path_cost if found else None,
+        'path': path,
+        'time_ms': round(elapsed * 1000, 3),
+        'stats': stats.to_dict(),
+    }
+
+
+def run_batch(graph: WeightedGraph, queries, output, default_algorithm: str = 'a_star',
+              processes: int = 1) -> int:
+    """
+    Public function used to run every query line and write the results as JSON lines, in query order.
+    Malformed queries produce an error record instead of stopping the batch.
+    With more than one process the queries run on a ParallelQueryExecutor.
+
+    Returns:
+    --------
+    <value> : int
+        The number of queries that could not be run
+    """
+    graph.visualize_algorithm = False
+    entries = _parse_lines(queries, default_algorithm)
+    executor = None
+    if processes > 1:
+        entries = list(entries)
+        executor = ParallelQueryExecutor(graph, processes)
+        results = executor.run(query for _, query, _ in entries if query is not None)
+
+    errors = 0
+    try:
+        for line_number, query, error in entries:
+            if query is None:
+                errors += 1
+                result = {'line': line_number, 'error': error}
+            elif executor is None:
+                result = {'line': line_number, **run_query(graph, *query)}
+            else:
+                result = {'line': line_number, **next(results)}
+            output.write(json.dumps(result))
+            output.write('\n')
+    finally:
+        if executor is not None:
+            executor.close()
+    return errors
+
+
+class ParallelQueryExecutor:
+    def __init__(self, graph: WeightedGraph, processes: int = None, chunk_size: int = 64):
+        """
+        Initiator
+
+        Publishes the terrain, weights, frontier queue, heuristic, profiler, budget limits and
+        contraction hierarchy of graph to a pool of worker processes. A cancellation token of the
+        budget is not published.
+        Terrain edits made to graph afterwards are not seen by the workers.
+
+        Parameters:
+        -----------
+        graph : WeightedGraph
+            The graph to run the queries on
+        processes : int
+            The number of worker processes, defaults to the number of CPUs
+        chunk_size : int
+            The number of queries sent to a worker at a time
+        """
+        self.chunk_size = chunk_size
+        self._memory = SharedMemory(create=True, size=max(1, len(graph.terrain)))
+        self._memory.buf[:len(graph.terrain)] = graph.terrain
+        weights = (graph.default_weight, graph.forest_weight, graph.desert_weight)
+        budget = graph.budget
+        if budget is not None:
+            budget = SearchBudget(budget.time_limit, budget.expansion_limit)
+        try:
+            self._pool = Pool(processes, _init_worker,
+                              (self._memory.name, graph.columns, graph.rows, weights, graph.frontier_queue,
+                               graph.heuristic, graph.profiler, budget, graph.contraction_hierarchy))
+        except BaseException:
+            self._release_memory()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def run(self, queries):
+        """
+        Public function used to run queries on the worker processes.
+
+        Parameters:
+        -----------
+        queries : Iterable[tuple]
+            (start Node, end Node, algorithm name) tuples, algorithm names as in ALGORITHMS
+        Returns:
+        --------
+        <value> : Iterator[dict]
+            The run_query result of every query, in query order, as soon as it is available
+        """
+        return self._pool.imap(_run_worker_query, queries, self.chunk_size)
+
+    def close(self) -> None:
+        """
+        Public function used to stop the workers and free the shared terrain
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._release_memory()
+
+    def _release_memory(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run pathfinding queries against a map without the UI.")
+    parser.add_argument('map', help="map file: .pfmap binary map, .map Moving AI map or text map")
+    parser.add_argument('queries', nargs='?', default='-', help="query file, '-' reads stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="result file, '-' writes stdout (default)")
+    parser.add_argument('-a', '--algorithm', default='a_star', choices=sorted(ALGORITHMS),
+                        help="algorithm used when a query does not name one")
+    parser.add_argument('--forest-weight', type=float, help="overrides the map's forest weight")
+    parser.add_argument('--desert-weight', type=float, help="overrides the map's desert weight")
+    parser.add_argument('--cache-size', type=int, default=1024, help="number of cached query results")
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="print cache statistics to stderr (single process only)")
+    parser.add_argument('-p', '--processes', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--profiler', choices=PROFILERS,
+                        help="profile every search, the report is part of each result's stats")
+    parser.add_argument('--contraction-hierarchy', metavar='FILE',
+                        help="contraction hierarchy of the map for 'ch' queries, built and saved when FILE is missing")
+    parser.add_argument('--heuristic', default=MANHATTAN, choices=HEURISTICS,
+                        help=f"heuristic of a_star, {LANDMARKS} precomputes landmark tables (default {MANHATTAN})")
+    parser.add_argument('--frontier-queue', default=HEAP, choices=list(FRONTIER_QUEUES),
+                        help=f"frontier of a_star and dijkstra (default {HEAP})")
+    parser.add_argument('--time-budget', type=float, metavar='MS',
+                        help="milliseconds a search may take before it is interrupted")
+    parser.add_argument('--expansion-budget', type=int, metavar='NODES',
+                        help="nodes a search may expand before it is interrupted")
+    args = parser.parse_args(argv)
+
+    graph = load_map(args.map)
+    graph.set_weights(graph.forest_weight if args.forest_weight is None else args.forest_weight,
+                      graph.desert_weight if args.desert_weight is None else args.desert_weight)
+    graph.path_cache.capacity = args.cache_size
+    graph.profiler = args.profiler
+    graph.frontier_queue = args.frontier_queue
+    graph.heuristic = args.heuristic
+    if args.time_budget is not None or args.expansion_budget is not None:
+        graph.budget = SearchBudget(None if args.time_budget is None else args.time_budget / 1000,
+                                    args.expansion_budget)
+    if args.contraction_hierarchy:
+        try:
+            graph.load_contraction_hierarchy(args.contraction_hierarchy)
+        except FileNotFoundError:
+            graph.save_contraction_hierarchy(args.contraction_hierarchy)
+
+    queries = sys.stdin if args.queries == '-' else open(args.queries)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        errors = run_batch(graph, queries, output, args.algorithm, args.processes)
+    finally:
+        if queries is not sys.stdin:
+            queries.close()
+        if output is not sys.stdout:
+            output.close()
+    if args.cache_stats:
+        print(json.dumps(graph.path_cache.get_stats()), file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _parse_lines(lines, default_algorithm: str):
+    """
+    Private function used to parse query lines, skipping blank and comment lines.
+    Yields (line number, query or None, error message or None) tuples.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip() or line.startswith('#'):
+            continue
+        try:
+            yield line_number, parse_query(line, default_algorithm), None
+        except (ValueError, KeyError, TypeError) as e:
+            yield line_number, None, str(e)
+
+
+# per-process state of a ParallelQueryExecutor worker, set up by _init_worker
+_worker_memory = None
+_worker_graph = None
+
+
+def _init_worker(memory_name: str, columns: int, rows: int, weights: tuple, frontier_queue: str,
+                 heuristic: str, profiler: str, budget: SearchBudget, hierarchy) -> None:
+    """
+    Private function used to attach a worker process to the shared terrain
+    """
+    global _worker_memory, _worker_graph
+    _worker_memory = SharedMemory(name=memory_name)
+    _worker_graph = WeightedGraph(columns, rows, _worker_memory.buf[:columns * rows])
+    _worker_graph.visualize_algorithm = False
+    _worker_graph.frontier_queue = frontier_queue
+    _worker_graph.heuristic = heuristic
+    _worker_graph.profiler = profiler
+    _worker_graph.budget = budget
+    _worker_graph.default_weight, _worker_graph.forest_weight, _worker_graph.desert_weight = weights
+    if hierarchy is not None:
+        _worker_graph.set_contraction_hierarchy(hierarchy)
+
+
+def _run_worker_query(query: tuple) -> dict:
+    return run_query(_worker_graph, *query)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,458 @@
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from random import Random
+from time import perf_counter
+
+from csr_graph import CSRGraph
+from graph import WeightedGraph, OPEN, BARRIER, FOREST, DESERT
+from landmarks import HEURISTICS, LANDMARKS, MANHATTAN
+from map_io import load_map, load_moving_ai_scenarios
+from node import Node
+from priority_queues import FRONTIER_QUEUES, HEAP
+
+"""
+Benchmark harness for the search algorithms.
+
+Maps are generated from a seed so every run measures the same terrain. Each algorithm reports
+wall time (best of --repeat runs), nodes expanded, peak frontier size and peak traced memory.
+With --queues, a_star and dijkstra are additionally run with each listed frontier
+implementation, e.g. --queues heap indexed_heap bucket; other algorithms ignore it.
+Likewise --heuristics manhattan landmarks runs a_star with each heuristic, landmark tables are
+computed before the timed runs.
+With --backends grid csr, bfs, dijkstra and a_star also run on the map converted to a
+CSRGraph (conversion not timed), so the general graph backend can be compared with the grid.
+Results can be saved with --save and compared against a saved baseline with --baseline;
+the process exits with status 1 when a regression is found.
+
+With --ch-queries N every map is preprocessed for contraction_hierarchies and N random queries
+are timed with it and with dijkstra; the process exits with status 1 when their costs differ.
+
+With --short-queries N every algorithm answers N random queries between nodes at most
+SHORT_QUERY_RADIUS cells apart on every map, reporting the latency of the first query and the
+mean latency of the others; on large maps this shows costs that grow with the map instead of the search.
+
+With --scenarios the algorithms run the queries of a Moving AI scenario file instead. Every
+scenario must be solved and, since the published lengths are octile (8-connected) optima,
+no 4-connected path may be shorter than its published length.
+"""
+
+MAP_KINDS = ('open', 'random', 'maze', 'weighted')
+MAP_SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+ALGORITHMS = ('bfs', 'dijkstra', 'a_star', 'jump_point_search', 'bidirectional_dijkstra', 'bidirectional_a_star')
+QUEUE_ALGORITHMS = ('dijkstra', 'a_star')  # algorithms that use graph.frontier_queue
+HEURISTIC_ALGORITHMS = ('a_star',)  # algorithms that use graph.heuristic
+GRID = 'grid'
+CSR = 'csr'
+BACKENDS = (GRID, CSR)
+CSR_ALGORITHMS = ('bfs', 'dijkstra', 'a_star')  # algorithms a CSRGraph has
+SHORT_QUERY_RADIUS = 8  # largest x and y distance between the endpoints of a --short-queries query
+
+# byte value -> terrain code tables used to turn random bytes into terrain
+RANDOM_OBSTACLE_TABLE = bytes(BARRIER if value < 64 else OPEN for value in range(256))  # 25% barriers
+WEIGHTED_TERRAIN_TABLE = bytes(BARRIER if value < 26 else FOREST if value < 77 else DESERT if value < 102 else OPEN
+                               for value in range(256))  # 10% barriers, 20% forest, 10% desert
+
+
+def generate_map(kind: str, size: int, seed: int = 0) -> (WeightedGraph, Node, Node):
+    """
+    Public function used to generate a reproducible size x size benchmark map.
+
+    Parameters:
+    -----------
+    kind : str
+        One of MAP_KINDS
+    size : int
+        Width and height of the map
+    seed : int
+        Seed of the random generator
+    Returns:
+    --------
+    <value> : tuple
+        The graph, the start node and the end node of the benchmark query
+    """
+    rng = Random(f"{kind}-{size}-{seed}")
+    graph = WeightedGraph(size, size)
+    graph.visualize_algorithm = False
+    start = Node(0, 0)
+    end = Node(size - 1, size - 1)
+
+    if kind == 'random':
+        graph.terrain[:] = rng.randbytes(size * size).translate(RANDOM_OBSTACLE_TABLE)
+    elif kind == 'weighted':
+        graph.terrain[:] = rng.randbytes(size * size).translate(WEIGHTED_TERRAIN_TABLE)
+    elif kind == 'maze':
+        _carve_maze(graph, rng)
+        end = Node((size - 1) // 2 * 2, (size - 1) // 2 * 2)
+    elif kind != 'open':
+        raise ValueError(f"unknown map kind {kind!r}")
+
+    graph.remove_terrain_nodes(start)
+    graph.remove_terrain_nodes(end)
+    return graph, start, end
+
+
+def run_benchmark(kind: str, size: int, algorithm: str, seed: int = 0, repeat: int = 1,
+                  measure_memory: bool = True, frontier_queue: str = HEAP, backend: str = GRID,
+                  heuristic: str = MANHATTAN) -> dict:
+    """
+    Public function used to run one algorithm on one generated map, frontier_queue selects
+    the frontier of a_star and dijkstra, heuristic the grid heuristic of a_star and backend
+    one of BACKENDS.
+
+    Returns:
+    --------
+    <value> : dict
+        wall time in seconds, nodes expanded, peak frontier size,
+        peak traced memory in bytes (None when not measured) and path cost
+    """
+    graph, start, end = generate_map(kind, size, seed)
+    if backend == CSR:
+        start, end = graph.get_node_id(start), graph.get_node_id(end)
+        graph = CSRGraph.from_grid(graph)
+    else:
+        graph.heuristic = heuristic
+        if heuristic == LANDMARKS:
+            graph.update_landmarks()
+    graph.frontier_queue = frontier_queue
+    search = getattr(graph, algorithm)
+
+    best_time = float('inf')
+    for _ in range(max(1, repeat)):
+        begin = perf_counter()
+        search(start, end)
+        best_time = min(best_time, perf_counter() - begin)
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        search(start, end)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'time': best_time,
+        'nodes_expanded': graph.nodes_expanded,
+        'peak_frontier': graph.peak_frontier,
+        'peak_memory': peak_memory,
+        'path_cost': graph.path_cost if graph.path_cost != float('inf') else None,
+    }
+
+
+def run_scenarios(graph: WeightedGraph, scenarios: list, algorithm: str) -> dict:
+    """
+    Public function used to run one algorithm on every scenario of a Moving AI scenario file.
+
+    Returns:
+    --------
+    <value> : dict
+        total wall time in seconds, number of scenarios, scenarios without a path (missing),
+        scenarios with a cost below the published length (below_bound) and the mean ratio
+        of found cost to published length
+    """
+    search = getattr(graph, algorithm)
+    missing = below_bound = 0
+    ratios = []
+    total_time = 0
+    for scenario in scenarios:
+        begin = perf_counter()
+        search(scenario['start'], scenario['end'])
+        total_time += perf_counter() - begin
+        optimal_length = scenario['optimal_length']
+        if graph.path_cost == float('inf'):
+            missing += 1
+        elif graph.path_cost < optimal_length - 1e-6:
+            below_bound += 1
+        elif optimal_length > 0:
+            ratios.append(graph.path_cost / optimal_length)
+
+    return {
+        'time': total_time,
+        'scenarios': len(scenarios),
+        'missing': missing,
+        'below_bound': below_bound,
+        'mean_ratio': sum(ratios) / len(ratios) if ratios else None,
+    }
+
+
+def run_contraction(kind: str, size: int, seed: int = 0, queries: int = 100) -> dict:
+    """
+    Public function used to preprocess one generated map for contraction_hierarchies and
+    time random queries between passable nodes with it and with dijkstra.
+
+    Returns:
+    --------
+    <value> : dict
+        build time in seconds, shortcuts added, mean query latency in seconds and mean nodes
+        expanded of both algorithms, and the number of queries whose path costs differ
+    """
+    graph, _, _ = generate_map(kind, size, seed)
+    hierarchy = graph.build_contraction_hierarchy()
+    rng = Random(seed)
+    passable = [node_id for node_id in range(size * size) if graph.terrain[node_id] != BARRIER]
+    pairs = [(graph.get_node(rng.choice(passable)), graph.get_node(rng.choice(passable))) for _ in range(queries)]
+
+    result = {'build_time': hierarchy.build_time, 'shortcuts': hierarchy.shortcuts, 'mismatches': 0}
+    costs = []
+    for algorithm in ('contraction_hierarchies', 'dijkstra'):
+        search = getattr(graph, algorithm)
+        total_time = nodes_expanded = 0
+        for index, (start, end) in enumerate(pairs):
+            begin = perf_counter()
+            search(start, end)
+            total_time += perf_counter() - begin
+            nodes_expanded += graph.nodes_expanded
+            if algorithm == 'dijkstra':
+                result['mismatches'] += graph.path_cost != costs[index]
+            else:
+                costs.append(graph.path_cost)
+        result[algorithm] = {'latency': total_time / max(1, queries), 'nodes_expanded': nodes_expanded / max(1, queries)}
+    return result
+
+
+def run_short_queries(kind: str, size: int, algorithm: str, seed: int = 0, queries: int = 100) -> dict:
+    """
+    Public function used to time random queries between passable nodes at most
+    SHORT_QUERY_RADIUS cells apart on one generated map. The component labels are built
+    before the timed queries. The first query is reported on its own since it includes the
+    storage a graph allocates once for its searches.
+
+    Returns:
+    --------
+    <value> : dict
+        latency of the first query and mean latency of the others in seconds, mean nodes expanded
+    """
+    graph, _, _ = generate_map(kind, size, seed)
+    graph.component_index.rebuild()
+    rng = Random(seed)
+    pairs = []
+    while len(pairs) < queries:
+        x, y = rng.randrange(size), rng.randrange(size)
+        end_x = min(size - 1, max(0, x + rng.randint(-SHORT_QUERY_RADIUS, SHORT_QUERY_RADIUS)))
+        end_y = min(size - 1, max(0, y + rng.randint(-SHORT_QUERY_RADIUS, SHORT_QUERY_RADIUS)))
+        if graph.terrain[y * size + x] != BARRIER and graph.terrain[end_y * size + end_x] != BARRIER:
+            pairs.append((Node(x, y), Node(end_x, end_y)))
+
+    search = getattr(graph, algorithm)
+    latencies = []
+    nodes_expanded = 0
+    for start, end in pairs:
+        begin = perf_counter()
+        search(start, end)
+        latencies.append(perf_counter() - begin)
+        nodes_expanded += graph.nodes_expanded
+    return {
+        'first_latency': latencies[0],
+        'latency': sum(latencies[1:]) / max(1, len(latencies) - 1),
+        'nodes_expanded': nodes_expanded / len(pairs),
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Public function used to find regressions against a baseline.
+    Timing and memory may grow by the tolerance fraction; expansions, frontier size
+    and path cost are deterministic and must not change for the worse.
+
+    Returns:
+    --------
+    <value> : list
+        Human readable description of every regression
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        if result['path_cost'] != reference['path_cost']:
+            regressions.append(f"{key}: path cost {reference['path_cost']} -> {result['path_cost']}")
+        for metric in 'nodes_expanded', 'peak_frontier':
+            if result[metric] > reference[metric]:
+                regressions.append(f"{key}: {metric} {reference[metric]} -> {result[metric]}")
+        for metric in 'time', 'peak_memory':
+            if result[metric] is None or reference[metric] is None:
+                continue
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {metric} {reference[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{(result[metric] / reference[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pathfinding algorithms on generated maps.")
+    parser.add_argument('--kinds', nargs='+', default=MAP_KINDS, choices=MAP_KINDS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[size for size in MAP_SIZES if size <= 1024],
+                        help=f"map sizes, supported range {MAP_SIZES[0]} to {MAP_SIZES[-1]} (default up to 1024)")
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument('--queues', nargs='+', default=[HEAP], choices=list(FRONTIER_QUEUES),
+                        help=f"frontier implementations to run {' and '.join(QUEUE_ALGORITHMS)} with (default {HEAP})")
+    parser.add_argument('--heuristics', nargs='+', default=[MANHATTAN], choices=HEURISTICS,
+                        help=f"heuristics to run {' and '.join(HEURISTIC_ALGORITHMS)} with (default {MANHATTAN})")
+    parser.add_argument('--backends', nargs='+', default=[GRID], choices=BACKENDS,
+                        help=f"graph backends to run {', '.join(CSR_ALGORITHMS)} on (default {GRID})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case, the best one is kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip the (slower) tracemalloc run")
+    parser.add_argument('--save', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against results saved with --save")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed fractional growth of time and memory (default 0.25)")
+    parser.add_argument('--ch-queries', type=int, default=0, metavar='N',
+                        help="compare N random contraction_hierarchies queries per map against dijkstra "
+                             "(preprocessing takes minutes above size 256)")
+    parser.add_argument('--short-queries', type=int, default=0, metavar='N',
+                        help=f"time N random queries of at most {SHORT_QUERY_RADIUS} cells in x and y per map "
+                             f"and algorithm, e.g. with --sizes 4096")
+    parser.add_argument('--scenarios', help="run the queries of a Moving AI .scen file instead of generated maps")
+    parser.add_argument('--scenario-map', help="map of the scenarios (default: the map named in the .scen file, "
+                                               "looked up next to it)")
+    args = parser.parse_args(argv)
+
+    if args.scenarios:
+        return _main_scenarios(args)
+    if args.ch_queries:
+        return _main_contraction(args)
+    if args.short_queries:
+        return _main_short_queries(args)
+
+    results = {}
+    print(f"{'case':<52}{'time (s)':>10}{'expanded':>12}{'frontier':>10}{'memory (MB)':>13}{'cost':>10}")
+    for kind in args.kinds:
+        for size in args.sizes:
+            for algorithm in args.algorithms:
+                for backend, frontier_queue, heuristic in _variants(args, algorithm):
+                    key = f"{kind}-{size}/{algorithm}"
+                    options = [option for option, default in ((frontier_queue, HEAP), (heuristic, MANHATTAN))
+                               if option != default]
+                    if options:
+                        key += f"[{','.join(options)}]"
+                    if backend != GRID:
+                        key += f"@{backend}"
+                    result = run_benchmark(kind, size, algorithm, args.seed, args.repeat, not args.no_memory,
+                                           frontier_queue, backend, heuristic)
+                    results[key] = result
+                    memory = '-' if result['peak_memory'] is None else f"{result['peak_memory'] / 1e6:.1f}"
+                    print(f"{key:<52}{result['time']:>10.4f}{result['nodes_expanded']:>12}"
+                          f"{result['peak_frontier']:>10}{memory:>13}{str(result['path_cost']):>10}", flush=True)
+
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump({'seed': args.seed, 'results': results}, results_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('seed') != args.seed:
+            print(f"warning: baseline was recorded with seed {baseline.get('seed')}", file=sys.stderr)
+        regressions = compare_to_baseline(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+def _main_scenarios(args) -> int:
+    """
+    Private function used to run the --scenarios mode, status 1 when a scenario fails
+    """
+    scenarios = load_moving_ai_scenarios(args.scenarios)
+    if not scenarios:
+        print(f"{args.scenarios}: no scenarios", file=sys.stderr)
+        return 1
+    map_path = args.scenario_map
+    if map_path is None:
+        directory = os.path.dirname(args.scenarios)
+        map_path = os.path.join(directory, scenarios[0]['map'])
+        if not os.path.exists(map_path):
+            map_path = os.path.join(directory, os.path.basename(scenarios[0]['map']))
+    graph = load_map(map_path)
+    graph.visualize_algorithm = False
+
+    failed = False
+    print(f"{'algorithm':<40}{'time (s)':>10}{'scenarios':>11}{'missing':>9}{'below':>7}{'ratio':>8}")
+    for algorithm in args.algorithms:
+        result = run_scenarios(graph, scenarios, algorithm)
+        ratio = '-' if result['mean_ratio'] is None else f"{result['mean_ratio']:.3f}"
+        print(f"{algorithm:<40}{result['time']:>10.4f}{result['scenarios']:>11}{result['missing']:>9}"
+              f"{result['below_bound']:>7}{ratio:>8}", flush=True)
+        failed = failed or result['missing'] > 0 or result['below_bound'] > 0
+    return 1 if failed else 0
+
+
+def _variants(args, algorithm: str):
+    """
+    Private function used to list the (backend, frontier queue, heuristic) combinations
+    algorithm is run with. CSR graphs only have their own coordinate heuristic.
+    """
+    for backend in args.backends if algorithm in CSR_ALGORITHMS else [GRID]:
+        for frontier_queue in args.queues if algorithm in QUEUE_ALGORITHMS else [HEAP]:
+            for heuristic in args.heuristics if algorithm in HEURISTIC_ALGORITHMS else [MANHATTAN]:
+                if backend == GRID or heuristic == MANHATTAN:
+                    yield backend, frontier_queue, heuristic
+
+
+def _main_contraction(args) -> int:
+    """
+    Private function used to run the --ch-queries mode, status 1 when a query cost differs from dijkstra
+    """
+    failed = False
+    print(f"{'case':<20}{'build (s)':>11}{'shortcuts':>11}{'ch (ms)':>10}{'dijkstra (ms)':>15}{'speedup':>9}"
+          f"{'ch expanded':>13}{'dijkstra expanded':>19}")
+    for kind in args.kinds:
+        for size in args.sizes:
+            result = run_contraction(kind, size, args.seed, args.ch_queries)
+            hierarchy, dijkstra = result['contraction_hierarchies'], result['dijkstra']
+            speedup = dijkstra['latency'] / hierarchy['latency'] if hierarchy['latency'] else float('inf')
+            print(f"{f'{kind}-{size}':<20}{result['build_time']:>11.2f}{result['shortcuts']:>11}"
+                  f"{hierarchy['latency'] * 1000:>10.3f}{dijkstra['latency'] * 1000:>15.3f}{speedup:>9.1f}"
+                  f"{hierarchy['nodes_expanded']:>13.1f}{dijkstra['nodes_expanded']:>19.1f}", flush=True)
+            if result['mismatches']:
+                print(f"MISMATCH {kind}-{size}: {result['mismatches']} queries differ from dijkstra", file=sys.stderr)
+                failed = True
+    return 1 if failed else 0
+
+
+def _main_short_queries(args) -> int:
+    """
+    Private function used to run the --short-queries mode
+    """
+    print(f"{'case':<52}{'first (ms)':>12}{'others (ms)':>13}{'expanded':>10}")
+    for kind in args.kinds:
+        for size in args.sizes:
+            for algorithm in args.algorithms:
+                result = run_short_queries(kind, size, algorithm, args.seed, args.short_queries)
+                print(f"{f'{kind}-{size}/{algorithm}':<52}{result['first_latency'] * 1000:>12.3f}"
+                      f"{result['latency'] * 1000:>13.3f}{result['nodes_expanded']:>10.1f}", flush=True)
+    return 0
+
+
+def _carve_maze(graph: WeightedGraph, rng: Random) -> None:
+    """
+    Private function used to carve a perfect maze with an iterative depth-first search.
+    Maze cells sit on even coordinates, everything else starts as a barrier.
+    """
+    columns = graph.columns
+    rows = graph.rows
+    graph.terrain[:] = bytes((BARRIER,)) * (columns * rows)
+    terrain = graph.terrain
+    terrain[0] = OPEN
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        candidates = [(x + dx, y + dy, dx, dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                      if 0 <= x + dx < columns and 0 <= y + dy < rows
+                      and terrain[(y + dy) * columns + x + dx] == BARRIER]
+        if not candidates:
+            stack.pop()
+            continue
+        next_x, next_y, dx, dy = rng.choice(candidates)
+        terrain[(y + dy // 2) * columns + x + dx // 2] = OPEN
+        terrain[next_y * columns + next_x] = OPEN
+        stack.append((next_x, next_y))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
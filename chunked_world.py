@@ -0,0 +1,443 @@
+import os
+import struct
+from collections import OrderedDict
+
+from graph import WeightedGraph
+from node import Node
+from parents import NodeParents
+from terrain import OPEN
+
+"""
+Sparse chunked worlds: maps far larger than memory, mostly open with pockets of detail.
+
+A world is a directory holding a header file (magic, version, columns, rows, tile size and
+the default, forest and desert weights) and one file per tile, named <tile_x>_<tile_y>.tile,
+with the tile's terrain codes in row-major order. Tiles without a file are open terrain
+and need no storage, on disk or in memory.
+
+ChunkedTerrain stands in for the terrain buffer of a Graph: cells are read and written by
+node id, and the tile holding a cell is loaded from disk the first time a search reaches it.
+Loaded tiles are kept in least-recently-used order; when they take more than memory_limit
+bytes the least recently used ones are dropped, after edited tiles were written back.
+A ChunkedGraph runs the searches of WeightedGraph on such a terrain; the terrain node sets and
+the uniform cost check of jump_point_search only read the stored and loaded tiles. Whatever
+has to process every cell (the component index, landmarks, cluster abstractions, contraction
+hierarchies, flow fields and snapshots) is not available and raises TypeError. Since
+unreachable ends cannot be ruled out up front, searches on large worlds should have a budget.
+"""
+
+WORLD_MAGIC = b'PFWD'
+WORLD_VERSION = 1
+# magic, version, reserved, columns, rows, tile size, default weight, forest weight, desert weight
+WORLD_HEADER = struct.Struct('<4sHHQQIddd')
+WORLD_HEADER_FILE = 'world.header'
+TILE_EXTENSION = '.tile'
+DEFAULT_TILE_SIZE = 64
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024  # bytes of loaded tiles
+
+
+class ChunkedTerrain:
+    def __init__(self, path: str, columns: int, rows: int, tile_size: int = DEFAULT_TILE_SIZE,
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        path : str
+            Directory of the world's tile files
+        columns : int
+            The number of columns of the world
+        rows : int
+            The number of rows of the world
+        tile_size : int
+            Width and height of a tile in cells
+        memory_limit : int
+            Bytes the loaded tiles may take, at least one tile is always kept
+        """
+        self.path = path
+        self.columns = columns
+        self.rows = rows
+        self.tile_size = tile_size
+        self.tile_columns = -(-columns // tile_size)
+        self.memory_limit = memory_limit
+        self.loads: int = 0  # tiles read from disk
+        self.evictions: int = 0  # tiles dropped to stay within memory_limit
+        self.writes: int = 0  # edited tiles written to disk
+        self._tiles: OrderedDict = OrderedDict()  # tile key -> codes, least recently used first
+        self._dirty: set = set()  # keys of loaded tiles edited since they were last written
+        self._stored: set = set()  # keys of tiles with a file, every other tile is open
+        for name in os.listdir(path):
+            if name.endswith(TILE_EXTENSION):
+                tile_x, tile_y = map(int, name[:-len(TILE_EXTENSION)].split('_'))
+                self._stored.add(tile_y * self.tile_columns + tile_x)
+
+    def __len__(self) -> int:
+        return self.columns * self.rows
+
+    def __getitem__(self, node_id: int) -> int:
+        y, x = divmod(node_id, self.columns)
+        size = self.tile_size
+        key = y // size * self.tile_columns + x // size
+        tiles = self._tiles
+        tile = tiles.get(key)
+        if tile is None:
+            if key not in self._stored:
+                return OPEN
+            tile = self._load(key)
+        else:
+            tiles.move_to_end(key)
+        return tile[y % size * size + x % size]
+
+    def __setitem__(self, node_id: int, code: int) -> None:
+        y, x = divmod(node_id, self.columns)
+        size = self.tile_size
+        key = y // size * self.tile_columns + x // size
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._load(key) if key in self._stored else self._add(key, bytearray(size * size))
+        else:
+            self._tiles.move_to_end(key)
+        tile[y % size * size + x % size] = code
+        self._dirty.add(key)
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Bytes taken by the loaded tiles
+        """
+        return len(self._tiles) * self.tile_size * self.tile_size
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def flush(self) -> None:
+        """
+        Public function used to write every edited tile to disk, keeping it loaded
+        """
+        for key in list(self._dirty):
+            self._write(key, self._tiles[key])
+        self._dirty.clear()
+
+    def tiles(self):
+        """
+        Public function used to iterate over every tile that may hold something other than
+        open terrain, as (tile x, tile y, codes) tuples in key order. Loaded tiles are read from
+        memory, stored ones from disk without loading them, so the loaded tiles stay as they are.
+        """
+        for key in sorted(self._stored | self._tiles.keys()):
+            tile = self._tiles.get(key)
+            if tile is None:
+                tile = self._read(key)
+            tile_y, tile_x = divmod(key, self.tile_columns)
+            yield tile_x, tile_y, tile
+
+    def clear(self) -> None:
+        """
+        Public function used to make every cell open, removing every tile file
+        """
+        for key in self._stored:
+            os.remove(self._tile_path(key))
+        self._stored.clear()
+        self._tiles.clear()
+        self._dirty.clear()
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _load(self, key: int) -> bytearray:
+        """
+        Private function used to load a stored tile from disk
+        """
+        tile = self._read(key)
+        self.loads += 1
+        return self._add(key, tile)
+
+    def _read(self, key: int) -> bytearray:
+        """
+        Private function used to read the codes of a stored tile from disk
+        """
+        with open(self._tile_path(key), 'rb') as tile_file:
+            tile = bytearray(tile_file.read())
+        if len(tile) != self.tile_size * self.tile_size:
+            raise ValueError(f"{self._tile_path(key)}: truncated tile")
+        return tile
+
+    def _add(self, key: int, tile: bytearray) -> bytearray:
+        """
+        Private function used to keep a tile loaded as the most recently used one
+        """
+        self._tiles[key] = tile
+        self._evict()
+        return tile
+
+    def _evict(self) -> None:
+        """
+        Private function used to drop least recently used tiles until the loaded tiles fit
+        in memory_limit, edited ones are written to disk first
+        """
+        tiles = self._tiles
+        tile_bytes = self.tile_size * self.tile_size
+        while len(tiles) > 1 and len(tiles) * tile_bytes > self.memory_limit:
+            key, tile = tiles.popitem(last=False)
+            if key in self._dirty:
+                self._dirty.discard(key)
+                self._write(key, tile)
+            self.evictions += 1
+
+    def _write(self, key: int, tile: bytearray) -> None:
+        """
+        Private function used to store a tile, an open tile is stored by removing its file
+        """
+        path = self._tile_path(key)
+        if tile.count(OPEN) == len(tile):
+            if key in self._stored:
+                os.remove(path)
+                self._stored.discard(key)
+        else:
+            temporary_path = path + '.tmp'
+            with open(temporary_path, 'wb') as tile_file:
+                tile_file.write(tile)
+            os.replace(temporary_path, path)
+            self._stored.add(key)
+        self.writes += 1
+
+    def _tile_path(self, key: int) -> str:
+        tile_y, tile_x = divmod(key, self.tile_columns)
+        return _tile_file_path(self.path, tile_x, tile_y)
+
+
+class ChunkedGraph(WeightedGraph):
+    def __init__(self, columns: int, rows: int, terrain: ChunkedTerrain):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        columns: int
+            The number of columns in the world
+        rows: int
+            The number of rows in the world
+        terrain: ChunkedTerrain
+            The tiles of the world
+        """
+        super().__init__(columns, rows, terrain)
+        # search logs store node ids as 32 bit integers, too small for large worlds
+        self.visualize_algorithm = False
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def flush(self) -> None:
+        """
+        Public function used to write the edited tiles and the weights to the world's directory
+        """
+        self.terrain.flush()
+        _write_header(self.terrain.path, self.columns, self.rows, self.terrain.tile_size,
+                      (self.default_weight, self.forest_weight, self.desert_weight))
+
+    def clear_terrain_nodes(self) -> None:
+        self.terrain.clear()
+        self._notify_terrain_listeners(None)
+
+    def snapshot(self):
+        raise TypeError("chunked worlds load and evict tiles in place and cannot be snapshotted")
+
+    def hierarchical_a_star(self, start: Node, end: Node):
+        raise _whole_map_error('hierarchical_a_star')
+
+    def contraction_hierarchies(self, start: Node, end: Node):
+        raise _whole_map_error('contraction_hierarchies')
+
+    def build_contraction_hierarchy(self):
+        raise _whole_map_error('build_contraction_hierarchy')
+
+    def save_contraction_hierarchy(self, path: str) -> None:
+        raise _whole_map_error('save_contraction_hierarchy')
+
+    def load_contraction_hierarchy(self, path: str) -> None:
+        raise _whole_map_error('load_contraction_hierarchy')
+
+    def set_contraction_hierarchy(self, hierarchy) -> None:
+        raise _whole_map_error('set_contraction_hierarchy')
+
+    def update_landmarks(self):
+        raise _whole_map_error('update_landmarks (the landmarks heuristic)')
+
+    def flow_field(self, goals):
+        raise _whole_map_error('flow_field')
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _connected(self, start: int, end: int) -> bool:
+        """
+        Private function used in place of the component index, which would have to label
+        the whole world: only barrier ends are ruled out, other ends count as reachable
+        until a search shows otherwise
+        """
+        return start == end or self._is_passable(end)
+
+    def _terrain_nodes(self, code: int) -> set:
+        """
+        Private function used to collect every node with the given terrain code, which must not
+        be OPEN, from the tiles that are stored or loaded
+        """
+        columns = self.columns
+        rows = self.rows
+        size = self.terrain.tile_size
+        nodes = set()
+        for tile_x, tile_y, tile in self.terrain.tiles():
+            index = tile.find(code)
+            while index != -1:
+                row, column = divmod(index, size)
+                x, y = tile_x * size + column, tile_y * size + row
+                if x < columns and y < rows:
+                    nodes.add(Node(x, y))
+                index = tile.find(code, index + 1)
+        return nodes
+
+    def _find_terrain(self, code: int, start: int = 0) -> int:
+        """
+        Private function used to find the first node id from start on with the given
+        terrain code, -1 when there is none. Codes other than OPEN are searched for
+        in the stored and loaded tiles only.
+        """
+        terrain = self.terrain
+        if code == OPEN:
+            for node_id in range(start, len(terrain)):
+                if terrain[node_id] == OPEN:
+                    return node_id
+            return -1
+
+        columns = self.columns
+        size = terrain.tile_size
+        start_y, start_x = divmod(start, columns)
+        found = -1
+        for tile_x, tile_y, tile in terrain.tiles():
+            left = tile_x * size
+            width = min(size, columns - left)
+            top = tile_y * size
+            for row in range(max(0, start_y - top), min(size, self.rows - top)):
+                begin = row * size
+                offset = max(0, start_x - left) if top + row == start_y else 0
+                index = tile.find(code, begin + offset, begin + width)
+                if index != -1:
+                    node_id = (top + row) * columns + left + index - begin
+                    if found == -1 or node_id < found:
+                        found = node_id
+                    break
+        return found
+
+    def _acquire_parents(self, start: int) -> NodeParents:
+        """
+        Private function used to create the parent storage of a search, a dict since
+        per-node arrays would be as large as the world
+        """
+        return NodeParents(start)
+
+    def _release_parents(self, parents: NodeParents) -> None:
+        pass
+
+
+def create_world(path: str, columns: int, rows: int, tile_size: int = DEFAULT_TILE_SIZE,
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT) -> ChunkedGraph:
+    """
+    Public function used to create an open world in the directory path and open it
+
+    Returns:
+    --------
+    <value> : ChunkedGraph
+        Graph of the new world
+    """
+    if columns < 1 or rows < 1 or tile_size < 1:
+        raise ValueError("a world needs at least one column, row and cell per tile")
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, WORLD_HEADER_FILE)):
+        raise FileExistsError(f"{path}: already holds a world")
+    _write_header(path, columns, rows, tile_size, (1, 2, 3))
+    return open_world(path, memory_limit)
+
+
+def open_world(path: str, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> ChunkedGraph:
+    """
+    Public function used to open the world stored in the directory path, no tile is loaded yet
+
+    Parameters:
+    -----------
+    path : str
+        Directory of the world
+    memory_limit : int
+        Bytes the loaded tiles may take
+    Returns:
+    --------
+    <value> : ChunkedGraph
+        Graph of the world with its weights
+    """
+    header_path = os.path.join(path, WORLD_HEADER_FILE)
+    with open(header_path, 'rb') as header_file:
+        header = header_file.read(WORLD_HEADER.size)
+    if len(header) != WORLD_HEADER.size:
+        raise ValueError(f"{header_path}: not a world header")
+    magic, version, _, columns, rows, tile_size, default_weight, forest_weight, desert_weight = \
+        WORLD_HEADER.unpack(header)
+    if magic != WORLD_MAGIC or version != WORLD_VERSION:
+        raise ValueError(f"{header_path}: not a version {WORLD_VERSION} world header")
+
+    terrain = ChunkedTerrain(path, columns, rows, tile_size, memory_limit)
+    graph = ChunkedGraph(columns, rows, terrain)
+    graph.default_weight = default_weight
+    graph.forest_weight = forest_weight
+    graph.desert_weight = desert_weight
+    return graph
+
+
+def save_world(graph: WeightedGraph, path: str, tile_size: int = DEFAULT_TILE_SIZE) -> None:
+    """
+    Public function used to store the terrain and weights of a graph as a world in the
+    directory path, only tiles holding something other than open terrain are written
+    """
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(TILE_EXTENSION):
+            os.remove(os.path.join(path, name))
+    columns = graph.columns
+    for tile_y in range(-(-graph.rows // tile_size)):
+        for tile_x in range(-(-columns // tile_size)):
+            tile = bytearray(tile_size * tile_size)
+            left = tile_x * tile_size
+            width = min(tile_size, columns - left)
+            for y in range(tile_y * tile_size, min((tile_y + 1) * tile_size, graph.rows)):
+                row_start = (y - tile_y * tile_size) * tile_size
+                tile[row_start:row_start + width] = graph.terrain[y * columns + left:y * columns + left + width]
+            if tile.count(OPEN) != len(tile):
+                with open(_tile_file_path(path, tile_x, tile_y), 'wb') as tile_file:
+                    tile_file.write(tile)
+    _write_header(path, columns, graph.rows, tile_size, (graph.default_weight, graph.forest_weight, graph.desert_weight))
+
+
+def _whole_map_error(name: str) -> TypeError:
+    """
+    Private function used to create the error of a method that would process every cell of a world
+    """
+    return TypeError(f"{name} processes every cell of the map, which chunked worlds do not support")
+
+
+def _tile_file_path(path: str, tile_x: int, tile_y: int) -> str:
+    return os.path.join(path, f"{tile_x}_{tile_y}{TILE_EXTENSION}")
+
+
+def _write_header(path: str, columns: int, rows: int, tile_size: int, weights: tuple) -> None:
+    """
+    Private function used to write the header file of a world
+    """
+    with open(os.path.join(path, WORLD_HEADER_FILE), 'wb') as header_file:
+        header_file.write(WORLD_HEADER.pack(WORLD_MAGIC, WORLD_VERSION, 0, columns, rows, tile_size, *weights))
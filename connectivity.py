@@ -0,0 +1,213 @@
+from array import array
+from typing import List
+
+from terrain import PASSABLE_PATTERN
+
+"""
+Connected-component index over the passable cells of a graph.
+
+Every maximal horizontal run of passable cells gets a label, labels of runs that touch in
+consecutive rows are joined in a union-find forest, so two cells are connected exactly when
+their labels share a root. Opening a cell joins the labels of its neighbors in O(4 α).
+Closing a cell can only split a component, which union-find cannot undo: when the cell's
+open neighbors are not still joined around it, the component is marked suspect and the
+index is relabeled before it next reports a connection through that component.
+"Not connected" answers never need a relabel, barriers only take connections away.
+"""
+
+# the 8 cells around a cell in clockwise order, consecutive entries are 4-connected
+RING_OFFSETS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+
+class ComponentIndex:
+    def __init__(self, graph):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        graph : Graph
+            The graph to index, terrain edits are picked up through graph.terrain_listeners
+        """
+        self.graph = graph
+        self.labels: array = array('i')  # node id -> run label, -1 for barriers
+        self.relabels: int = 0  # number of full relabels, useful to tune edit-heavy workloads
+        self._parent: List[int] = []  # union-find forest over the labels
+        self._suspect: set = set()  # roots of components that may have been split
+        self._rebuild_pending = True
+        graph.terrain_listeners.append(self._terrain_changed)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def connected(self, start: int, end: int) -> bool:
+        """
+        Public function used to determine if a path from start to end exists.
+        A barrier start can still leave through its passable neighbors, like in the searches.
+
+        Parameters:
+        -----------
+        start : int
+            The node id the path starts from
+        end : int
+            The node id the path ends at
+        Returns:
+        --------
+        <value> : bool
+            False when no path exists
+        """
+        if start == end:
+            return True
+        if self._rebuild_pending:
+            self.rebuild()
+        labels = self.labels
+        if labels[end] == -1:
+            return False
+
+        end_root = self._find(labels[end])
+        sources = [start] if labels[start] != -1 else self.graph._neighbors(start)
+        if not any(self._find(labels[source]) == end_root for source in sources):
+            return False
+        if end_root in self._suspect:
+            self.rebuild()
+            return self.connected(start, end)
+        return True
+
+    def copy(self, graph) -> 'ComponentIndex':
+        """
+        Public function used to create the index of graph, a snapshot of the indexed graph,
+        from the current labels instead of labeling graph from scratch.
+        A pending relabel is done first, so this index stays incremental as well.
+
+        Returns:
+        --------
+        <value> : ComponentIndex
+            Index of graph, registered as one of its terrain listeners
+        """
+        if self._rebuild_pending:
+            self.rebuild()
+        index = ComponentIndex(graph)
+        index.labels = array('i', self.labels)
+        index._parent = list(self._parent)
+        index._suspect = set(self._suspect)
+        index._rebuild_pending = False
+        return index
+
+    def rebuild(self) -> None:
+        """
+        Public function used to relabel every passable cell from the terrain.
+        Called automatically by connected when the index is stale.
+        """
+        graph = self.graph
+        columns = graph.columns
+        terrain = graph.terrain
+        labels = array('i', [-1]) * (columns * graph.rows)
+        self._parent = parent = []
+        self._suspect = set()
+        previous_runs = []
+        for row_start in range(0, len(labels), columns):
+            runs = []
+            for match in PASSABLE_PATTERN.finditer(terrain, row_start, row_start + columns):
+                begin, end = match.span()
+                label = len(parent)
+                parent.append(label)
+                labels[begin:end] = array('i', [label]) * (end - begin)
+                runs.append((begin - row_start, end - row_start, label))
+
+            # join the runs overlapping a run of the previous row, both lists are sorted by x
+            i = j = 0
+            while i < len(runs) and j < len(previous_runs):
+                begin, end, label = runs[i]
+                previous_begin, previous_end, previous_label = previous_runs[j]
+                if begin < previous_end and previous_begin < end:
+                    self._union(label, previous_label)
+                if end < previous_end:
+                    i += 1
+                else:
+                    j += 1
+            previous_runs = runs
+
+        self.labels = labels
+        self.relabels += 1
+        self._rebuild_pending = False
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _terrain_changed(self, node_id) -> None:
+        """
+        Private function used as terrain listener, keeps the labels in step with barrier edits
+        """
+        if self._rebuild_pending:
+            return
+        if node_id is None:
+            self._rebuild_pending = True
+            return
+
+        graph = self.graph
+        labels = self.labels
+        if graph._is_passable(node_id) and labels[node_id] == -1:
+            label = len(self._parent)
+            self._parent.append(label)
+            labels[node_id] = label
+            for neighbor in graph._neighbors(node_id):
+                self._union(label, labels[neighbor])
+        elif not graph._is_passable(node_id) and labels[node_id] != -1:
+            root = self._find(labels[node_id])
+            labels[node_id] = -1
+            if not self._joined_around(node_id):
+                self._suspect.add(root)
+
+    def _joined_around(self, node_id: int) -> bool:
+        """
+        Private function used to determine if the open neighbors of node_id stay connected
+        through the 8 cells around it. When they do, closing node_id cannot split its component.
+        """
+        graph = self.graph
+        y, x = divmod(node_id, graph.columns)
+        ring = [0 <= x + dx < graph.columns and 0 <= y + dy < graph.rows
+                and graph._is_passable((y + dy) * graph.columns + x + dx)
+                for dx, dy in RING_OFFSETS]
+        if sum(ring[0::2]) <= 1:
+            return True
+        if all(ring):
+            return True
+
+        # walk the ring from a closed cell and count the arcs holding an open neighbor
+        first_closed = ring.index(False)
+        arcs = 0
+        in_arc = holds_neighbor = False
+        for step in range(1, 9):
+            position = (first_closed + step) % 8
+            if ring[position]:
+                in_arc = True
+                holds_neighbor = holds_neighbor or position % 2 == 0
+            elif in_arc:
+                arcs += holds_neighbor
+                in_arc = holds_neighbor = False
+        return arcs <= 1
+
+    def _find(self, label: int) -> int:
+        parent = self._parent
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    def _union(self, first: int, second: int) -> None:
+        first = self._find(first)
+        second = self._find(second)
+        if first == second:
+            return
+        if first > second:
+            first, second = second, first
+        self._parent[second] = first
+        if second in self._suspect:
+            self._suspect.discard(second)
+            self._suspect.add(first)
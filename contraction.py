@@ -0,0 +1,394 @@
+import heapq
+import os
+import struct
+import sys
+from array import array
+from math import inf
+from time import perf_counter
+from typing import Dict, List, Optional
+
+"""
+Contraction Hierarchies, adapted from Geisberger, Sanders, Schultes and Delling,
+"Contraction Hierarchies: Faster and Simpler Hierarchical Routing in Road Networks" (2008).
+
+Preprocessing contracts the nodes of a CSRGraph one at a time, least important first. Contracting
+node v removes it from the remaining graph and adds a shortcut u -> x wherever the path
+u -> v -> x is the only shortest path between them; a bounded local Dijkstra search (the witness
+search) looks for another path first. Importance is twice the edge difference (shortcuts added
+minus edges removed) plus the number of already contracted neighbors and the node's level (how many
+contractions deep its shortcuts reach), kept up to date lazily.
+
+Every edge ends up stored with the lower ranked of its two nodes: upward edges (to a higher
+ranked target) and downward edges (from a higher ranked source), in CSR arrays, with the
+contracted middle node of shortcuts. A query runs Dijkstra upward from start and, on the reversed
+downward edges, upward from end; the cheapest node reached by both joins the shortest path,
+whose shortcuts are then unpacked back into original edges.
+
+Hierarchies are static: they describe the graph as it was when built. They can be written to
+disk with save and read back with ContractionHierarchy.load.
+"""
+
+WITNESS_LIMIT = 200  # nodes a witness search may settle before shortcuts are added conservatively
+ESTIMATE_LIMIT = 32  # nodes a witness search may settle while only estimating a node's importance
+NO_MIDDLE = -1  # middle node of an original edge
+
+CH_MAGIC = b'PFCH'
+CH_VERSION = 1
+# magic, version, node count, upward edge count, downward edge count, checksum of the source graph
+CH_HEADER = struct.Struct('<4sHIQQI')
+
+
+class ContractionHierarchy:
+    def __init__(self, node_count: int):
+        """
+        Initiator
+
+        Creates an empty hierarchy, use build or load to get one for a graph.
+
+        Parameters:
+        -----------
+        node_count : int
+            The number of nodes of the graph
+        """
+        self.node_count = node_count
+        self.rank: array = array('i', bytes(4 * node_count))  # contraction order of every node
+        # upward edges of node u: up_targets[up_offsets[u]:up_offsets[u + 1]], all ranked above u
+        self.up_offsets: array = array('q', bytes(8 * (node_count + 1)))
+        self.up_targets: array = array('i')
+        self.up_weights: array = array('d')
+        self.up_middles: array = array('i')
+        # downward edges into node x: down_sources[down_offsets[x]:down_offsets[x + 1]], all ranked above x
+        self.down_offsets: array = array('q', bytes(8 * (node_count + 1)))
+        self.down_sources: array = array('i')
+        self.down_weights: array = array('d')
+        self.down_middles: array = array('i')
+        self.checksum: int = 0  # identifies the graph the hierarchy was built for, set by the caller
+        self.shortcuts: int = 0  # shortcut edges added by build
+        self.build_time: float = 0.0  # seconds spent in build
+        self.nodes_expanded: int = 0  # nodes settled by the last query, both directions
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.up_targets) + len(self.down_sources)
+
+    @classmethod
+    def build(cls, graph) -> 'ContractionHierarchy':
+        """
+        Public function used to preprocess a graph
+
+        Parameters:
+        -----------
+        graph : CSRGraph
+            The graph to contract
+
+        Returns:
+        --------
+        <value> : ContractionHierarchy
+            The hierarchy of graph
+        """
+        begin = perf_counter()
+        hierarchy = cls(graph.node_count)
+        hierarchy._contract(graph)
+        hierarchy.build_time = perf_counter() - begin
+        return hierarchy
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def find_path(self, start: int, end: int) -> Optional[List[int]]:
+        """
+        Public function used to find a shortest path between two node ids.
+
+        Returns:
+        --------
+        <value> : list
+            The node ids from start to end, both included, or None when end cannot be reached
+        """
+        self.nodes_expanded = 0
+        if start == end:
+            return [start]
+
+        # direction 0 searches upward edges from start, direction 1 downward edges from end
+        costs = ({start: 0}, {end: 0})
+        parents = ({start: None}, {end: None})  # node -> (previous node, middle node of the edge)
+        frontiers = ([(0, start)], [(0, end)])
+        edges = ((self.up_offsets, self.up_targets, self.up_weights, self.up_middles),
+                 (self.down_offsets, self.down_sources, self.down_weights, self.down_middles))
+        best = inf
+        meeting = None
+        nodes_expanded = 0
+
+        while True:
+            forward_top = frontiers[0][0][0] if frontiers[0] else inf
+            backward_top = frontiers[1][0][0] if frontiers[1] else inf
+            if min(forward_top, backward_top) >= best:
+                break
+            direction = 0 if forward_top <= backward_top else 1
+            frontier = frontiers[direction]
+            cost_so_far = costs[direction]
+            cost, current = heapq.heappop(frontier)
+            if cost > cost_so_far[current]:
+                continue  # stale entry
+            nodes_expanded += 1
+            other_cost = costs[1 - direction].get(current)
+            if other_cost is not None and cost + other_cost < best:
+                best = cost + other_cost
+                meeting = current
+
+            offsets, neighbors, weights, middles = edges[direction]
+            parent = parents[direction]
+            for index in range(offsets[current], offsets[current + 1]):
+                next = neighbors[index]
+                new_cost = cost + weights[index]
+                if new_cost < cost_so_far.get(next, inf):
+                    cost_so_far[next] = new_cost
+                    parent[next] = (current, middles[index])
+                    heapq.heappush(frontier, (new_cost, next))
+
+        self.nodes_expanded = nodes_expanded
+        if meeting is None:
+            return None
+
+        # start -> meeting over upward edges, then meeting -> end over downward edges
+        forward_edges = []
+        node = meeting
+        while parents[0][node] is not None:
+            previous, middle = parents[0][node]
+            forward_edges.append((previous, node, middle))
+            node = previous
+        path = [start]
+        for source, target, middle in reversed(forward_edges):
+            self._unpack(source, target, middle, path)
+        node = meeting
+        while parents[1][node] is not None:
+            following, middle = parents[1][node]
+            self._unpack(node, following, middle, path)
+            node = following
+        return path
+
+    def save(self, path: str) -> None:
+        """
+        Public function used to write the hierarchy to a binary file.
+        The file is written under a temporary name and then renamed over path.
+        """
+        arrays = self._arrays()
+        if sys.byteorder == 'big':
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as hierarchy_file:
+            hierarchy_file.write(CH_HEADER.pack(CH_MAGIC, CH_VERSION, self.node_count,
+                                                len(self.up_targets), len(self.down_sources), self.checksum))
+            for values in arrays:
+                values.tofile(hierarchy_file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ContractionHierarchy':
+        """
+        Public function used to read a hierarchy written by save.
+        Raises ValueError when the file is not a contraction hierarchy.
+        """
+        with open(path, 'rb') as hierarchy_file:
+            header = hierarchy_file.read(CH_HEADER.size)
+            if len(header) != CH_HEADER.size:
+                raise ValueError(f"{path}: not a contraction hierarchy")
+            magic, version, node_count, up_count, down_count, checksum = CH_HEADER.unpack(header)
+            if magic != CH_MAGIC or version != CH_VERSION:
+                raise ValueError(f"{path}: not a version {CH_VERSION} contraction hierarchy")
+            hierarchy = cls(node_count)
+            hierarchy.checksum = checksum
+            counts = (node_count, node_count + 1, up_count, up_count, up_count,
+                      node_count + 1, down_count, down_count, down_count)
+            arrays = [array(values.typecode) for values in hierarchy._arrays()]
+            try:
+                for values, count in zip(arrays, counts):
+                    values.fromfile(hierarchy_file, count)
+            except EOFError:
+                raise ValueError(f"{path}: truncated contraction hierarchy")
+        if sys.byteorder == 'big':
+            for values in arrays:
+                values.byteswap()
+        (hierarchy.rank, hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_weights, hierarchy.up_middles,
+         hierarchy.down_offsets, hierarchy.down_sources, hierarchy.down_weights, hierarchy.down_middles) = arrays
+        hierarchy.shortcuts = sum(middle != NO_MIDDLE for middle in hierarchy.up_middles) + \
+            sum(middle != NO_MIDDLE for middle in hierarchy.down_middles)
+        return hierarchy
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _arrays(self) -> list:
+        """
+        Private function used to list the arrays of the hierarchy in file order
+        """
+        return [self.rank, self.up_offsets, self.up_targets, self.up_weights, self.up_middles,
+                self.down_offsets, self.down_sources, self.down_weights, self.down_middles]
+
+    def _contract(self, graph) -> None:
+        """
+        Private function used to order and contract every node of graph and
+        store the resulting upward and downward edges
+        """
+        node_count = graph.node_count
+        # remaining graph, node -> {neighbor: (weight, middle node)}, parallel edges reduced to the cheapest
+        out_edges: List[Dict[int, tuple]] = [dict() for _ in range(node_count)]
+        in_edges: List[Dict[int, tuple]] = [dict() for _ in range(node_count)]
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        for source in range(node_count):
+            for index in range(offsets[source], offsets[source + 1]):
+                target = targets[index]
+                weight = weights[index]
+                if target != source and weight < out_edges[source].get(target, (inf,))[0]:
+                    out_edges[source][target] = in_edges[target][source] = (weight, NO_MIDDLE)
+
+        contracted_neighbors = array('i', bytes(4 * node_count))
+        levels = array('i', bytes(4 * node_count))  # depth of the shortcuts below every node
+        priorities = [self._importance(node, out_edges, in_edges, contracted_neighbors, levels)
+                      for node in range(node_count)]
+        queue = [(priority, node) for node, priority in enumerate(priorities)]
+        heapq.heapify(queue)
+        up: List[dict] = [None] * node_count
+        down: List[dict] = [None] * node_count
+        rank = 0
+        while queue:
+            priority, node = heapq.heappop(queue)
+            if priority != priorities[node] or up[node] is not None:
+                continue  # outdated entry
+            # lazy update: the priority may have grown since it was queued
+            priority = self._importance(node, out_edges, in_edges, contracted_neighbors, levels)
+            if queue and priority > queue[0][0]:
+                priorities[node] = priority
+                heapq.heappush(queue, (priority, node))
+                continue
+
+            self.rank[node] = rank
+            rank += 1
+            up[node] = out_edges[node]
+            down[node] = in_edges[node]
+            shortcuts = list(self._shortcuts(node, out_edges, in_edges, WITNESS_LIMIT))  # all found before any is added
+            for neighbor in up[node]:
+                del in_edges[neighbor][node]
+            for neighbor in down[node]:
+                del out_edges[neighbor][node]
+            for source, target, weight in shortcuts:
+                if weight < out_edges[source].get(target, (inf,))[0]:
+                    out_edges[source][target] = in_edges[target][source] = (weight, node)
+                    self.shortcuts += 1
+            out_edges[node] = in_edges[node] = None
+
+            neighbors = set(up[node]) | set(down[node])
+            for neighbor in neighbors:
+                contracted_neighbors[neighbor] += 1
+                levels[neighbor] = max(levels[neighbor], levels[node] + 1)
+                priorities[neighbor] = self._importance(neighbor, out_edges, in_edges, contracted_neighbors, levels)
+                heapq.heappush(queue, (priorities[neighbor], neighbor))
+
+        self._store(up, down)
+
+    def _shortcuts(self, node: int, out_edges: list, in_edges: list, settle_limit: int):
+        """
+        Private function used to find the shortcuts needed to contract node, with witness
+        searches that settle at most settle_limit nodes. Yields (source, target, weight) tuples.
+        """
+        outgoing = out_edges[node]
+        if not outgoing:
+            return
+        for source, (in_weight, _) in in_edges[node].items():
+            targets = {target: in_weight + out_weight for target, (out_weight, _) in outgoing.items()
+                       if target != source}
+            if not targets:
+                continue
+            witness_costs = self._witness_search(source, node, max(targets.values()), targets, out_edges,
+                                                 settle_limit)
+            for target, via_cost in targets.items():
+                if witness_costs.get(target, inf) > via_cost:
+                    yield source, target, via_cost
+
+    def _witness_search(self, source: int, skipped: int, limit: float, targets: dict, out_edges: list,
+                        settle_limit: int) -> dict:
+        """
+        Private function used to run a Dijkstra search from source that avoids skipped, stops at
+        cost limit or after settle_limit settled nodes, and returns the costs it found
+        """
+        cost_so_far = {source: 0}
+        frontier = [(0, source)]
+        remaining = len(targets)
+        settled = 0
+        while frontier:
+            cost, current = heapq.heappop(frontier)
+            if cost > cost_so_far[current]:
+                continue
+            if cost > limit or settled >= settle_limit:
+                break
+            if current in targets:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            settled += 1
+            for next, (weight, _) in out_edges[current].items():
+                if next == skipped:
+                    continue
+                new_cost = cost + weight
+                if new_cost < cost_so_far.get(next, inf):
+                    cost_so_far[next] = new_cost
+                    heapq.heappush(frontier, (new_cost, next))
+        return cost_so_far
+
+    def _importance(self, node: int, out_edges: list, in_edges: list, contracted_neighbors: array,
+                    levels: array) -> int:
+        """
+        Private function used to calculate the contraction priority of node, lower is contracted first
+        """
+        shortcuts = sum(1 for _ in self._shortcuts(node, out_edges, in_edges, ESTIMATE_LIMIT))
+        edge_difference = shortcuts - len(out_edges[node]) - len(in_edges[node])
+        return 2 * edge_difference + contracted_neighbors[node] + levels[node]
+
+    def _store(self, up: list, down: list) -> None:
+        """
+        Private function used to pack the upward and downward edges of every node into the CSR arrays
+        """
+        for node in range(self.node_count):
+            for target, (weight, middle) in up[node].items():
+                self.up_targets.append(target)
+                self.up_weights.append(weight)
+                self.up_middles.append(middle)
+            self.up_offsets[node + 1] = len(self.up_targets)
+            for source, (weight, middle) in down[node].items():
+                self.down_sources.append(source)
+                self.down_weights.append(weight)
+                self.down_middles.append(middle)
+            self.down_offsets[node + 1] = len(self.down_sources)
+
+    def _unpack(self, source: int, target: int, middle: int, path: list) -> None:
+        """
+        Private function used to append the original path of the edge source -> target to path,
+        source excluded. A shortcut's middle node is ranked below both ends, so its two halves
+        are the downward edge source -> middle and the upward edge middle -> target of middle.
+        """
+        stack = [(source, target, middle)]
+        while stack:
+            source, target, middle = stack.pop()
+            if middle == NO_MIDDLE:
+                path.append(target)
+                continue
+            stack.append((middle, target, self._edge_middle(self.up_offsets, self.up_targets,
+                                                            self.up_middles, middle, target)))
+            stack.append((source, middle, self._edge_middle(self.down_offsets, self.down_sources,
+                                                            self.down_middles, middle, source)))
+
+    @staticmethod
+    def _edge_middle(offsets: array, neighbors: array, middles: array, node: int, neighbor: int) -> int:
+        """
+        Private function used to look up the middle node of the edge between node and neighbor
+        stored with node
+        """
+        for index in range(offsets[node], offsets[node + 1]):
+            if neighbors[index] == neighbor:
+                return middles[index]
+        raise KeyError(f"no edge between {node} and {neighbor}")
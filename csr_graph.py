@@ -0,0 +1,467 @@
+from array import array
+from math import inf, floor, hypot
+
+from priority_queues import FRONTIER_QUEUES, HEAP, BUCKET, PriorityQueue, BucketPriorityQueue
+from search_budget import SearchBudget
+from search_engine import SearchEngine
+from search_stats import SearchStats, instrumented
+
+"""
+General weighted directed graph stored in compressed sparse row (CSR) arrays, for graphs that
+are not grids (road networks, navigation meshes) and that can have millions of nodes.
+
+The outgoing edges of node u are targets[offsets[u]:offsets[u + 1]], their costs are the
+weights at the same indices. Nodes are the ints 0 to node_count - 1. Nodes can carry x and y
+coordinates; A* then uses the EUCLIDEAN or MANHATTAN distance between them, scaled down to the
+cheapest cost per unit of distance of any edge so the heuristic stays consistent.
+
+The searches have the same API and results as those of graph.Graph, and run the same loops
+(search_engine.SearchEngine): start and end are node ids, path_nodes holds the ids between them
+and every search returns a SearchStats.
+
+Edge list files have one edge per line, "source target [weight]" with 0-based node ids and a
+default weight of 1; coordinate files have one "node x y" line per node. Lines starting with
+# or % are comments. DIMACS shortest path files (.gr arcs, .co coordinates, 1-based node ids)
+are read with load_dimacs.
+"""
+
+EUCLIDEAN = 'euclidean'
+MANHATTAN = 'manhattan'
+HEURISTICS = (EUCLIDEAN, MANHATTAN)
+
+
+class CSRGraph(SearchEngine):
+    def __init__(self, offsets: array, targets: array, weights: array):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        offsets : array
+            node_count + 1 edge indices, the edges of node u are at offsets[u] to offsets[u + 1]
+        targets : array
+            The target node of every edge
+        weights : array
+            The cost of every edge, non-negative
+        """
+        if len(offsets) < 1 or offsets[-1] != len(targets) or len(targets) != len(weights):
+            raise ValueError("offsets, targets and weights do not describe a CSR graph")
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.node_count: int = len(offsets) - 1
+        self.xs: array = None  # node coordinates, None when the graph has none
+        self.ys: array = None
+        self.heuristic: str = EUCLIDEAN  # one of HEURISTICS
+        self.heuristic_weight: float = 0  # cost per unit of distance, 0 turns the A* heuristic off
+        self.frontier_queue: str = HEAP  # one of priority_queues.FRONTIER_QUEUES, used by a_star and dijkstra
+        self.path_nodes: list = []
+        self.path_cost: float = inf  # cost of the last generated path, inf when no path was found
+        self.nodes_expanded: int = 0
+        self.peak_frontier: int = 0
+        self.frontier_pushes: int = 0
+        self.frontier_pops: int = 0
+        self.stale_entries: int = 0
+        self.search_stats: SearchStats = None  # stats of the last search
+        self.profiler: str = None  # one of search_stats.PROFILERS to profile every search, None to not profile
+        self.budget: SearchBudget = None  # limits of every search, None for no limits
+        self.search_interrupted: bool = False  # the budget stopped the last search
+        self.search_suboptimality: float = None  # always None, there is no anytime search on CSR graphs
+        self.search_log = None  # always None, searches on CSR graphs are not recorded
+        self._instrumenting = False
+        self._integer_weights = all(float(weight).is_integer() for weight in weights)
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    @classmethod
+    def from_edges(cls, node_count: int, sources, targets, weights) -> 'CSRGraph':
+        """
+        Public function used to build a graph from parallel sequences of edge sources,
+        targets and weights, in any order
+
+        Returns:
+        --------
+        <value> : CSRGraph
+            The graph with node_count nodes and the given edges
+        """
+        edge_count = len(sources)
+        if len(targets) != edge_count or len(weights) != edge_count:
+            raise ValueError("sources, targets and weights differ in length")
+        offsets = array('q', bytes(8 * (node_count + 1)))
+        for source in sources:
+            if not 0 <= source < node_count:
+                raise ValueError(f"edge source {source} is not a node of a graph with {node_count} nodes")
+            offsets[source + 1] += 1
+        for node_id in range(node_count):
+            offsets[node_id + 1] += offsets[node_id]
+
+        # counting sort of the edges by source
+        next_index = array('q', offsets[:-1])
+        sorted_targets = array('i', bytes(4 * edge_count))
+        sorted_weights = array('d', bytes(8 * edge_count))
+        for source, target, weight in zip(sources, targets, weights):
+            if not 0 <= target < node_count:
+                raise ValueError(f"edge target {target} is not a node of a graph with {node_count} nodes")
+            if weight < 0:
+                raise ValueError(f"edge {source} -> {target} has negative weight {weight}")
+            index = next_index[source]
+            sorted_targets[index] = target
+            sorted_weights[index] = weight
+            next_index[source] = index + 1
+        return cls(offsets, sorted_targets, sorted_weights)
+
+    @classmethod
+    def from_grid(cls, graph) -> 'CSRGraph':
+        """
+        Public function used to convert a grid Graph or WeightedGraph into a CSR graph.
+        Node ids stay the same (y * columns + x), no edge leads into a barrier node, every edge
+        costs what the grid charges for the move and A* uses the Manhattan heuristic.
+
+        Parameters:
+        -----------
+        graph : Graph
+            The grid to convert
+
+        Returns:
+        --------
+        <value> : CSRGraph
+            The graph of the grid's current terrain
+        """
+        node_count = graph.columns * graph.rows
+        offsets = array('q', [0])
+        targets = array('i')
+        weights = array('d')
+        for node_id in range(node_count):
+            for neighbor in graph._neighbors(node_id):
+                targets.append(neighbor)
+                weights.append(graph._cost(node_id, neighbor))
+            offsets.append(len(targets))
+
+        csr_graph = cls(offsets, targets, weights)
+        xs = array('d', bytes(8 * node_count))
+        ys = array('d', bytes(8 * node_count))
+        for node_id in range(node_count):
+            ys[node_id], xs[node_id] = divmod(node_id, graph.columns)
+        csr_graph.set_coordinates(xs, ys, MANHATTAN)
+        return csr_graph
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def set_coordinates(self, xs: array, ys: array, heuristic: str = EUCLIDEAN) -> None:
+        """
+        Public function used to give every node coordinates for the A* heuristic.
+        The heuristic weight becomes the lowest edge cost per unit of heuristic distance,
+        which keeps the heuristic consistent for any edge weights.
+
+        Parameters:
+        -----------
+        xs : array
+            The x coordinate of every node
+        ys : array
+            The y coordinate of every node
+        heuristic : str
+            One of HEURISTICS, the distance used between coordinates
+        """
+        if len(xs) != self.node_count or len(ys) != self.node_count:
+            raise ValueError(f"expected coordinates for {self.node_count} nodes")
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"unknown heuristic {heuristic!r}, expected one of {', '.join(HEURISTICS)}")
+        self.xs = xs
+        self.ys = ys
+        self.heuristic = heuristic
+
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
+        manhattan = heuristic == MANHATTAN
+        heuristic_weight = inf
+        for node_id in range(self.node_count):
+            x, y = xs[node_id], ys[node_id]
+            for index in range(offsets[node_id], offsets[node_id + 1]):
+                target = targets[index]
+                dx, dy = xs[target] - x, ys[target] - y
+                length = abs(dx) + abs(dy) if manhattan else hypot(dx, dy)
+                if length > 0 and weights[index] < heuristic_weight * length:
+                    heuristic_weight = weights[index] / length
+        self.heuristic_weight = 0 if heuristic_weight == inf else heuristic_weight
+
+    def neighbors(self, node_id: int) -> list:
+        """
+        Public function used to list the (target, weight) pairs of the edges leaving node_id
+        """
+        return list(self._edges(node_id))
+
+    def clear_path_nodes(self) -> None:
+        self.path_nodes.clear()
+        self.path_cost = inf
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.frontier_pushes = 0
+        self.frontier_pops = 0
+        self.stale_entries = 0
+        self.search_interrupted = False
+
+    @instrumented
+    def bfs(self, start: int, end: int) -> SearchStats:
+        """
+        Public function used to generate the path from start to end with the fewest edges
+        using Breadth-First-Search algorithm.
+
+        Parameters:
+        -----------
+        start : int
+            The node id that the algorithm starts from
+        end : int
+            The node id that the algorithm ends at
+        """
+        self.clear_path_nodes()
+        if not self._in_bounds(start, end):
+            return
+        self._breadth_first_search(start, end)
+
+    @instrumented
+    def dijkstra(self, start: int, end: int) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        Dijkstra's algorithm.
+
+        Parameters:
+        -----------
+        start : int
+            The node id that the algorithm starts from
+        end : int
+            The node id that the algorithm ends at
+        """
+        self._search(start, end, False)
+
+    @instrumented
+    def a_star(self, start: int, end: int) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        A* algorithm with the coordinate heuristic.
+
+        Parameters:
+        -----------
+        start : int
+            The node id that the algorithm starts from
+        end : int
+            The node id that the algorithm ends at
+        """
+        self._search(start, end, self.xs is not None and self.heuristic_weight > 0)
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _in_bounds(self, start: int, end: int) -> bool:
+        """
+        Private function used to determine if start and end are nodes of the graph
+        """
+        return 0 <= start < self.node_count and 0 <= end < self.node_count
+
+    def _search(self, start: int, end: int, use_heuristic: bool) -> None:
+        """
+        Private function used to run A*, or Dijkstra's algorithm when use_heuristic is False
+        """
+        self.clear_path_nodes()
+        if not self._in_bounds(start, end):
+            return
+        frontier = self._new_frontier()
+        # with integer weights the floored heuristic is still consistent, and the bucket queue needs integers
+        integral = isinstance(frontier, BucketPriorityQueue)
+        self._best_first_search(start, end, frontier, self._heuristic_to(end, integral) if use_heuristic else None)
+
+    def _new_frontier(self):
+        """
+        Private function used to create an empty frontier of the frontier_queue kind.
+        The bucket queue only takes integer priorities, with fractional weights
+        the binary heap is used instead.
+        """
+        if self.frontier_queue == BUCKET and not self._integer_weights:
+            return PriorityQueue()
+        return FRONTIER_QUEUES[self.frontier_queue]()
+
+    def _heuristic_to(self, end: int, integral: bool):
+        """
+        Private function used to create the heuristic function estimating the cost to end
+
+        Returns:
+        --------
+        <value> : callable
+            Function of a node id returning the estimated cost from it to end
+        """
+        xs = self.xs
+        ys = self.ys
+        end_x = xs[end]
+        end_y = ys[end]
+        weight = self.heuristic_weight
+
+        if self.heuristic == MANHATTAN:
+            def heuristic(node_id: int) -> float:
+                return weight * (abs(xs[node_id] - end_x) + abs(ys[node_id] - end_y))
+        else:
+            def heuristic(node_id: int) -> float:
+                return weight * hypot(xs[node_id] - end_x, ys[node_id] - end_y)
+
+        if integral:
+            def integral_heuristic(node_id: int) -> int:
+                return floor(heuristic(node_id))
+            return integral_heuristic
+        return heuristic
+
+    def _neighbors(self, node_id: int) -> array:
+        """
+        Private function used to get the targets of the edges leaving node_id
+        """
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def _edges(self, node_id: int):
+        """
+        Private function used to iterate over the (target, weight) pairs of the edges leaving node_id
+        """
+        begin, end = self.offsets[node_id], self.offsets[node_id + 1]
+        return zip(self.targets[begin:end], self.weights[begin:end])
+
+    def _cost(self, from_id: int, to_id: int) -> float:
+        """
+        Private function used to find the cost of the cheapest edge from from_id to to_id
+        """
+        targets = self.targets
+        weights = self.weights
+        return min(weights[index] for index in range(self.offsets[from_id], self.offsets[from_id + 1])
+                   if targets[index] == to_id)
+
+    def _path_node(self, node_id: int) -> int:
+        return node_id
+
+
+def load_edge_list(path: str, coordinates_path: str = None, directed: bool = True) -> CSRGraph:
+    """
+    Public function used to read a graph from an edge list file and an optional coordinate file.
+    Raises ValueError on malformed lines.
+
+    Parameters:
+    -----------
+    path : str
+        The edge list file, one "source target [weight]" line per edge
+    coordinates_path : str
+        The coordinate file, one "node x y" line per node
+    directed : bool
+        False adds the reverse of every edge as well
+
+    Returns:
+    --------
+    <value> : CSRGraph
+        The graph, with Euclidean heuristic coordinates when coordinates_path is given
+    """
+    sources = array('i')
+    targets = array('i')
+    weights = array('d')
+    node_count = 0
+    for line_number, fields in _data_lines(path):
+        if len(fields) not in (2, 3):
+            raise ValueError(f"{path}:{line_number}: expected 'source target [weight]'")
+        source, target = int(fields[0]), int(fields[1])
+        weight = float(fields[2]) if len(fields) == 3 else 1.0
+        sources.append(source)
+        targets.append(target)
+        weights.append(weight)
+        if not directed:
+            sources.append(target)
+            targets.append(source)
+            weights.append(weight)
+        node_count = max(node_count, source + 1, target + 1)
+
+    coordinates = None
+    if coordinates_path is not None:
+        coordinates = _read_coordinates(coordinates_path, 0)
+        node_count = max(node_count, len(coordinates))
+    graph = CSRGraph.from_edges(node_count, sources, targets, weights)
+    if coordinates is not None:
+        _set_coordinates(graph, coordinates, coordinates_path, 0)
+    return graph
+
+
+def load_dimacs(path: str, coordinates_path: str = None) -> CSRGraph:
+    """
+    Public function used to read a DIMACS shortest path graph ("p sp nodes arcs" and
+    "a source target weight" lines) and an optional DIMACS coordinate file ("v node x y" lines).
+    Node ids are shifted from 1-based to 0-based. Raises ValueError on malformed files.
+
+    Returns:
+    --------
+    <value> : CSRGraph
+        The graph, with Euclidean heuristic coordinates when coordinates_path is given
+    """
+    sources = array('i')
+    targets = array('i')
+    weights = array('d')
+    node_count = None
+    for line_number, fields in _data_lines(path, 'c'):
+        if fields[0] == 'p' and len(fields) == 4:
+            node_count = int(fields[2])
+        elif fields[0] == 'a' and len(fields) == 4:
+            sources.append(int(fields[1]) - 1)
+            targets.append(int(fields[2]) - 1)
+            weights.append(float(fields[3]))
+        else:
+            raise ValueError(f"{path}:{line_number}: expected a 'p sp' or 'a' line")
+    if node_count is None:
+        raise ValueError(f"{path}: no 'p sp' line")
+
+    graph = CSRGraph.from_edges(node_count, sources, targets, weights)
+    if coordinates_path is not None:
+        _set_coordinates(graph, _read_coordinates(coordinates_path, 1), coordinates_path, 1)
+    return graph
+
+
+def _data_lines(path: str, comment: str = '#%'):
+    """
+    Private function used to read the non-blank, non-comment lines of a file.
+    Yields (line number, whitespace separated fields) tuples.
+    """
+    with open(path) as data_file:
+        for line_number, line in enumerate(data_file, 1):
+            fields = line.split()
+            if fields and fields[0][0] not in comment:
+                yield line_number, fields
+
+
+def _read_coordinates(path: str, first_id: int) -> dict:
+    """
+    Private function used to read "node x y" or DIMACS "v node x y" coordinate lines
+    into a node id -> (x, y) dict, first_id is the id of the file's first node
+    """
+    coordinates = dict()
+    for line_number, fields in _data_lines(path, '#%cp'):
+        if fields[0] == 'v':
+            fields = fields[1:]
+        if len(fields) != 3:
+            raise ValueError(f"{path}:{line_number}: expected 'node x y'")
+        coordinates[int(fields[0]) - first_id] = (float(fields[1]), float(fields[2]))
+    return coordinates
+
+
+def _set_coordinates(graph: CSRGraph, coordinates: dict, path: str, first_id: int) -> None:
+    """
+    Private function used to give graph the coordinates read from path,
+    first_id is the id of the file's first node
+    """
+    xs = array('d', bytes(8 * graph.node_count))
+    ys = array('d', bytes(8 * graph.node_count))
+    for node_id, (x, y) in coordinates.items():
+        if not 0 <= node_id < graph.node_count:
+            raise ValueError(f"{path}: coordinates of node {node_id + first_id} which is not in the graph")
+        xs[node_id], ys[node_id] = x, y
+    if len(coordinates) != graph.node_count:
+        raise ValueError(f"{path}: {graph.node_count - len(coordinates)} nodes have no coordinates")
+    graph.set_coordinates(xs, ys, EUCLIDEAN)
@@ -0,0 +1,79 @@
+from array import array
+from math import inf
+
+from node import Node
+
+# direction codes stored in FlowField.direction, matching the E W N S order of Graph._neighbors
+STAY = 0  # goal nodes and nodes that cannot reach a goal
+EAST = 1
+WEST = 2
+NORTH = 3
+SOUTH = 4
+DIRECTION_OFFSETS = {EAST: (1, 0), WEST: (-1, 0), NORTH: (0, 1), SOUTH: (0, -1)}
+
+
+class FlowField:
+    def __init__(self, columns: int, rows: int):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        columns: int
+            The number of columns in the graph the field was computed on
+        rows: int
+            The number of rows in the graph the field was computed on
+        """
+        self.columns = columns
+        self.rows = rows
+        # row-major like Graph.terrain: remaining cost to the nearest goal and the first move towards it
+        self.cost = array('d', [inf]) * (columns * rows)
+        self.direction = bytearray(columns * rows)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def get_cost(self, node: Node) -> float:
+        """
+        Public function used to return the cost from node to the nearest goal,
+        inf when no goal can be reached
+        """
+        return self.cost[node.y * self.columns + node.x]
+
+    def get_direction(self, node: Node) -> int:
+        """
+        Public function used to return the direction code of the first move from node
+        """
+        return self.direction[node.y * self.columns + node.x]
+
+    def next_node(self, node: Node) -> Node:
+        """
+        Public function used to return the node an agent at node should move to next.
+        Goals and nodes that cannot reach a goal return node itself.
+        """
+        direction = self.get_direction(node)
+        if direction == STAY:
+            return node
+        dx, dy = DIRECTION_OFFSETS[direction]
+        return Node(node.x + dx, node.y + dy)
+
+    def path(self, start: Node) -> list:
+        """
+        Public function used to follow the field from start to the nearest goal in O(path length).
+
+        Returns:
+        --------
+        <value> : list
+            The nodes from start to the goal, both included,
+            or an empty list when no goal can be reached from start
+        """
+        if not (0 <= start.x < self.columns and 0 <= start.y < self.rows) or self.get_cost(start) == inf:
+            return []
+        path = [start]
+        current = start
+        while self.get_direction(current) != STAY:
+            current = self.next_node(current)
+            path.append(current)
+        return path
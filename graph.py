@@ -1,19 +1,35 @@
-from queue import Queue
 import heapq
-from random import random
-from time import sleep
+import struct
+import threading
+import zlib
 from typing import Dict
 from math import inf
+from time import perf_counter, thread_time
 
+from connectivity import ComponentIndex
+from contraction import ContractionHierarchy
+from csr_graph import CSRGraph
+from flow_field import FlowField, EAST, WEST, NORTH, SOUTH
+from hierarchical import ClusterAbstraction
+from incremental import IncrementalPlanner
+from landmarks import LandmarkIndex, LANDMARKS, MANHATTAN
 from node import Node
+from parents import DirectionParents
+from path_cache import PathCache
+from priority_queues import FRONTIER_QUEUES, HEAP, BUCKET, PriorityQueue
+from search_budget import SearchBudget
+from search_engine import SearchEngine
+from search_log import SearchLog
+from search_stats import SearchStats, instrumented
+from terrain import OPEN, BARRIER, FOREST, DESERT, TERRAIN_PATTERNS
 
 """
 Adapted from http://theory.stanford.edu/~amitp/GameProgramming/#pathfinding
 """
 
 
-class Graph:
-    def __init__(self, columns: int, rows: int):
+class Graph(SearchEngine):
+    def __init__(self, columns: int, rows: int, terrain=None):
         """
         Initiator
 
@@ -23,22 +39,49 @@ class Graph:
             The number of columns in the graph
         rows: int
             The number of rows in the graph
+        terrain: bytearray
+            Row-major terrain codes of the graph, open terrain when None
         """
         self.columns = columns
         self.rows = rows
-        self.visualize_algorithm = True
+        self.visualize_algorithm = True  # record a search_log of every search for replay
         self.startpoint_node: Node = Node(0, 0)
-        self.endpoint_node: Node = Node(39, 29)
-        self.frontier_nodes: set = set()
-        self.barrier_nodes: set = set()
+        self.endpoint_node: Node = Node(columns - 1, rows - 1)
+        self.search_log: SearchLog = None  # events of the last search, None when not recorded
         self.path_nodes: list = []
+        self.path_cost: float = inf  # cost of the last generated path, inf when no path was found
+        self.nodes_expanded: int = 0  # nodes expanded by the last search
+        self.peak_frontier: int = 0  # largest frontier size reached by the last search
+        self.frontier_pushes: int = 0  # frontier pushes of the last search, None when not counted
+        self.frontier_pops: int = 0  # frontier pops of the last search, None when not counted
+        self.stale_entries: int = 0  # stale frontier entries skipped by the last search, None when not counted
+        self.search_stats: SearchStats = None  # stats of the last search
+        self.profiler: str = None  # one of search_stats.PROFILERS to profile every search, None to not profile
+        self.budget: SearchBudget = None  # limits of the searches listed in search_budget, None for no limits
+        self.search_interrupted: bool = False  # the budget stopped the last search
+        self.search_suboptimality: float = None  # bound on path cost / optimal cost of the last anytime search
+        self._instrumenting = False
+        # row-major terrain codes, cell (x, y) is stored at y * columns + x
+        self.terrain: bytearray = bytearray(columns * rows) if terrain is None else terrain
+        # callables notified with the id of every changed node, or None when all terrain changed
+        self.terrain_listeners: list = []
+        self.terrain_version: int = 0  # incremented on every terrain or weight change
+        self.component_index = ComponentIndex(self)
+        self._snapshot: Graph = None  # last snapshot, reused while the terrain is unchanged
+        self._terrain_shared = False  # terrain is shared with a snapshot and copied before the next edit
+        self._parents_pool: list = []  # cleared DirectionParents of finished searches, shared with snapshots
+
+    @property
+    def barrier_nodes(self) -> set:
+        return self._terrain_nodes(BARRIER)
 
     """
     ##########################################################################
                                 Public Functions
     ##########################################################################
     """
-    def bfs(self, start: Node, end: Node) -> None:
+    @instrumented
+    def bfs(self, start: Node, end: Node) -> SearchStats:
         """
         Public function used to generate path from start to end using
         Breadth-First-Search algorithm.
@@ -51,60 +94,110 @@ class Graph:
             The node that the algorithm ends at
         """
         self.clear_path_nodes()
-        frontier = Queue()
-        frontier.put(start)
-        came_from = dict()
-        came_from[start] = None
-        self.frontier_nodes.add(start)
-
-        while not frontier.empty():
-            current = frontier.get()
-            self.remove_frontier_node(current)
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        self._breadth_first_search(start, end)
 
-            if current == end:
-                break
-
-            for next in self._neighbors(current):
-                if next not in came_from:
-                    frontier.put(next)
-                    came_from[next] = current
-
-                    self.frontier_nodes.add(next)
-                    self._sleep()
+    def get_node_id(self, node: Node) -> int:
+        """
+        Public function used to convert a node into the flat integer id
+        (y * columns + x) used internally by the search algorithms.
+        """
+        return node.y * self.columns + node.x
 
-        self._reconstruct_path(came_from, start, end)
+    def get_node(self, node_id: int) -> Node:
+        """
+        Public function used to convert a flat integer id back into a node
+        """
+        y, x = divmod(node_id, self.columns)
+        return Node(x, y)
 
     def add_barrier_node(self, node: Node) -> None:
-        self.barrier_nodes.add(node)
-
-    def remove_frontier_node(self, node: Node) -> None:
-        try:
-            self.frontier_nodes.remove(node)
-        except KeyError:
-            pass
+        self._set_terrain(node, BARRIER)
 
     def clear_path_nodes(self) -> None:
         self.path_nodes.clear()
+        self.path_cost = inf
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.frontier_pushes = 0
+        self.frontier_pops = 0
+        self.stale_entries = 0
+        self.search_interrupted = False
+        self.search_suboptimality = None
 
-    def clear_frontier_nodes(self) -> None:
-        self.frontier_nodes.clear()
+    def snapshot(self) -> 'Graph':
+        """
+        Public function used to take an immutable, versioned copy of the graph, for searches
+        that run while the terrain keeps being edited, e.g. on another thread.
+        The snapshot shares the terrain buffer read-only (copy-on-write): the first edit after
+        a snapshot copies the terrain once, so taking a snapshot and editing stay lock free.
+        Snapshots are reused while the terrain and settings are unchanged, keeping their
+        precomputed indexes. A snapshot is never changed once taken: when only settings such as
+        visualize_algorithm changed, a new snapshot shares the terrain view of the last one.
+        The D* Lite planner and the HPA* and landmark indexes of a weighted graph move on from
+        snapshot to snapshot and are repaired with the edits made in between.
+        A snapshot is a graph of its own that stores the results of searches run on it,
+        so only one search should run on it at a time.
+
+        Returns:
+        --------
+        <value> : Graph
+            Graph of the same class whose terrain is fixed at terrain_version
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.terrain_version == self.terrain_version:
+            if snapshot._snapshot_settings() == self._snapshot_settings():
+                return snapshot
+            terrain = snapshot.terrain
+        else:
+            terrain = memoryview(self.terrain).toreadonly()
+            self._terrain_shared = True
+        snapshot = type(self)(self.columns, self.rows, terrain)
+        snapshot.terrain_version = self.terrain_version
+        snapshot.terrain_listeners.clear()
+        snapshot.component_index = self.component_index.copy(snapshot)
+        snapshot._parents_pool = self._parents_pool
+        self._copy_settings(snapshot)
+        self._snapshot = snapshot
+        return snapshot
 
     """
     ##########################################################################
                                 Private Functions
     ##########################################################################
     """
-    def _neighbors(self, node: Node):
+    def _neighbors(self, node_id: int) -> list:
+        """
+        Private function used to filter which neighboring node ids are valid.
+        """
+        terrain = self.terrain
+        return [neighbor for neighbor in self._adjacent(node_id) if terrain[neighbor] != BARRIER]
+
+    def _edges(self, node_id: int) -> list:
+        """
+        Private function used to list the (neighbor id, move cost) pairs of the moves from node_id
+        """
+        return [(neighbor, 1) for neighbor in self._neighbors(node_id)]
+
+    def _adjacent(self, node_id: int) -> list:
         """
-        Private function used to filter which neighboring nodes are valid.
+        Private function used to list the in-bounds neighbor ids of node_id, passable or not
         """
-        x = node.x
-        y = node.y
-        neighbors_list = [Node(x + 1, y), Node(x - 1, y), Node(x, y + 1), Node(x, y - 1)]  # E W N S
+        columns = self.columns
+        y, x = divmod(node_id, columns)
+        neighbors_list = []
+        if x + 1 < columns: neighbors_list.append(node_id + 1)  # E
+        if x > 0: neighbors_list.append(node_id - 1)  # W
+        if y + 1 < self.rows: neighbors_list.append(node_id + columns)  # N
+        if y > 0: neighbors_list.append(node_id - columns)  # S
         if (x + y) % 2 == 0: neighbors_list.reverse()  # S N W E
-        results = filter(self._in_bounds, neighbors_list)
-        results = filter(self._is_passable, results)
-        return results
+        return neighbors_list
+
+    def _path_node(self, node_id: int) -> Node:
+        return self.get_node(node_id)
 
     def _in_bounds(self, node: Node) -> bool:
         """
@@ -112,49 +205,138 @@ class Graph:
         """
         return 0 <= node.x < self.columns and 0 <= node.y < self.rows
 
-    def _is_passable(self, node: Node) -> bool:
+    def _is_passable(self, node_id: int) -> bool:
         """
         Private function used to determine if node is accessible
         """
-        return node not in self.barrier_nodes
+        return self.terrain[node_id] != BARRIER
 
-    def _reconstruct_path(self, came_from: Dict[Node, Node], start: Node, end: Node) -> None:
+    def _cost(self, from_id: int, to_id: int) -> float:
         """
-        Private function used to construct the path from a pathfinding algorithm output
+        Private function used to determine the cost from from_id to to_id.
+        Every move costs the same in an unweighted graph.
         """
-        self.clear_frontier_nodes()
-        current = end
-        try:
-            while current != start:
-                self.path_nodes.append(current)
-                current = came_from[current]
-            self.path_nodes.reverse()
-        except KeyError:
-            pass
+        return 1
+
+    def _search_endpoints(self, start: Node, end: Node):
+        """
+        Private function used to convert the start and end nodes of a search into node ids.
+        Returns None when either node lies outside of the graph or when the component index
+        shows that end cannot be reached, so no search has to flood start's component to find out.
+        """
+        self._start_search_log()
+        if not (self._in_bounds(start) and self._in_bounds(end)):
+            return None
+        start = self.get_node_id(start)
+        end = self.get_node_id(end)
+        if not self._connected(start, end):
+            return None
+        if self.budget is not None:
+            self.budget.start()  # lazily built indexes such as the component labels do not use up the time limit
+        return start, end
+
+    def _connected(self, start: int, end: int) -> bool:
+        """
+        Private function used to determine up front if end can be reached from start
+        """
+        return self.component_index.connected(start, end)
 
+    def _acquire_parents(self, start: int) -> DirectionParents:
+        """
+        Private function used to get cleared parent storage for a search from start.
+        The storage of finished searches is pooled and shared with the snapshots of the graph,
+        so only the first search allocates arrays as large as the grid; searches running at
+        the same time each get storage of their own.
+        """
         try:
-            self.path_nodes.remove(end)
-        except ValueError:
-            pass
+            parents = self._parents_pool.pop()
+        except IndexError:
+            parents = DirectionParents(self.columns, self.columns * self.rows)
+        parents.start(start)
+        return parents
+
+    def _release_parents(self, parents: DirectionParents) -> None:
+        """
+        Private function used to clear the storage of a finished search and return it to the pool
+        """
+        parents.reset()
+        self._parents_pool.append(parents)
 
-    def _sleep(self) -> None:
+    def _start_search_log(self) -> None:
         """
-        Private function used to halt the program so the UI can update
+        Private function used to give the search that is about to run a fresh log.
+        A new log object is created every time, so a log handed to the UI is never appended to.
         """
-        if self.visualize_algorithm:
-            length = len(self.frontier_nodes)
-            threshold = 0.80
-            if length > 10:
-                threshold = 0.91
-            elif length > 20:
-                threshold = 0.96
+        self.search_log = SearchLog(self.columns, self.rows) if self.visualize_algorithm else None
 
-            if random() >= threshold:
-                sleep(0.001)
+    def _set_terrain(self, node: Node, code: int) -> None:
+        """
+        Private function used to store a terrain code for node.
+        Nodes outside of the graph are ignored.
+        """
+        if self._in_bounds(node):
+            node_id = self.get_node_id(node)
+            if self.terrain[node_id] != code:
+                self._writable_terrain()[node_id] = code
+                self._notify_terrain_listeners(node_id)
+
+    def _writable_terrain(self):
+        """
+        Private function used to get the terrain for an edit, copying it first when a snapshot shares it
+        """
+        if self._terrain_shared:
+            self.terrain = bytearray(self.terrain)
+            self._terrain_shared = False
+        return self.terrain
+
+    def _copy_settings(self, snapshot: 'Graph') -> None:
+        """
+        Private function used to give a new snapshot the search settings of this graph
+        """
+        snapshot.visualize_algorithm = self.visualize_algorithm
+        snapshot.profiler = self.profiler
+
+    def _snapshot_settings(self) -> tuple:
+        """
+        Private function used to list the settings _copy_settings gives a snapshot
+        """
+        return self.visualize_algorithm, self.profiler
+
+    def _notify_terrain_listeners(self, node_id) -> None:
+        """
+        Private function used to tell every terrain listener that node_id changed.
+        A node_id of None means the whole terrain may have changed.
+        """
+        self.terrain_version += 1
+        for listener in self.terrain_listeners:
+            listener(node_id)
+
+    def _terrain_nodes(self, code: int) -> set:
+        """
+        Private function used to collect every node with the given terrain code
+        """
+        nodes = set()
+        index = self._find_terrain(code)
+        while index != -1:
+            y, x = divmod(index, self.columns)
+            nodes.add(Node(x, y))
+            index = self._find_terrain(code, index + 1)
+        return nodes
+
+    def _find_terrain(self, code: int, start: int = 0) -> int:
+        """
+        Private function used to find the first node id from start on with the given
+        terrain code, -1 when there is none
+        """
+        try:
+            return self.terrain.find(bytes((code,)), start)
+        except AttributeError:
+            match = TERRAIN_PATTERNS[code].search(self.terrain, start)
+            return match.start() if match else -1
 
 
 class WeightedGraph(Graph):
-    def __init__(self, columns: int, rows: int):
+    def __init__(self, columns: int, rows: int, terrain=None):
         """
         Initiator
 
@@ -164,23 +346,59 @@ class WeightedGraph(Graph):
             The number of columns in the graph
         rows: int
             The number of rows in the graph
+        terrain: bytearray
+            Row-major terrain codes of the graph, open terrain when None
         """
-        super().__init__(columns, rows)
-        self.forest_nodes = set()
-        self.desert_nodes = set()
+        super().__init__(columns, rows, terrain)
         self.default_weight: float = 1
         self.forest_weight: float = 2
         self.desert_weight: float = 3
+        self.cluster_size: int = 16  # cluster width and height used by hierarchical_a_star
+        self._cluster_abstraction = None
+        self._incremental_planner = None
+        self._contraction_hierarchy: ContractionHierarchy = None
+        self._contraction_version = None  # terrain_version the contraction hierarchy describes
+        self.heuristic: str = MANHATTAN  # one of landmarks.HEURISTICS, used by a_star
+        self.landmark_count: int = 8  # landmarks of the LANDMARKS heuristic
+        self.anytime_weight: float = 3.0  # heuristic inflation of the first anytime_a_star path
+        self.anytime_weight_step: float = 0.5  # inflation removed after every anytime_a_star path
+        self._landmark_index: LandmarkIndex = None
+        self.path_cache = PathCache()
+        self.frontier_queue: str = HEAP  # one of FRONTIER_QUEUES, used by a_star and dijkstra
+        self._origin: WeightedGraph = None  # graph this snapshot was taken of, None for a live graph
+        # the snapshot holding the planner and indexes of a live graph, and the edits made since its terrain_version
+        self._index_lock = threading.Lock()
+        self._index_holder: WeightedGraph = None
+        self._edit_log: list = []  # (terrain_version, node id or None) of every change after the holder's version
+        self.terrain_listeners.append(self._log_edit)
+
+    @property
+    def forest_nodes(self) -> set:
+        return self._terrain_nodes(FOREST)
+
+    @property
+    def desert_nodes(self) -> set:
+        return self._terrain_nodes(DESERT)
+
+    @property
+    def contraction_hierarchy(self) -> ContractionHierarchy:
+        """
+        The contraction hierarchy of the current terrain, None when it has not been built
+        """
+        if self._contraction_version != self.terrain_version:
+            return None
+        return self._contraction_hierarchy
 
     """
     ##########################################################################
                                 Public Functions
     ##########################################################################
     """
-    def a_star(self, start: Node, end: Node) -> None:
+    @instrumented
+    def a_star(self, start: Node, end: Node) -> SearchStats:
         """
         Public function used to generate path from start to end using
-        A* algorithm.
+        A* algorithm, guided by the heuristic selected with the heuristic attribute.
 
         Parameters:
         -----------
@@ -190,38 +408,295 @@ class WeightedGraph(Graph):
             The node that the algorithm ends at
         """
         self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        self._best_first_search(start, end, self._new_frontier(), self._heuristic_to(end))
+
+    @instrumented
+    def dijkstra(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        Dijkstra's algorithm.
+
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        self._best_first_search(start, end, self._new_frontier(), None)
+
+    @instrumented
+    def anytime_a_star(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end using anytime repairing A*
+        (ARA*, Likhachev, Gordon and Thrun 2003). A first path is found quickly with the heuristic
+        inflated by anytime_weight, then the inflation is lowered by anytime_weight_step and the
+        path improved, reusing the earlier search, until it is optimal or the budget is exhausted.
+        The last path found is kept; search_suboptimality bounds its cost relative to the optimum.
+
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        heuristic = self._heuristic_to(end)
+        weight = max(1.0, self.anytime_weight)
+        came_from = self._acquire_parents(start)
+        cost_so_far = came_from.costs()
+        cost_so_far[start] = 0
+        open_keys = {start: weight * heuristic(start)}  # queued node -> key, older heap entries are stale
+        frontier = [(open_keys[start], start)]
+        closed = set()
+        inconsistent = set()  # closed nodes reached more cheaply, queued again with the next weight
+        budget = self.budget
+        log = self.search_log
+        if log is not None:
+            log.frontier(start)
+        solution = None
+        nodes_expanded = 0
+        peak_frontier = 1
+        pushes = 1
+        pops = 0
+        stale_entries = 0
+
+        while True:
+            # expand until the path to end is within weight of optimal
+            while frontier:
+                key, current = frontier[0]
+                if open_keys.get(current) != key:
+                    heapq.heappop(frontier)
+                    pops += 1
+                    stale_entries += 1
+                    continue
+                if cost_so_far[end] <= key:
+                    break
+                if budget is not None and budget.exhausted(nodes_expanded):
+                    self.search_interrupted = True
+                    break
+                heapq.heappop(frontier)
+                pops += 1
+                del open_keys[current]
+                closed.add(current)
+                if log is not None:
+                    log.expansion(current)
+
+                nodes_expanded += 1
+                current_cost = cost_so_far[current]
+                for next, cost in self._edges(current):
+                    new_cost = current_cost + cost
+                    if new_cost < cost_so_far[next]:
+                        cost_so_far[next] = new_cost
+                        came_from.set(next, current)
+                        if next in closed:
+                            inconsistent.add(next)
+                        else:
+                            open_keys[next] = new_cost + weight * heuristic(next)
+                            heapq.heappush(frontier, (open_keys[next], next))
+                            pushes += 1
+                            if log is not None:
+                                log.frontier(next)
+                peak_frontier = max(peak_frontier, len(open_keys))
+
+            if self.search_interrupted or cost_so_far[end] == inf:
+                break
+            solution = list(came_from.walk(end))
+            # no queued node can lead to a path cheaper than lower_bound
+            lower_bound = min((cost_so_far[node] + heuristic(node) for node in (*open_keys, *inconsistent)),
+                              default=inf)
+            self.search_suboptimality = max(1.0, min(weight, cost_so_far[end] / lower_bound)) if lower_bound else 1.0
+            if self.search_suboptimality <= 1:
+                break
+            weight = max(1.0, weight - self.anytime_weight_step)
+            open_keys = {node: cost_so_far[node] + weight * heuristic(node) for node in (*open_keys, *inconsistent)}
+            frontier = [(key, node) for node, key in open_keys.items()]
+            heapq.heapify(frontier)
+            closed = set()
+            inconsistent = set()
+
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.frontier_pushes = pushes
+        self.frontier_pops = pops
+        self.stale_entries = stale_entries
+        self._release_parents(came_from)
+        if solution is not None:
+            self._set_path(solution, start)
+
+    @instrumented
+    def jump_point_search(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        Jump Point Search on the 4-connected grid.
+
+        Straight runs of cells are scanned without being pushed to the frontier and
+        only jump points (turns, forced neighbors and the end node) are expanded.
+        Canonical paths move vertically before moving horizontally, so horizontal
+        jumps stop where a barrier behind opens up a forced vertical neighbor and
+        vertical jumps stop where a horizontal scan finds a jump point.
+        Jump Point Search needs uniform move costs: when forest or desert nodes
+        weigh differently than the default weight the search falls back to A*.
+
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        if not self._is_uniform_cost():
+            self.a_star(start, end)
+            return
+
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
         frontier = PriorityQueue()
         frontier.put(start, 0)
         came_from = dict()
         cost_so_far = dict()
         came_from[start] = None
         cost_so_far[start] = 0
-        self.frontier_nodes.add(start)
+        budget = self.budget
+        log = self.search_log
+        if log is not None:
+            log.frontier(start)
+        nodes_expanded = 0
+        peak_frontier = 1
+        pushes = 1
+        pops = 0
+        stale_entries = 0
 
         while not frontier.empty():
+            priority = frontier.peek_priority()
             current = frontier.get()
-            self.remove_frontier_node(current)
+            pops += 1
+            if priority > cost_so_far[current] + self._heuristic(current, end) * self.default_weight:
+                stale_entries += 1
+                continue  # stale entry, current was reached more cheaply after it was queued
+            if log is not None:
+                log.expansion(current)
 
             if current == end:
                 break
+            if budget is not None and budget.exhausted(nodes_expanded):
+                self.search_interrupted = True
+                break
 
-            for next in self._neighbors(current):
-                new_cost = cost_so_far[current] + self._cost(current, next)
+            nodes_expanded += 1
+            for next in self._jump_successors(current, came_from[current], end):
+                new_cost = cost_so_far[current] + self._heuristic(current, next) * self.default_weight
                 if next not in cost_so_far or new_cost < cost_so_far[next]:
                     cost_so_far[next] = new_cost
-                    priority = new_cost + self._heuristic(next, end)
+                    priority = new_cost + self._heuristic(next, end) * self.default_weight
                     frontier.put(next, priority)
+                    pushes += 1
                     came_from[next] = current
+                    if log is not None:
+                        log.frontier(next)
+            peak_frontier = max(peak_frontier, len(frontier))
+
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.frontier_pushes = pushes
+        self.frontier_pops = pops
+        self.stale_entries = stale_entries
+        if self.search_interrupted:
+            return
+        if end in came_from:
+            came_from = self._interpolate_jump_points(came_from, start, end)
+        self._reconstruct_path(came_from, start, end)
+
+    @instrumented
+    def bidirectional_dijkstra(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        Dijkstra's algorithm searching from both ends until the searches meet.
+
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self._bidirectional_search(start, end, False)
+
+    @instrumented
+    def bidirectional_a_star(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end using
+        A* searching from both ends until the searches meet.
+
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self._bidirectional_search(start, end, True)
 
-                    self.frontier_nodes.add(next)
-                    self._sleep()
+    @instrumented
+    def hierarchical_a_star(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate a near optimal path from start to end using
+        hierarchical path-finding A* (HPA*). The cluster abstraction is built on first use
+        and afterwards only clusters touched by terrain edits are recomputed.
 
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        self._borrow_indexes()
+        abstraction = self._cluster_abstraction
+        if abstraction is None or abstraction.cluster_size != self.cluster_size:
+            if abstraction is not None:
+                self.terrain_listeners.remove(abstraction._terrain_changed)
+            abstraction = self._cluster_abstraction = ClusterAbstraction(self, self.cluster_size)
+
+        path = abstraction.find_path(start, end)
+        self.nodes_expanded = abstraction.nodes_expanded
+        self.frontier_pushes = self.frontier_pops = self.stale_entries = None
+        came_from = dict()
+        if path is not None:
+            came_from = dict(zip(path[1:], path))
+            came_from[start] = None
         self._reconstruct_path(came_from, start, end)
 
-    def dijkstra(self, start: Node, end: Node) -> None:
+    @instrumented
+    def d_star_lite(self, start: Node, end: Node) -> SearchStats:
         """
         Public function used to generate path from start to end using
-        Dijkstra's algorithm.
+        D* Lite incremental replanning. The search state is kept between calls, so after
+        terrain edits or a new start only the affected part of the search is repaired.
+        Changing end or the weights starts a fresh search. A search stopped by the budget
+        returns no path and is continued by the next call.
 
         Parameters:
         -----------
@@ -231,106 +706,615 @@ class WeightedGraph(Graph):
             The node that the algorithm ends at
         """
         self.clear_path_nodes()
-        frontier = PriorityQueue()
-        frontier.put(start, 0)
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        self._borrow_indexes()
+        if self._incremental_planner is None:
+            self._incremental_planner = IncrementalPlanner(self)
+
+        path = self._incremental_planner.plan(start, end, self.budget)
+        self.nodes_expanded = self._incremental_planner.nodes_expanded
+        self.search_interrupted = self._incremental_planner.interrupted
+        self.frontier_pushes = self.frontier_pops = self.stale_entries = None
         came_from = dict()
-        cost_so_far = dict()
-        came_from[start] = None
-        cost_so_far[start] = 0
-        self.frontier_nodes.add(start)
+        if path is not None:
+            came_from = dict(zip(path[1:], path))
+            came_from[start] = None
+        self._reconstruct_path(came_from, start, end)
 
-        while not frontier.empty():
-            current = frontier.get()
-            self.remove_frontier_node(current)
+    @instrumented
+    def contraction_hierarchies(self, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end with a
+        Contraction Hierarchies query. The hierarchy is built on first use and rebuilt on the
+        first query after a terrain or weight change; building is slow, so this pays off on maps
+        that stay unchanged for many queries.
 
-            if current == end:
-                break
+        Parameters:
+        -----------
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+        hierarchy = self.contraction_hierarchy
+        if hierarchy is None:
+            hierarchy = self.build_contraction_hierarchy()
+
+        path = hierarchy.find_path(start, end)
+        self.nodes_expanded = hierarchy.nodes_expanded
+        self.frontier_pushes = self.frontier_pops = self.stale_entries = None
+        came_from = dict()
+        if path is not None:
+            came_from = dict(zip(path[1:], path))
+            came_from[start] = None
+        self._reconstruct_path(came_from, start, end)
+
+    def build_contraction_hierarchy(self) -> ContractionHierarchy:
+        """
+        Public function used to preprocess the current terrain and weights for contraction_hierarchies
+
+        Returns:
+        --------
+        <value> : ContractionHierarchy
+            The new hierarchy, its build_time and shortcuts describe the preprocessing
+        """
+        hierarchy = ContractionHierarchy.build(CSRGraph.from_grid(self))
+        hierarchy.checksum = self._terrain_checksum()
+        self._contraction_hierarchy = hierarchy
+        self._contraction_version = self.terrain_version
+        return hierarchy
+
+    def save_contraction_hierarchy(self, path: str) -> None:
+        """
+        Public function used to write the contraction hierarchy of the current terrain to a file,
+        building it first when needed
+        """
+        hierarchy = self.contraction_hierarchy
+        if hierarchy is None:
+            hierarchy = self.build_contraction_hierarchy()
+        hierarchy.save(path)
+
+    def load_contraction_hierarchy(self, path: str) -> None:
+        """
+        Public function used to read a contraction hierarchy written by save_contraction_hierarchy.
+        Raises ValueError when the file is not a hierarchy of the current terrain and weights.
+        """
+        try:
+            self.set_contraction_hierarchy(ContractionHierarchy.load(path))
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+
+    def set_contraction_hierarchy(self, hierarchy: ContractionHierarchy) -> None:
+        """
+        Public function used to make contraction_hierarchies use an existing hierarchy,
+        e.g. one built by another graph with the same terrain.
+        Raises ValueError when hierarchy does not describe the current terrain and weights.
+        """
+        if hierarchy.node_count != self.columns * self.rows or hierarchy.checksum != self._terrain_checksum():
+            raise ValueError("contraction hierarchy of a different map or different weights")
+        self._contraction_hierarchy = hierarchy
+        self._contraction_version = self.terrain_version
+
+    def update_landmarks(self) -> LandmarkIndex:
+        """
+        Public function used to select landmarks and compute their tables for the LANDMARKS
+        heuristic, when the terrain, weights or landmark_count changed since the last update.
+        a_star does this itself; calling it beforehand keeps the work out of the first search.
+
+        Returns:
+        --------
+        <value> : LandmarkIndex
+            The up to date landmark index
+        """
+        self._borrow_indexes()
+        index = self._landmark_index
+        if index is None or index.count != self.landmark_count:
+            if index is not None:
+                self.terrain_listeners.remove(index._terrain_changed)
+            index = self._landmark_index = LandmarkIndex(self, self.landmark_count)
+        index.update()
+        return index
+
+    def flow_field(self, goals) -> FlowField:
+        """
+        Public function used to compute the remaining cost to the nearest goal and the
+        first move towards it for every node in a single multi-source Dijkstra pass.
+        Many agents heading to the same goals can then extract their paths with
+        FlowField.path in O(path length). The field is not updated by later terrain changes.
+
+        Parameters:
+        -----------
+        goals : Iterable[Node]
+            The nodes the agents are heading to
+        Returns:
+        --------
+        <value> : FlowField
+            Per-node cost and direction field
+        """
+        columns = self.columns
+        field = FlowField(columns, self.rows)
+        cost = field.cost
+        direction = field.direction
+        # move from a neighbor into current -> direction code, vertical codes win when columns == 1
+        move_directions = {1: EAST, -1: WEST, columns: NORTH, -columns: SOUTH}
+
+        frontier = []
+        for goal in goals:
+            if self._in_bounds(goal):
+                goal = self.get_node_id(goal)
+                if self._is_passable(goal) and cost[goal] != 0:
+                    cost[goal] = 0
+                    frontier.append((0, goal))
+        heapq.heapify(frontier)
+
+        while frontier:
+            priority, current = heapq.heappop(frontier)
+            if priority > cost[current]:
+                continue  # stale entry
 
             for next in self._neighbors(current):
-                new_cost = cost_so_far[current] + self._cost(current, next)
-                if new_cost < cost_so_far.get(next, inf):
-                    cost_so_far[next] = new_cost
-                    priority = new_cost
-                    frontier.put(next, priority)
-                    came_from[next] = current
+                # moving from next into current costs the weight of current
+                new_cost = priority + self._cost(next, current)
+                if new_cost < cost[next]:
+                    cost[next] = new_cost
+                    direction[next] = move_directions[current - next]
+                    heapq.heappush(frontier, (new_cost, next))
+        return field
 
-                    self.frontier_nodes.add(next)
-                    self._sleep()
+    def cached_search(self, algorithm: str, start: Node, end: Node) -> SearchStats:
+        """
+        Public function used to generate path from start to end with the named algorithm,
+        reusing the result of an identical earlier query when the terrain and the search
+        settings have not changed since. Cache hits report zero nodes expanded and are marked cached in the stats.
 
-        self._reconstruct_path(came_from, start, end)
+        Parameters:
+        -----------
+        algorithm : str
+            Name of the search function, e.g. 'a_star'
+        start : Node
+            The node that the algorithm starts from
+        end : Node
+            The node that the algorithm ends at
+        """
+        wall_begin, cpu_begin = perf_counter(), thread_time()
+        key = (algorithm, start, end) + self._search_settings()
+        result = self.path_cache.get(self.terrain_version, key)
+        if result is not None:
+            self.clear_path_nodes()
+            path_nodes, self.path_cost = result
+            self.path_nodes.extend(path_nodes)
+            self._start_search_log()
+            if self.search_log is not None:
+                self.search_log.path(list(map(self.get_node_id, path_nodes)))
+            self.search_stats = SearchStats(
+                algorithm=algorithm,
+                pushes=0,
+                pops=0,
+                stale_entries=0,
+                path_length=len(path_nodes) + (start != end) if self.path_cost != inf else None,
+                path_cost=self.path_cost,
+                wall_time=perf_counter() - wall_begin,
+                cpu_time=thread_time() - cpu_begin,
+                cached=True,
+            )
+            return self.search_stats
+
+        version = self.terrain_version
+        stats = getattr(self, algorithm)(start, end)
+        if not stats.interrupted:
+            self.path_cache.put(version, key, (tuple(self.path_nodes), self.path_cost))
+        return stats
+
+    def set_weights(self, forest_weight: float, desert_weight: float, default_weight: float = None) -> None:
+        """
+        Public function used to change the terrain weights. Changed weights count as a terrain
+        change, so cached paths and precomputed search structures are invalidated.
+        """
+        if default_weight is None:
+            default_weight = self.default_weight
+        weights = (default_weight, forest_weight, desert_weight)
+        if weights != (self.default_weight, self.forest_weight, self.desert_weight):
+            self.default_weight, self.forest_weight, self.desert_weight = weights
+            self._notify_terrain_listeners(None)
 
     def add_forest_node(self, node: Node) -> None:
-        self.forest_nodes.add(node)
+        self._set_terrain(node, FOREST)
 
     def add_desert_node(self, node: Node) -> None:
-        self.desert_nodes.add(node)
+        self._set_terrain(node, DESERT)
 
     def remove_terrain_nodes(self, node: Node) -> None:
-        for terrain in self.barrier_nodes, self.desert_nodes, self.forest_nodes:
-            try:
-                terrain.remove(node)
-            except KeyError:
-                pass
+        self._set_terrain(node, OPEN)
 
     def clear_terrain_nodes(self) -> None:
-        for terrain in self.barrier_nodes, self.desert_nodes, self.forest_nodes:
-            terrain.clear()
+        self._writable_terrain()[:] = bytes(len(self.terrain))
+        self._notify_terrain_listeners(None)
 
     """
     ##########################################################################
                                 Private Functions
     ##########################################################################
     """
-    def _cost(self, from_node: Node, to_node: Node) -> float:
+    def _copy_settings(self, snapshot: 'WeightedGraph') -> None:
         """
-        Private function used to determine the cost from from_node to to_node.
-        Currently only determined by the to_node.
+        Private function used to give a new snapshot the weights and search settings of this graph,
+        and the contraction hierarchy when it describes the snapshot's terrain
         """
-        weight = self.default_weight
-        if to_node in self.forest_nodes:
-            weight = self.forest_weight
-        if to_node in self.desert_nodes:
-            weight = self.desert_weight
-        return weight
+        super()._copy_settings(snapshot)
+        snapshot.default_weight, snapshot.forest_weight, snapshot.desert_weight = \
+            self.default_weight, self.forest_weight, self.desert_weight
+        snapshot.cluster_size = self.cluster_size
+        snapshot.heuristic = self.heuristic
+        snapshot.landmark_count = self.landmark_count
+        snapshot.anytime_weight = self.anytime_weight
+        snapshot.anytime_weight_step = self.anytime_weight_step
+        snapshot.frontier_queue = self.frontier_queue
+        if self.contraction_hierarchy is not None:
+            snapshot._contraction_hierarchy = self._contraction_hierarchy
+            snapshot._contraction_version = snapshot.terrain_version
+        snapshot._origin = self
 
-    """
-    ##########################################################################
-                                Static Functions
-    ##########################################################################
-    """
-    @staticmethod
-    def _heuristic(n1: Node, n2: Node) -> float:
+    def _snapshot_settings(self) -> tuple:
         """
-         Private static function used to calculate
+        Private function used to list the settings _copy_settings gives a snapshot,
+        the contraction hierarchy follows the terrain and weights
+        """
+        return super()._snapshot_settings() + self._search_settings()
+
+    def _borrow_indexes(self) -> None:
+        """
+        Private function used by a snapshot to take over the D* Lite planner, cluster abstraction
+        and landmark index of the last snapshot of the same graph that used them, and to hand them
+        the edits made in between, so they are repaired instead of built again for every snapshot.
+        Called on the searching thread, searches on the snapshots of a graph have to run one
+        after another, as they do in the UI.
+        """
+        origin = self._origin
+        if origin is None:
+            return
+        with origin._index_lock:
+            holder = origin._index_holder
+            if holder is self or (holder is not None and holder.terrain_version > self.terrain_version):
+                return
+            if holder is None:
+                # edits are only logged once there is a holder, so the first one has to be current
+                if self.terrain_version == origin.terrain_version:
+                    origin._index_holder = self
+                return
+            origin._index_holder = self
+            changed = {node_id for version, node_id in origin._edit_log if version <= self.terrain_version}
+            origin._edit_log = [edit for edit in origin._edit_log if edit[0] > self.terrain_version]
+
+        for name in ('_incremental_planner', '_cluster_abstraction', '_landmark_index'):
+            index = getattr(holder, name)
+            if index is None or getattr(self, name) is not None:
+                continue
+            setattr(holder, name, None)
+            holder.terrain_listeners.remove(index._terrain_changed)
+            index.graph = self
+            setattr(self, name, index)
+            self.terrain_listeners.append(index._terrain_changed)
+            for node_id in ([None] if None in changed else changed):
+                index._terrain_changed(node_id)
+
+    def _log_edit(self, node_id) -> None:
+        """
+        Private function used as terrain listener of a live graph, recording the changes its
+        snapshots' planner and indexes have not seen yet
+        """
+        with self._index_lock:
+            if self._index_holder is not None:
+                self._edit_log.append((self.terrain_version, node_id))
+
+    def _search_settings(self) -> tuple:
+        """
+        Private function used to list every setting that can change the path a search returns,
+        part of the cached_search key
+        """
+        return (self.default_weight, self.forest_weight, self.desert_weight, self.cluster_size,
+                self.heuristic, self.landmark_count, self.anytime_weight, self.anytime_weight_step,
+                self.frontier_queue)
+
+    def _edges(self, node_id: int) -> list:
+        """
+        Private function used to list the (neighbor id, move cost) pairs of the moves from node_id,
+        a move costs the weight of the node moved into
+        """
+        terrain = self.terrain
+        costs = self._cell_costs()
+        return [(neighbor, costs[terrain[neighbor]]) for neighbor in self._adjacent(node_id)
+                if terrain[neighbor] != BARRIER]
+
+    def _cost(self, from_id: int, to_id: int) -> float:
+        """
+        Private function used to determine the cost from from_id to to_id.
+        Currently only determined by the to_id node.
+        """
+        code = self.terrain[to_id]
+        if code == FOREST:
+            return self.forest_weight
+        if code == DESERT:
+            return self.desert_weight
+        return self.default_weight
+
+    def _bidirectional_search(self, start: Node, end: Node, use_heuristic: bool) -> None:
+        """
+        Private function used to run a forward search from start and a backward search
+        from end, always expanding the side with the smaller frontier.
+
+        The cost of a move is the weight of the node moved into, so the backward search
+        relaxes an edge next -> current with _cost(next, current) and cost_to_end holds
+        the exact remaining cost to end. With use_heuristic the searches use the average
+        potential (h(n, end) - h(n, start)) / 2, which keeps the forward and backward keys
+        consistent with each other. In both modes the search stops once the two smallest
+        frontier keys add up to the best meeting cost found so far.
+        """
+        self.clear_path_nodes()
+        endpoints = self._search_endpoints(start, end)
+        if endpoints is None:
+            return
+        start, end = endpoints
+
+        def potential(node_id: int) -> float:
+            if not use_heuristic:
+                return 0
+            return (self._heuristic(node_id, end) - self._heuristic(node_id, start)) / 2
+
+        forward = PriorityQueue()
+        forward.put(start, potential(start))
+        backward = PriorityQueue()
+        backward.put(end, -potential(end))
+        came_from = {start: None}
+        came_to = {end: None}
+        cost_so_far = {start: 0}
+        cost_to_end = {end: 0}
+        budget = self.budget
+        log = self.search_log
+        if log is not None:
+            log.frontier(start)
+            log.frontier(end)
+        nodes_expanded = 0
+        peak_frontier = 2
+        pushes = 2
+        pops = 0
+        stale_entries = 0
+        best_cost = 0 if start == end else inf
+        meeting = start if start == end else None
+
+        while not forward.empty() and not backward.empty():
+            if forward.peek_priority() + backward.peek_priority() >= best_cost:
+                break
+
+            is_forward = len(forward) <= len(backward)
+            if is_forward:
+                frontier, costs, other_costs, parents, sign = forward, cost_so_far, cost_to_end, came_from, 1
+            else:
+                frontier, costs, other_costs, parents, sign = backward, cost_to_end, cost_so_far, came_to, -1
+            priority = frontier.peek_priority()
+            current = frontier.get()
+            pops += 1
+            if priority > costs[current] + sign * potential(current):
+                stale_entries += 1
+                continue  # stale entry, current was reached more cheaply after it was queued
+            if log is not None:
+                log.expansion(current)
+            if budget is not None and budget.exhausted(nodes_expanded):
+                self.search_interrupted = True
+                break
+
+            nodes_expanded += 1
+            for next in self._neighbors(current):
+                if is_forward:
+                    new_cost = costs[current] + self._cost(current, next)
+                else:
+                    new_cost = costs[current] + self._cost(next, current)
+                if new_cost < costs.get(next, inf):
+                    costs[next] = new_cost
+                    frontier.put(next, new_cost + sign * potential(next))
+                    pushes += 1
+                    parents[next] = current
+                    if next in other_costs and new_cost + other_costs[next] < best_cost:
+                        best_cost = new_cost + other_costs[next]
+                        meeting = next
+                    if log is not None:
+                        log.frontier(next)
+            peak_frontier = max(peak_frontier, len(forward) + len(backward))
+
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.frontier_pushes = pushes
+        self.frontier_pops = pops
+        self.stale_entries = stale_entries
+        if self.search_interrupted:
+            return
+        if meeting is not None:
+            # continue the forward tree along the backward search's path to end
+            current = meeting
+            while came_to[current] is not None:
+                came_from[came_to[current]] = current
+                current = came_to[current]
+        self._reconstruct_path(came_from, start, end)
+
+    def _new_frontier(self):
+        """
+        Private function used to create an empty frontier of the frontier_queue kind.
+        The bucket queue only takes integer priorities, with fractional weights
+        the binary heap is used instead.
+        """
+        if self.frontier_queue == BUCKET and not self._has_integer_weights():
+            return PriorityQueue()
+        return FRONTIER_QUEUES[self.frontier_queue]()
+
+    def _heuristic_to(self, end: int):
+        """
+        Private function used to create the heuristic of a search towards end,
+        the Manhattan distance or the landmark (ALT) heuristic as selected by heuristic
+
+        Returns:
+        --------
+        <value> : callable
+            Function of a node id returning the estimated cost from it to end
+        """
+        if self.heuristic == LANDMARKS:
+            return self.update_landmarks().heuristic_to(end)
+        columns = self.columns
+        end_y, end_x = divmod(end, columns)
+
+        def heuristic(node_id: int) -> float:
+            y, x = divmod(node_id, columns)
+            return abs(x - end_x) + abs(y - end_y)
+        return heuristic
+
+    def _has_integer_weights(self) -> bool:
+        """
+        Private function used to determine if every weight is a non-negative integer
+        """
+        return all(weight >= 0 and float(weight).is_integer()
+                   for weight in (self.default_weight, self.forest_weight, self.desert_weight))
+
+    def _cell_costs(self) -> list:
+        """
+        Private function used to list the cost of moving onto a node, indexed by terrain code
+        """
+        costs = [self.default_weight] * len(TERRAIN_PATTERNS)
+        costs[FOREST] = self.forest_weight
+        costs[DESERT] = self.desert_weight
+        return costs
+
+    def _terrain_checksum(self) -> int:
+        """
+        Private function used to identify the terrain and weights, for preprocessed data saved to disk
+        """
+        weights = struct.pack('<IIddd', self.columns, self.rows,
+                              self.default_weight, self.forest_weight, self.desert_weight)
+        return zlib.crc32(self.terrain, zlib.crc32(weights))
+
+    def _is_uniform_cost(self) -> bool:
+        """
+        Private function used to determine if every passable node costs the default weight
+        """
+        for code, weight in (FOREST, self.forest_weight), (DESERT, self.desert_weight):
+            if weight != self.default_weight and self._find_terrain(code) != -1:
+                return False
+        return True
+
+    def _jump_successors(self, node_id: int, parent_id, end: int) -> list:
+        """
+        Private function used to find the jump points reachable from node_id.
+        The direction of travel is given by the parent jump point (None for the start node).
+        """
+        columns = self.columns
+        if parent_id is None:
+            jumps = [self._jump_horizontal(node_id, 1, end), self._jump_horizontal(node_id, -1, end),
+                     self._jump_vertical(node_id, 1, end), self._jump_vertical(node_id, -1, end)]
+        elif node_id // columns == parent_id // columns:
+            # moving horizontally: keep going and turn only into forced neighbors
+            dx = 1 if node_id > parent_id else -1
+            jumps = [self._jump_horizontal(node_id, dx, end)]
+            terrain = self.terrain
+            y = node_id // columns
+            for dy in -1, 1:
+                if 0 <= y + dy < self.rows:
+                    side = node_id + dy * columns
+                    if terrain[side] != BARRIER and terrain[side - dx] == BARRIER:
+                        jumps.append(self._jump_vertical(node_id, dy, end))
+        else:
+            # moving vertically: keep going and scan both horizontal directions
+            dy = 1 if node_id > parent_id else -1
+            jumps = [self._jump_vertical(node_id, dy, end),
+                     self._jump_horizontal(node_id, 1, end), self._jump_horizontal(node_id, -1, end)]
+        return [jump for jump in jumps if jump is not None]
+
+    def _jump_horizontal(self, node_id: int, dx: int, end: int):
+        """
+        Private function used to scan from node_id in the horizontal direction dx.
+        Returns the first jump point found or None when the scan hits a barrier or the border.
+        """
+        columns = self.columns
+        terrain = self.terrain
+        y, x = divmod(node_id, columns)
+        has_up = y > 0
+        has_down = y + 1 < self.rows
+        while True:
+            x += dx
+            if not 0 <= x < columns:
+                return None
+            node_id += dx
+            if terrain[node_id] == BARRIER:
+                return None
+            if node_id == end:
+                return node_id
+            # a vertical neighbor is forced when the cell behind it is blocked
+            if has_up and terrain[node_id - columns] != BARRIER and terrain[node_id - columns - dx] == BARRIER:
+                return node_id
+            if has_down and terrain[node_id + columns] != BARRIER and terrain[node_id + columns - dx] == BARRIER:
+                return node_id
+
+    def _jump_vertical(self, node_id: int, dy: int, end: int):
+        """
+        Private function used to scan from node_id in the vertical direction dy.
+        Every visited node is a jump point when a horizontal scan from it finds one.
+        """
+        columns = self.columns
+        terrain = self.terrain
+        y = node_id // columns
+        step = dy * columns
+        while True:
+            y += dy
+            if not 0 <= y < self.rows:
+                return None
+            node_id += step
+            if terrain[node_id] == BARRIER:
+                return None
+            if (node_id == end
+                    or self._jump_horizontal(node_id, 1, end) is not None
+                    or self._jump_horizontal(node_id, -1, end) is not None):
+                return node_id
+
+    def _interpolate_jump_points(self, came_from: Dict[int, int], start: int, end: int) -> Dict[int, int]:
+        """
+        Private function used to fill in the straight runs between the jump points
+        leading to end so _reconstruct_path can walk the path one node at a time.
+        """
+        path_came_from = {start: None}
+        current = end
+        while came_from[current] is not None:
+            parent = came_from[current]
+            if current // self.columns == parent // self.columns:
+                step = 1 if current > parent else -1
+            else:
+                step = self.columns if current > parent else -self.columns
+            while current != parent:
+                path_came_from[current] = current - step
+                current -= step
+        return path_came_from
+
+    def _heuristic(self, n1: int, n2: int) -> float:
+        """
+         Private function used to calculate
          the (Manhattan distance, L1) heuristic cost.
          -----------
-         n1 : Node
-             One of the nodes needed to compute the cost
-         n2 : Node
-             Other node needed to compute the cost
+         n1 : int
+             One of the node ids needed to compute the cost
+         n2 : int
+             Other node id needed to compute the cost
          Returns:
          --------
          <value> : float
              The Manhattan distance heuristic cost
         """
-        x1, y1 = n1.get_coordinates()
-        x2, y2 = n2.get_coordinates()
+        y1, x1 = divmod(n1, self.columns)
+        y2, x2 = divmod(n2, self.columns)
         return abs(x1 - x2) + abs(y1 - y2)
 
 
-class PriorityQueue:
-    def __init__(self):
-        self.elements: list = []
-
-    def empty(self) -> bool:
-        return not self.elements
-
-    def put(self, item, priority: float) -> None:
-        heapq.heappush(self.elements, (priority, item))
-
-    def get(self):
-        return heapq.heappop(self.elements)[1]
-
-
 if __name__ == "__main__":
     pq = PriorityQueue()
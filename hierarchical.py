@@ -0,0 +1,334 @@
+import heapq
+from math import inf
+from typing import Dict, List, Optional
+
+"""
+Hierarchical path-finding A* (HPA*), adapted from Botea, Mueller and Schaeffer,
+"Near Optimal Hierarchical Path-Finding" (2004).
+
+The grid is split into square clusters. Every maximal run of passable cell pairs along the
+border of two clusters becomes an entrance with one transition (runs shorter than
+LONG_ENTRANCE) or two transitions at its ends. Transition cells are the nodes of an abstract
+graph whose edges are the moves across a border and the shortest paths between the
+transition cells of one cluster, computed with the graph's _cost weights.
+Queries search the abstract graph and refine every abstract edge with a search that is
+bounded to a single cluster, so paths are near optimal rather than optimal.
+"""
+
+LONG_ENTRANCE = 6
+
+
+class ClusterAbstraction:
+    def __init__(self, graph, cluster_size: int = 16):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        graph : WeightedGraph
+            The graph to abstract, terrain edits are picked up through graph.terrain_listeners
+        cluster_size : int
+            Width and height of a cluster in nodes
+        """
+        self.graph = graph
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-graph.columns // cluster_size)
+        self.clusters_y = -(-graph.rows // cluster_size)
+        self.nodes_expanded: int = 0  # nodes expanded by the last query, abstract and local searches included
+        self._transitions: Dict[tuple, list] = dict()  # border (cluster, cluster) -> [(cell, cell)]
+        self._inter: Dict[int, Dict[int, float]] = dict()  # transition cell -> {cell across the border: cost}
+        self._intra: Dict[int, Dict[int, Dict[int, float]]] = dict()  # cluster -> {cell: {cell: cost}}
+        self._dirty: set = set(range(self.clusters_x * self.clusters_y))
+        self._weights = None
+        graph.terrain_listeners.append(self._terrain_changed)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def find_path(self, start: int, end: int) -> Optional[List[int]]:
+        """
+        Public function used to find a path between two node ids.
+
+        Returns:
+        --------
+        <value> : list
+            The node ids from start to end, both included, or None when end cannot be reached
+        """
+        self.update()
+        self.nodes_expanded = 0
+        if start == end:
+            return [start]
+        if not self.graph._is_passable(end):
+            return None
+
+        start_cluster = self._cluster_of(start)
+        end_cluster = self._cluster_of(end)
+        start_edges = self._cluster_costs(start, start_cluster, False)
+        end_edges = self._cluster_costs(end, end_cluster, True)
+
+        # abstract A* from start to end, entrances are the only intermediate nodes
+        start_entrances = {cell: start_edges[cell] for cell in self._intra[start_cluster] if cell in start_edges}
+        if start_cluster == end_cluster and end in start_edges:
+            start_entrances[end] = start_edges[end]
+        # neighbors of start in other clusters join the abstract graph as well, start may be a
+        # barrier on a cluster border, which has no transitions but can still be left
+        neighbor_entrances = dict()
+        for neighbor in self.graph._neighbors(start):
+            cluster = self._cluster_of(neighbor)
+            if cluster != start_cluster:
+                start_entrances[neighbor] = self.graph._cost(start, neighbor)
+                costs = self._cluster_costs(neighbor, cluster, False)
+                neighbor_entrances[neighbor] = [(cell, costs[cell]) for cell in self._intra[cluster] if cell in costs]
+        frontier = [(0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        while frontier:
+            priority, current = heapq.heappop(frontier)
+            if current == end:
+                break
+            if current != start and priority > cost_so_far[current] + self.graph._heuristic(current, end):
+                continue  # stale entry
+            self.nodes_expanded += 1
+
+            if current == start:
+                edges = list(start_entrances.items())
+            else:
+                edges = list(self._intra[self._cluster_of(current)].get(current, dict()).items())
+                edges.extend(neighbor_entrances.get(current, ()))
+                if current in end_edges and self._cluster_of(current) == end_cluster:
+                    edges.append((end, end_edges[current]))
+            edges.extend(self._inter.get(current, dict()).items())
+            for next, cost in edges:
+                new_cost = cost_so_far[current] + cost
+                if new_cost < cost_so_far.get(next, inf):
+                    cost_so_far[next] = new_cost
+                    came_from[next] = current
+                    heapq.heappush(frontier, (new_cost + self.graph._heuristic(next, end), next))
+
+        if end not in came_from:
+            return None
+
+        abstract_path = [end]
+        while came_from[abstract_path[-1]] is not None:
+            abstract_path.append(came_from[abstract_path[-1]])
+        abstract_path.reverse()
+        return self._refine(abstract_path)
+
+    def update(self) -> None:
+        """
+        Public function used to rebuild the clusters touched by terrain or weight changes
+        since the last update. Called automatically by find_path.
+        """
+        weights = (self.graph.default_weight, self.graph.forest_weight, self.graph.desert_weight)
+        if weights != self._weights:
+            self._weights = weights
+            self._dirty.update(range(self.clusters_x * self.clusters_y))
+        if not self._dirty:
+            return
+
+        borders = {border for cluster in self._dirty for border in self._cluster_borders(cluster)}
+        for border in borders:
+            self._build_border(border)
+        for cluster in self._dirty:
+            self._build_cluster(cluster)
+        self._dirty.clear()
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _terrain_changed(self, node_id) -> None:
+        """
+        Private function used as terrain listener. Marks the cluster of node_id dirty, plus the
+        neighboring cluster when node_id lies on their shared border.
+        """
+        if node_id is None:
+            self._dirty.update(range(self.clusters_x * self.clusters_y))
+            return
+
+        size = self.cluster_size
+        y, x = divmod(node_id, self.graph.columns)
+        cluster_x, cluster_y = x // size, y // size
+        self._dirty.add(cluster_y * self.clusters_x + cluster_x)
+        if x % size == 0 and cluster_x > 0:
+            self._dirty.add(cluster_y * self.clusters_x + cluster_x - 1)
+        if x % size == size - 1 and cluster_x + 1 < self.clusters_x:
+            self._dirty.add(cluster_y * self.clusters_x + cluster_x + 1)
+        if y % size == 0 and cluster_y > 0:
+            self._dirty.add((cluster_y - 1) * self.clusters_x + cluster_x)
+        if y % size == size - 1 and cluster_y + 1 < self.clusters_y:
+            self._dirty.add((cluster_y + 1) * self.clusters_x + cluster_x)
+
+    def _cluster_of(self, node_id: int) -> int:
+        y, x = divmod(node_id, self.graph.columns)
+        return y // self.cluster_size * self.clusters_x + x // self.cluster_size
+
+    def _cluster_bounds(self, cluster: int) -> tuple:
+        """
+        Private function used to return the min_x, max_x, min_y, max_y (exclusive maxima) of a cluster
+        """
+        cluster_y, cluster_x = divmod(cluster, self.clusters_x)
+        size = self.cluster_size
+        return (cluster_x * size, min((cluster_x + 1) * size, self.graph.columns),
+                cluster_y * size, min((cluster_y + 1) * size, self.graph.rows))
+
+    def _cluster_borders(self, cluster: int) -> list:
+        """
+        Private function used to list the borders of a cluster as (left/top, right/bottom) pairs
+        """
+        cluster_y, cluster_x = divmod(cluster, self.clusters_x)
+        borders = []
+        if cluster_x > 0:
+            borders.append((cluster - 1, cluster))
+        if cluster_x + 1 < self.clusters_x:
+            borders.append((cluster, cluster + 1))
+        if cluster_y > 0:
+            borders.append((cluster - self.clusters_x, cluster))
+        if cluster_y + 1 < self.clusters_y:
+            borders.append((cluster, cluster + self.clusters_x))
+        return borders
+
+    def _build_border(self, border: tuple) -> None:
+        """
+        Private function used to (re)compute the transitions across a border
+        and the inter-cluster edges between them
+        """
+        for a, b in self._transitions.get(border, ()):
+            del self._inter[a][b]
+            del self._inter[b][a]
+
+        graph = self.graph
+        columns = graph.columns
+        size = self.cluster_size
+        first, second = border
+        first_y, first_x = divmod(first, self.clusters_x)
+        if second // self.clusters_x == first_y:
+            # vertical border, step down the last column of the first cluster
+            start = first_y * size * columns + (first_x + 1) * size - 1
+            length = min(size, graph.rows - first_y * size)
+            offset, step = 1, columns
+        else:
+            # horizontal border, step along the last row of the first cluster
+            start = ((first_y + 1) * size - 1) * columns + first_x * size
+            length = min(size, columns - first_x * size)
+            offset, step = columns, 1
+
+        transitions = []
+        run = []
+        for i in range(length + 1):
+            cell = start + i * step
+            if i < length and graph._is_passable(cell) and graph._is_passable(cell + offset):
+                run.append(cell)
+                continue
+            if run:
+                ends = (run[0], run[-1]) if len(run) >= LONG_ENTRANCE else (run[len(run) // 2],)
+                transitions.extend((cell, cell + offset) for cell in ends)
+                run = []
+
+        for a, b in transitions:
+            self._inter.setdefault(a, dict())[b] = graph._cost(a, b)
+            self._inter.setdefault(b, dict())[a] = graph._cost(b, a)
+        self._transitions[border] = transitions
+
+    def _build_cluster(self, cluster: int) -> None:
+        """
+        Private function used to (re)compute the intra-cluster edges between the transition cells of cluster
+        """
+        entrances = set()
+        for border in self._cluster_borders(cluster):
+            for a, b in self._transitions[border]:
+                entrances.add(a if self._cluster_of(a) == cluster else b)
+
+        intra = dict()
+        for entrance in entrances:
+            costs = self._cluster_costs(entrance, cluster, False, entrances)
+            intra[entrance] = {other: costs[other] for other in entrances if other != entrance and other in costs}
+        self._intra[cluster] = intra
+
+    def _cluster_costs(self, source: int, cluster: int, reverse: bool, targets=None) -> Dict[int, float]:
+        """
+        Private function used to run Dijkstra's algorithm from source without leaving cluster.
+        With reverse the costs are those of moving from each node to source.
+        When targets is given the search stops once all of them have been settled.
+        """
+        graph = self.graph
+        columns = graph.columns
+        min_x, max_x, min_y, max_y = self._cluster_bounds(cluster)
+        remaining = set(targets) if targets is not None else None
+        cost_so_far = {source: 0}
+        frontier = [(0, source)]
+        while frontier:
+            priority, current = heapq.heappop(frontier)
+            if priority > cost_so_far[current]:
+                continue
+            if remaining is not None:
+                remaining.discard(current)
+                if not remaining:
+                    break
+            self.nodes_expanded += 1
+            for next in graph._neighbors(current):
+                y, x = divmod(next, columns)
+                if not (min_x <= x < max_x and min_y <= y < max_y):
+                    continue
+                new_cost = priority + (graph._cost(next, current) if reverse else graph._cost(current, next))
+                if new_cost < cost_so_far.get(next, inf):
+                    cost_so_far[next] = new_cost
+                    heapq.heappush(frontier, (new_cost, next))
+        return cost_so_far
+
+    def _cluster_path(self, source: int, target: int, cluster: int) -> List[int]:
+        """
+        Private function used to find the node ids from source to target with A*, without leaving cluster
+        """
+        graph = self.graph
+        columns = graph.columns
+        min_x, max_x, min_y, max_y = self._cluster_bounds(cluster)
+        came_from = {source: None}
+        cost_so_far = {source: 0}
+        frontier = [(0, source)]
+        while frontier:
+            priority, current = heapq.heappop(frontier)
+            if current == target:
+                break
+            self.nodes_expanded += 1
+            for next in graph._neighbors(current):
+                y, x = divmod(next, columns)
+                if not (min_x <= x < max_x and min_y <= y < max_y):
+                    continue
+                new_cost = cost_so_far[current] + graph._cost(current, next)
+                if new_cost < cost_so_far.get(next, inf):
+                    cost_so_far[next] = new_cost
+                    came_from[next] = current
+                    heapq.heappush(frontier, (new_cost + graph._heuristic(next, target), next))
+
+        path = [target]
+        while came_from[path[-1]] is not None:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path
+
+    def _refine(self, abstract_path: List[int]) -> List[int]:
+        """
+        Private function used to expand an abstract path into node ids. Consecutive abstract
+        nodes are either neighbors across a border or lie in the same cluster.
+        Loops created where two refined segments overlap are cut out.
+        """
+        path = [abstract_path[0]]
+        positions = {abstract_path[0]: 0}
+        for source, target in zip(abstract_path, abstract_path[1:]):
+            if self._cluster_of(source) != self._cluster_of(target):
+                segment = [target]
+            else:
+                segment = self._cluster_path(source, target, self._cluster_of(source))[1:]
+            for cell in segment:
+                if cell in positions:
+                    for removed in path[positions[cell] + 1:]:
+                        del positions[removed]
+                    del path[positions[cell] + 1:]
+                else:
+                    positions[cell] = len(path)
+                    path.append(cell)
+        return path
@@ -0,0 +1,201 @@
+import heapq
+from math import inf
+from typing import Dict, List, Optional
+
+"""
+Incremental replanning with D* Lite, adapted from Koenig and Likhachev,
+"D* Lite" (AAAI 2002).
+
+The planner searches backwards from the goal and keeps its g/rhs values between queries.
+Terrain edits reach it through graph.terrain_listeners; on the next query only the nodes
+whose cost-to-goal is affected by the edited cells are re-expanded. Moving the start is
+handled with the key modifier km, changing the goal or the weights restarts the search.
+"""
+
+
+class IncrementalPlanner:
+    def __init__(self, graph):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        graph : WeightedGraph
+            The graph to plan on, terrain edits are picked up through graph.terrain_listeners
+        """
+        self.graph = graph
+        self.nodes_expanded: int = 0  # nodes expanded by the last query
+        self.interrupted: bool = False  # the budget stopped the last query
+        self._goal = None
+        self._start = None
+        self._weights = None
+        self._key_modifier: float = 0
+        self._g: Dict[int, float] = dict()
+        self._rhs: Dict[int, float] = dict()
+        self._queue: list = []
+        self._queued_keys: Dict[int, tuple] = dict()
+        self._changed: set = set()
+        self._reset_pending = False
+        graph.terrain_listeners.append(self._terrain_changed)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def plan(self, start: int, goal: int, budget=None) -> Optional[List[int]]:
+        """
+        Public function used to find a path between two node ids, reusing the previous search
+        when the goal and weights are unchanged. When budget, a SearchBudget, is exhausted the
+        query stops without a path; the queue stays consistent, so the next query continues it.
+
+        Returns:
+        --------
+        <value> : list
+            The node ids from start to goal, both included, or None when goal cannot be reached
+        """
+        weights = (self.graph.default_weight, self.graph.forest_weight, self.graph.desert_weight)
+        # swap the pending edits out first, the UI thread may keep adding to a fresh set
+        changed, self._changed = self._changed, set()
+        if self._reset_pending or goal != self._goal or weights != self._weights:
+            self._reset(start, goal, weights)
+        else:
+            if start != self._start:
+                self._key_modifier += self.graph._heuristic(self._start, start)
+                self._start = start
+            for node_id in changed:
+                for neighbor in self._adjacent(node_id):
+                    self._update_node(neighbor)
+
+        self.nodes_expanded = 0
+        self.interrupted = False
+        self._compute_shortest_path(budget)
+        if self.interrupted:
+            return None
+        return self._extract_path()
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _terrain_changed(self, node_id) -> None:
+        """
+        Private function used as terrain listener, edits are applied on the next plan call
+        """
+        if node_id is None:
+            self._reset_pending = True
+        else:
+            self._changed.add(node_id)
+
+    def _reset(self, start: int, goal: int, weights: tuple) -> None:
+        self._start = start
+        self._goal = goal
+        self._weights = weights
+        self._reset_pending = False
+        self._key_modifier = 0
+        self._g = dict()
+        self._rhs = {goal: 0}
+        self._queue = []
+        self._queued_keys = dict()
+        self._push(goal)
+
+    def _adjacent(self, node_id: int) -> list:
+        """
+        Private function used to list the in-bounds neighbors of node_id, passable or not
+        """
+        columns = self.graph.columns
+        y, x = divmod(node_id, columns)
+        adjacent = []
+        if x + 1 < columns: adjacent.append(node_id + 1)
+        if x > 0: adjacent.append(node_id - 1)
+        if y + 1 < self.graph.rows: adjacent.append(node_id + columns)
+        if y > 0: adjacent.append(node_id - columns)
+        return adjacent
+
+    def _key(self, node_id: int) -> tuple:
+        best = min(self._g.get(node_id, inf), self._rhs.get(node_id, inf))
+        return best + self.graph._heuristic(self._start, node_id) + self._key_modifier, best
+
+    def _push(self, node_id: int) -> None:
+        key = self._key(node_id)
+        self._queued_keys[node_id] = key
+        heapq.heappush(self._queue, (key, node_id))
+
+    def _top_key(self) -> tuple:
+        """
+        Private function used to return the smallest key in the queue, dropping stale entries
+        """
+        queue = self._queue
+        while queue and self._queued_keys.get(queue[0][1]) != queue[0][0]:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else (inf, inf)
+
+    def _update_node(self, node_id: int) -> None:
+        """
+        Private function used to recompute the rhs value of node_id and requeue it when inconsistent
+        """
+        graph = self.graph
+        if node_id != self._goal:
+            best = inf
+            for next in self._adjacent(node_id):
+                if graph._is_passable(next):
+                    cost = graph._cost(node_id, next) + self._g.get(next, inf)
+                    if cost < best:
+                        best = cost
+            self._rhs[node_id] = best
+        self._queued_keys.pop(node_id, None)
+        if self._g.get(node_id, inf) != self._rhs.get(node_id, inf):
+            self._push(node_id)
+
+    def _compute_shortest_path(self, budget) -> None:
+        start = self._start
+        g = self._g
+        rhs = self._rhs
+        while (self._top_key() < self._key(start)
+               or rhs.get(start, inf) != g.get(start, inf)):
+            if budget is not None and budget.exhausted(self.nodes_expanded):
+                self.interrupted = True
+                return
+            old_key, current = heapq.heappop(self._queue)
+            del self._queued_keys[current]
+            new_key = self._key(current)
+            if old_key < new_key:
+                self._push(current)
+                continue
+
+            self.nodes_expanded += 1
+            if g.get(current, inf) > rhs.get(current, inf):
+                g[current] = rhs[current]
+                if not self.graph._is_passable(current):
+                    continue  # nothing can move into a barrier, its predecessors are unaffected
+                for previous in self._adjacent(current):
+                    self._update_node(previous)
+            else:
+                g[current] = inf
+                self._update_node(current)
+                for previous in self._adjacent(current):
+                    self._update_node(previous)
+
+    def _extract_path(self) -> Optional[List[int]]:
+        """
+        Private function used to follow the cheapest successors from start to goal
+        """
+        graph = self.graph
+        current = self._start
+        if self._g.get(current, inf) == inf:
+            return None
+
+        path = [current]
+        while current != self._goal:
+            best, best_next = inf, None
+            for next in self._adjacent(current):
+                if graph._is_passable(next):
+                    cost = graph._cost(current, next) + self._g.get(next, inf)
+                    if cost < best:
+                        best, best_next = cost, next
+            if best_next is None or len(path) > graph.columns * graph.rows:
+                return None
+            current = best_next
+            path.append(current)
+        return path
@@ -0,0 +1,184 @@
+import heapq
+from array import array
+from math import inf
+from typing import List
+
+from csr_graph import MANHATTAN
+from terrain import BARRIER, PASSABLE_PATTERN
+
+"""
+ALT heuristic (A*, landmarks and the triangle inequality), adapted from Goldberg and Harrelson,
+"Computing the Shortest Path: A* Search Meets Graph Theory" (2005).
+
+A few landmark nodes are picked by farthest-point selection: each new landmark is the passable
+node farthest from the landmarks chosen so far, so they end up spread over the map's edges
+(and over every component). For every landmark L a table holds the cost d(L, v) from L to each
+node. Since a move costs what its destination node costs, the cost back is
+d(v, L) = d(L, v) - cost(v) + cost(L), so one table serves both bounds of the triangle inequality:
+
+    d(v, t) >= d(L, t) - d(L, v)
+    d(v, t) >= d(v, L) - d(t, L) = d(L, v) - d(L, t) - cost(v) + cost(t)
+
+The heuristic is the largest of these bounds and the Manhattan distance. Unlike the Manhattan
+distance it accounts for forest and desert weights, so A* expands far fewer nodes on weighted
+terrain. Tables are arrays of unsigned ints when every weight is an integer, of doubles otherwise,
+and are recomputed on the first query after a terrain or weight change.
+"""
+
+LANDMARKS = 'landmarks'
+HEURISTICS = (MANHATTAN, LANDMARKS)  # values of WeightedGraph.heuristic
+
+
+class LandmarkIndex:
+    def __init__(self, graph, count: int = 8):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        graph : WeightedGraph
+            The graph to compute landmark tables for, terrain edits are picked up
+            through graph.terrain_listeners
+        count : int
+            The number of landmarks
+        """
+        self.graph = graph
+        self.count = count
+        self.landmarks: List[int] = []  # node ids of the landmarks
+        self.tables: List[array] = []  # cost from every landmark to every node
+        self.unreachable = inf  # table value of nodes a landmark cannot reach
+        self.rebuilds: int = 0
+        self._stale = True
+        graph.terrain_listeners.append(self._terrain_changed)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def update(self) -> None:
+        """
+        Public function used to select the landmarks and compute their tables again
+        when the terrain or weights changed since the last update
+        """
+        if not self._stale:
+            return
+        self._stale = False
+        self.rebuilds += 1
+        graph = self.graph
+        node_count = graph.columns * graph.rows
+        self.landmarks = []
+        self.tables = []
+        first = PASSABLE_PATTERN.search(graph.terrain)
+        if first is None or self.count < 1:
+            return
+
+        integral = graph._has_integer_weights()
+        # smallest cost from any chosen landmark, -1 for barriers so they are never chosen
+        nearest = array('d', [inf]) * node_count
+        for node_id in range(node_count):
+            if graph.terrain[node_id] == BARRIER:
+                nearest[node_id] = -1
+        landmark = self._farthest(self._costs_from(first.start()), True)
+        while len(self.landmarks) < self.count:
+            costs = self._costs_from(landmark)
+            self.landmarks.append(landmark)
+            self.tables.append(costs)
+            for node_id in range(node_count):
+                if costs[node_id] < nearest[node_id]:
+                    nearest[node_id] = costs[node_id]
+            landmark = self._farthest(nearest, False)
+            if nearest[landmark] <= 0:
+                break  # every passable node is a landmark
+
+        # unsigned ints halve the tables when the costs are whole numbers
+        largest = max((cost for table in self.tables for cost in table if cost != inf), default=0)
+        if integral and largest < 0xFFFFFFFF:
+            self.unreachable = 0xFFFFFFFF
+            self.tables = [array('I', (self.unreachable if cost == inf else int(cost) for cost in table))
+                           for table in self.tables]
+        else:
+            self.unreachable = inf
+
+    def heuristic_to(self, end: int):
+        """
+        Public function used to create the landmark heuristic for searches towards end
+
+        Returns:
+        --------
+        <value> : callable
+            Function of a node id returning a consistent lower bound of the cost from it to end
+        """
+        self.update()
+        graph = self.graph
+        columns = graph.columns
+        terrain = graph.terrain
+        cell_costs = graph._cell_costs()
+        unreachable = self.unreachable
+        end_y, end_x = divmod(end, columns)
+        end_cost = cell_costs[terrain[end]]
+        # (table, cost from the landmark to end) of every landmark that reaches end
+        bounds = [(table, table[end]) for table in self.tables if table[end] != unreachable]
+
+        def heuristic(node_id: int) -> float:
+            y, x = divmod(node_id, columns)
+            best = abs(x - end_x) + abs(y - end_y)
+            cost_difference = cell_costs[terrain[node_id]] - end_cost
+            for table, to_end in bounds:
+                to_node = table[node_id]
+                if to_node != unreachable:
+                    estimate = to_end - to_node
+                    if -estimate - cost_difference > estimate:
+                        estimate = -estimate - cost_difference
+                    if estimate > best:
+                        best = estimate
+            return best
+        return heuristic
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _costs_from(self, source: int) -> array:
+        """
+        Private function used to run Dijkstra's algorithm from source over the whole graph
+
+        Returns:
+        --------
+        <value> : array
+            The cost from source to every node, inf for nodes it cannot reach
+        """
+        graph = self.graph
+        neighbors = graph._neighbors
+        cost = graph._cost
+        cost_so_far = array('d', [inf]) * (graph.columns * graph.rows)
+        cost_so_far[source] = 0
+        frontier = [(0, source)]
+        while frontier:
+            current_cost, current = heapq.heappop(frontier)
+            if current_cost > cost_so_far[current]:
+                continue
+            for next in neighbors(current):
+                new_cost = current_cost + cost(current, next)
+                if new_cost < cost_so_far[next]:
+                    cost_so_far[next] = new_cost
+                    heapq.heappush(frontier, (new_cost, next))
+        return cost_so_far
+
+    @staticmethod
+    def _farthest(costs: array, reachable: bool) -> int:
+        """
+        Private function used to find the node with the largest cost. Unreachable (inf) nodes
+        come first, or are skipped when reachable is True.
+        """
+        if reachable:
+            return max(range(len(costs)), key=lambda node_id: -1 if costs[node_id] == inf else costs[node_id])
+        return max(range(len(costs)), key=costs.__getitem__)
+
+    def _terrain_changed(self, node_id) -> None:
+        """
+        Private function used as terrain listener, every change can move shortest paths
+        anywhere so the tables are recomputed on the next query
+        """
+        self._stale = True
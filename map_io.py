@@ -0,0 +1,250 @@
+import mmap
+import os
+import struct
+
+from graph import WeightedGraph, OPEN, BARRIER, FOREST, DESERT
+from node import Node
+
+"""
+Map files.
+
+Plain text map format, one line per row and one character per cell:
+    .  open
+    #  barrier
+    F  forest (green)
+    D  desert (orange)
+Blank lines and lines starting with ';' are ignored.
+
+Binary map format (.pfmap): a little-endian header (magic, version, columns, rows and the
+default, forest and desert weights as doubles) followed by one terrain code byte per cell in
+the row-major order of Graph.terrain. load_binary_map memory-maps the file copy-on-write, so
+opening a map is instant, cells are paged in as the searches touch them and edits never reach
+the file.
+
+Moving AI benchmark maps (.map) and scenario files (.scen), see https://movingai.com/benchmarks/
+'.', 'G' and 'S' cells are passable, everything else is a barrier. The published optimal
+lengths of the scenarios are octile distances (8-connected moves without corner cutting),
+so they are lower bounds for the 4-connected paths found here; reachability is the same.
+"""
+
+TERRAIN_CHARACTERS = {'.': OPEN, '#': BARRIER, 'F': FOREST, 'D': DESERT}
+TERRAIN_SYMBOLS = {code: character for character, code in TERRAIN_CHARACTERS.items()}
+
+BINARY_MAP_MAGIC = b'PFMP'
+BINARY_MAP_VERSION = 1
+# magic, version, reserved, columns, rows, default weight, forest weight, desert weight
+BINARY_MAP_HEADER = struct.Struct('<4sHHIIddd')
+
+MOVING_AI_PASSABLE = '.GS'
+MOVING_AI_CHARACTERS = MOVING_AI_PASSABLE + '@OTW'
+MOVING_AI_TABLE = bytes(OPEN if chr(value) in MOVING_AI_PASSABLE else BARRIER for value in range(256))
+
+
+def load_map(path: str) -> WeightedGraph:
+    """
+    Public function used to load a map in the format given by its extension:
+    .pfmap binary maps, .map Moving AI maps, anything else text maps
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pfmap':
+        return load_binary_map(path)
+    if extension == '.map':
+        return load_moving_ai_map(path)
+    return load_text_map(path)
+
+
+def save_map(graph: WeightedGraph, path: str) -> None:
+    """
+    Public function used to save a map, as a binary map for the .pfmap extension and as a text map otherwise
+    """
+    if os.path.splitext(path)[1].lower() == '.pfmap':
+        save_binary_map(graph, path)
+    else:
+        save_text_map(graph, path)
+
+
+def load_text_map(path: str) -> WeightedGraph:
+    """
+    Public function used to build a WeightedGraph from a text map file.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the text map file
+    Returns:
+    --------
+    <value> : WeightedGraph
+        Graph with the terrain of the map file
+    """
+    with open(path) as map_file:
+        lines = [line.rstrip('\r\n') for line in map_file]
+    rows = [line for line in lines if line and not line.startswith(';')]
+    if not rows:
+        raise ValueError(f"{path}: map contains no rows")
+
+    columns = len(rows[0])
+    graph = WeightedGraph(columns, len(rows))
+    for y, row in enumerate(rows):
+        if len(row) != columns:
+            raise ValueError(f"{path}: row {y} has {len(row)} cells, expected {columns}")
+        try:
+            codes = bytes(TERRAIN_CHARACTERS[character] for character in row)
+        except KeyError as e:
+            raise ValueError(f"{path}: unknown terrain character {e.args[0]!r} in row {y}") from None
+        graph.terrain[y * columns:(y + 1) * columns] = codes
+    return graph
+
+
+def save_text_map(graph: WeightedGraph, path: str) -> None:
+    """
+    Public function used to write the terrain of graph to a text map file.
+
+    Parameters:
+    -----------
+    graph : WeightedGraph
+        The graph to save
+    path : str
+        Path of the text map file
+    """
+    columns = graph.columns
+    with open(path, 'w') as map_file:
+        for y in range(graph.rows):
+            row = graph.terrain[y * columns:(y + 1) * columns]
+            map_file.write(''.join(TERRAIN_SYMBOLS[code] for code in row))
+            map_file.write('\n')
+
+
+def load_binary_map(path: str) -> WeightedGraph:
+    """
+    Public function used to open a binary map file. The terrain of the returned graph is a
+    copy-on-write memory map of the file.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the binary map file
+    Returns:
+    --------
+    <value> : WeightedGraph
+        Graph with the terrain and weights of the map file
+    """
+    with open(path, 'rb') as map_file:
+        header = map_file.read(BINARY_MAP_HEADER.size)
+        if len(header) != BINARY_MAP_HEADER.size:
+            raise ValueError(f"{path}: not a binary map")
+        magic, version, _, columns, rows, default_weight, forest_weight, desert_weight = \
+            BINARY_MAP_HEADER.unpack(header)
+        if magic != BINARY_MAP_MAGIC or version != BINARY_MAP_VERSION:
+            raise ValueError(f"{path}: not a version {BINARY_MAP_VERSION} binary map")
+        if columns == 0 or rows == 0:
+            raise ValueError(f"{path}: map contains no rows")
+        size = BINARY_MAP_HEADER.size + columns * rows
+        if os.fstat(map_file.fileno()).st_size < size:
+            raise ValueError(f"{path}: truncated binary map")
+        mapping = mmap.mmap(map_file.fileno(), size, access=mmap.ACCESS_COPY)
+
+    # the memoryview keeps the mapping open for as long as the graph uses it
+    graph = WeightedGraph(columns, rows, memoryview(mapping)[BINARY_MAP_HEADER.size:])
+    graph.default_weight = default_weight
+    graph.forest_weight = forest_weight
+    graph.desert_weight = desert_weight
+    return graph
+
+
+def save_binary_map(graph: WeightedGraph, path: str) -> None:
+    """
+    Public function used to write the terrain and weights of graph to a binary map file.
+
+    Parameters:
+    -----------
+    graph : WeightedGraph
+        The graph to save
+    path : str
+        Path of the binary map file
+    """
+    # write next to the target and swap it in, graph.terrain may be a mapping of the file being replaced
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as map_file:
+        map_file.write(BINARY_MAP_HEADER.pack(BINARY_MAP_MAGIC, BINARY_MAP_VERSION, 0, graph.columns, graph.rows,
+                                              graph.default_weight, graph.forest_weight, graph.desert_weight))
+        map_file.write(graph.terrain)
+    os.replace(temporary_path, path)
+
+
+def load_moving_ai_map(path: str) -> WeightedGraph:
+    """
+    Public function used to build a WeightedGraph from a Moving AI benchmark map.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the .map file
+    Returns:
+    --------
+    <value> : WeightedGraph
+        Graph with the passable cells open and every other cell a barrier
+    """
+    with open(path) as map_file:
+        header = dict()
+        for line in map_file:
+            line = line.strip()
+            if line == 'map':
+                break
+            if line:
+                key, _, value = line.partition(' ')
+                header[key] = value.strip()
+        else:
+            raise ValueError(f"{path}: missing 'map' line")
+        try:
+            columns = int(header['width'])
+            rows = int(header['height'])
+        except (KeyError, ValueError):
+            raise ValueError(f"{path}: header needs integer width and height") from None
+
+        graph = WeightedGraph(columns, rows)
+        for y in range(rows):
+            row = map_file.readline().rstrip('\r\n')
+            if len(row) != columns:
+                raise ValueError(f"{path}: row {y} has {len(row)} cells, expected {columns}")
+            unknown = row.strip(MOVING_AI_CHARACTERS)
+            if unknown:
+                raise ValueError(f"{path}: unknown terrain character {unknown[0]!r} in row {y}")
+            graph.terrain[y * columns:(y + 1) * columns] = row.encode('ascii').translate(MOVING_AI_TABLE)
+    return graph
+
+
+def load_moving_ai_scenarios(path: str) -> list:
+    """
+    Public function used to read a Moving AI scenario file.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the .scen file
+    Returns:
+    --------
+    <value> : list
+        One dict per scenario with its bucket, map name, map width and height,
+        start and end nodes and published optimal (octile) length
+    """
+    scenarios = []
+    with open(path) as scenario_file:
+        for line_number, line in enumerate(scenario_file, 1):
+            if not line.strip() or line.startswith('version'):
+                continue
+            values = line.split('\t') if '\t' in line else line.split()
+            if len(values) != 9:
+                raise ValueError(f"{path}: line {line_number} has {len(values)} fields, expected 9")
+            try:
+                scenarios.append({
+                    'bucket': int(values[0]),
+                    'map': values[1].strip(),
+                    'width': int(values[2]),
+                    'height': int(values[3]),
+                    'start': Node(int(values[4]), int(values[5])),
+                    'end': Node(int(values[6]), int(values[7])),
+                    'optimal_length': float(values[8]),
+                })
+            except ValueError:
+                raise ValueError(f"{path}: line {line_number} has a malformed field") from None
+    return scenarios
@@ -1,8 +1,9 @@
-from dataclasses import dataclass, astuple
+from dataclasses import dataclass
 
 
 @dataclass(frozen=True, order=True)
 class Node:
+    __slots__ = ('x', 'y')
     x: int
     y: int
 
@@ -14,7 +15,11 @@ class Node:
         <value> : tuple
             tuple representation of the node's coordinates
         """
-        return astuple(self)
+        return self.x, self.y
+
+    def __reduce__(self):
+        # frozen dataclasses with __slots__ cannot be restored by the default pickle protocol
+        return Node, (self.x, self.y)
 
 
 if __name__ == '__main__':
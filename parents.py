@@ -0,0 +1,167 @@
+from array import array
+from math import inf
+
+from flow_field import EAST, DIRECTION_OFFSETS
+
+"""
+Parent and path cost storage of the grid searches.
+
+On a 4-connected grid the parent of a node is one of its neighbors, so the direction towards
+it fits in 2 bits: DirectionParents packs four nodes per byte, storing the flow_field direction
+of the move to the parent minus EAST (codes 0 to 3 for E W N S), and marks reached nodes in a
+bitmap, 3 bits per node of the grid instead of a dict entry per reached node. Paths are
+streamed from the end back to the start by walk.
+
+The arrays are as large as the grid, so they are not allocated per search: graphs keep the
+storage of finished searches and reuse it. reset only clears the blocks of BLOCK_SIZE node ids
+that a search reached, so a short search on a large grid stays cheap.
+CSR graphs and graphs too large for per-node arrays, such as chunked worlds, use the dict
+based NodeParents and CostMap instead, which have the same interface.
+"""
+
+BLOCK_SHIFT = 10
+BLOCK_SIZE = 1 << BLOCK_SHIFT  # node ids per block cleared by DirectionParents.reset
+INFINITE_BLOCK = array('d', [inf]) * BLOCK_SIZE
+
+
+class DirectionParents:
+    def __init__(self, columns: int, node_count: int):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        columns : int
+            The number of columns in the graph
+        node_count : int
+            The number of nodes in the graph
+        """
+        self.node_count = node_count
+        self.root: int = None  # node id the current search started from, reached without a parent
+        # node id offset of the parent for every 2 bit code, and back
+        moves = (DIRECTION_OFFSETS[EAST + code] for code in range(4))
+        self.offsets = tuple(dx + dy * columns for dx, dy in moves)
+        self.codes = {offset: code for code, offset in enumerate(self.offsets)}
+        self.directions = bytearray((node_count + 3) >> 2)
+        self.reached = bytearray((node_count + 7) >> 3)
+        self.dirty = bytearray((node_count + BLOCK_SIZE - 1) >> BLOCK_SHIFT)  # 1 for blocks holding reached nodes
+        self._costs: array = None  # created by the first search that needs costs
+
+    def __contains__(self, node_id: int) -> bool:
+        return self.reached[node_id >> 3] >> (node_id & 7) & 1 == 1
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def start(self, root: int) -> None:
+        """
+        Public function used to begin a search from root on cleared storage
+        """
+        self.root = root
+        self.reached[root >> 3] |= 1 << (root & 7)
+        self.dirty[root >> BLOCK_SHIFT] = 1
+
+    def costs(self) -> array:
+        """
+        Public function used to get the path cost of every node, inf for nodes not reached.
+        Only the costs of the root and of nodes passed to set are restored by reset.
+        """
+        if self._costs is None:
+            self._costs = array('d', [inf]) * self.node_count
+        return self._costs
+
+    def set(self, node_id: int, parent_id: int) -> None:
+        """
+        Public function used to store parent_id, a neighbor of node_id, as its parent
+        """
+        index = node_id >> 2
+        shift = (node_id & 3) << 1
+        directions = self.directions
+        directions[index] = directions[index] & ~(3 << shift) | self.codes[parent_id - node_id] << shift
+        self.reached[node_id >> 3] |= 1 << (node_id & 7)
+        self.dirty[node_id >> BLOCK_SHIFT] = 1
+
+    def reset(self) -> None:
+        """
+        Public function used to clear the storage for the next search, only the blocks
+        holding nodes the last search reached are written
+        """
+        reached = self.reached
+        costs = self._costs
+        dirty = self.dirty
+        block = dirty.find(1)
+        while block != -1:
+            begin = block << BLOCK_SHIFT
+            end = min(begin + BLOCK_SIZE, self.node_count)
+            reached[begin >> 3:(end + 7) >> 3] = bytes(((end + 7) >> 3) - (begin >> 3))
+            if costs is not None:
+                costs[begin:end] = INFINITE_BLOCK[:end - begin]
+            dirty[block] = 0
+            block = dirty.find(1, block + 1)
+        self.root = None
+
+    def walk(self, end: int):
+        """
+        Public function used to stream the path to end, from end back to the root, both included.
+        end has to be reached.
+        """
+        directions = self.directions
+        offsets = self.offsets
+        root = self.root
+        node_id = end
+        yield node_id
+        while node_id != root:
+            node_id += offsets[directions[node_id >> 2] >> ((node_id & 3) << 1) & 3]
+            yield node_id
+
+
+class NodeParents(dict):
+    def __init__(self, root: int):
+        """
+        Initiator
+
+        Dict of parent ids with the interface of DirectionParents, for graphs too large for per-node arrays.
+
+        Parameters:
+        -----------
+        root : int
+            The node id the search starts from, reached without a parent
+        """
+        super().__init__()
+        self.root = root
+        self[root] = None
+
+    set = dict.__setitem__
+
+    def costs(self) -> 'CostMap':
+        return CostMap()
+
+    def walk(self, end: int):
+        return _walk_dict(self, end)
+
+
+class CostMap(dict):
+    """
+    Dict of path costs that returns inf for nodes not reached yet, like a typed cost array filled with inf
+    """
+    def __missing__(self, node_id: int) -> float:
+        return inf
+
+
+def walk(parents, end: int):
+    """
+    Public function used to stream the path to end from end back to the start, both included,
+    parents being a DirectionParents, a NodeParents or a dict of parent ids with None for the start
+    """
+    if isinstance(parents, DirectionParents):
+        return parents.walk(end)
+    return _walk_dict(parents, end)
+
+
+def _walk_dict(parents: dict, end: int):
+    node_id = end
+    while node_id is not None:
+        yield node_id
+        node_id = parents[node_id]
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    def __init__(self, capacity: int = 1024):
+        """
+        Initiator
+
+        Bounded least-recently-used cache of search results. Entries belong to one terrain
+        version; the first lookup with a newer version drops every older entry.
+
+        Parameters:
+        -----------
+        capacity : int
+            The maximum number of cached results
+        """
+        self.capacity = capacity
+        self.version = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0  # entries dropped to stay within capacity
+        self.invalidations: int = 0  # entries dropped because the terrain version changed
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def get(self, version: int, key):
+        """
+        Public function used to look up a result.
+
+        Parameters:
+        -----------
+        version : int
+            The current terrain version of the graph
+        key : hashable
+            The query key
+        Returns:
+        --------
+        <value> : object
+            The cached result or None on a miss
+        """
+        self._check_version(version)
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, version: int, key, value) -> None:
+        """
+        Public function used to store a result, evicting the least recently used one when full
+        """
+        self._check_version(version)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Public function used to return the hit, miss, eviction and invalidation counters
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'capacity': self.capacity,
+        }
+
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _check_version(self, version: int) -> None:
+        if version != self.version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.version = version
@@ -0,0 +1,190 @@
+import heapq
+from typing import Dict
+
+"""
+Frontier implementations for the searches, all with the same interface:
+len(queue), empty(), put(item, priority), get() and peek_priority().
+
+PriorityQueue          binary heap (heapq), every put adds an entry; outdated entries stay
+                       queued until popped and are skipped by the searches as stale
+IndexedPriorityQueue   binary heap with a position index, put on a queued item changes its
+                       priority in place (decrease-key), so there are no stale entries
+BucketPriorityQueue    Dial's bucket queue for non-negative integer priorities, O(1) put and
+                       amortized O(1) get when priorities grow by small steps, as they do with
+                       small integer weights and the Manhattan heuristic
+"""
+
+# names of the frontier implementations, see FRONTIER_QUEUES
+HEAP = 'heap'
+INDEXED_HEAP = 'indexed_heap'
+BUCKET = 'bucket'
+
+
+class PriorityQueue:
+    def __init__(self):
+        self.elements: list = []
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def empty(self) -> bool:
+        return not self.elements
+
+    def put(self, item, priority: float) -> None:
+        heapq.heappush(self.elements, (priority, item))
+
+    def get(self):
+        return heapq.heappop(self.elements)[1]
+
+    def peek_priority(self) -> float:
+        return self.elements[0][0]
+
+
+class IndexedPriorityQueue:
+    def __init__(self):
+        # heap ordered by priority, stored as parallel lists
+        self.priorities: list = []
+        self.items: list = []
+        self.positions: dict = dict()  # item -> index in the heap
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def empty(self) -> bool:
+        return not self.items
+
+    def put(self, item, priority: float) -> None:
+        """
+        Public function used to queue item, or to change its priority when it is queued already
+        """
+        position = self.positions.get(item)
+        if position is None:
+            position = len(self.items)
+            self.priorities.append(priority)
+            self.items.append(item)
+            self.positions[item] = position
+            self._sift_up(position)
+        elif priority < self.priorities[position]:
+            self.priorities[position] = priority
+            self._sift_up(position)
+        elif priority > self.priorities[position]:
+            self.priorities[position] = priority
+            self._sift_down(position)
+
+    def get(self):
+        items = self.items
+        priorities = self.priorities
+        item = items[0]
+        del self.positions[item]
+        last_item = items.pop()
+        last_priority = priorities.pop()
+        if items:
+            items[0] = last_item
+            priorities[0] = last_priority
+            self.positions[last_item] = 0
+            self._sift_down(0)
+        return item
+
+    def peek_priority(self) -> float:
+        return self.priorities[0]
+
+    def _sift_up(self, position: int) -> None:
+        items = self.items
+        priorities = self.priorities
+        positions = self.positions
+        item = items[position]
+        priority = priorities[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if priorities[parent] <= priority:
+                break
+            items[position] = items[parent]
+            priorities[position] = priorities[parent]
+            positions[items[position]] = position
+            position = parent
+        items[position] = item
+        priorities[position] = priority
+        positions[item] = position
+
+    def _sift_down(self, position: int) -> None:
+        items = self.items
+        priorities = self.priorities
+        positions = self.positions
+        size = len(items)
+        item = items[position]
+        priority = priorities[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and priorities[child + 1] < priorities[child]:
+                child += 1
+            if priority <= priorities[child]:
+                break
+            items[position] = items[child]
+            priorities[position] = priorities[child]
+            positions[items[position]] = position
+            position = child
+        items[position] = item
+        priorities[position] = priority
+        positions[item] = position
+
+
+class BucketPriorityQueue:
+    def __init__(self):
+        self.buckets: Dict[int, list] = dict()  # priority -> items, only non-empty buckets are kept
+        self.cursor: int = 0  # no bucket below this priority holds items
+        self.size: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def put(self, item, priority: float) -> None:
+        """
+        Public function used to queue item. Raises ValueError for priorities that are not
+        non-negative integers.
+        """
+        index = int(priority)
+        if index != priority or index < 0:
+            raise ValueError(f"bucket queue priorities must be non-negative integers, got {priority}")
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            self.buckets[index] = [item]
+        else:
+            bucket.append(item)
+        if index < self.cursor or self.size == 0:
+            self.cursor = index
+        self.size += 1
+
+    def get(self):
+        self._advance()
+        bucket = self.buckets[self.cursor]
+        item = bucket.pop()
+        if not bucket:
+            del self.buckets[self.cursor]
+        self.size -= 1
+        return item
+
+    def peek_priority(self) -> float:
+        self._advance()
+        return self.cursor
+
+    def _advance(self) -> None:
+        """
+        Private function used to move the cursor to the lowest non-empty bucket
+        """
+        buckets = self.buckets
+        cursor = self.cursor
+        while cursor not in buckets:
+            cursor += 1
+        self.cursor = cursor
+
+
+FRONTIER_QUEUES = {
+    HEAP: PriorityQueue,
+    INDEXED_HEAP: IndexedPriorityQueue,
+    BUCKET: BucketPriorityQueue,
+}
@@ -0,0 +1,70 @@
+import threading
+from time import perf_counter
+
+"""
+Limits for searches that must not run indefinitely.
+
+A SearchBudget set as graph.budget is checked by bfs, dijkstra, a_star, anytime_a_star,
+jump_point_search, the bidirectional searches and d_star_lite before every expansion. Once it is
+exhausted (time limit reached, expansion limit reached or token cancelled) the search stops:
+anytime_a_star with the best path it found so far, the others without a path. search_stats.interrupted tells whether the budget stopped the search.
+A CancellationToken lets another thread, e.g. the UI, stop a running search.
+"""
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Initiator
+
+        Thread safe flag that is set once with cancel and never cleared; use a new token per search.
+        """
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+
+class SearchBudget:
+    def __init__(self, time_limit: float = None, expansion_limit: int = None, token: CancellationToken = None):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        time_limit : float
+            Seconds of wall time a search may take, None for no limit
+        expansion_limit : int
+            Nodes a search may expand, None for no limit
+        token : CancellationToken
+            Token that stops the search when cancelled, None when the search cannot be cancelled
+        """
+        self.time_limit = time_limit
+        self.expansion_limit = expansion_limit
+        self.token = token
+        self.deadline: float = None  # perf_counter value the running search must stop at
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def start(self) -> None:
+        """
+        Public function used to start the time limit, called when a search begins
+        """
+        self.deadline = None if self.time_limit is None else perf_counter() + self.time_limit
+
+    def exhausted(self, nodes_expanded: int) -> bool:
+        """
+        Public function used to determine if a search that expanded nodes_expanded nodes has to stop
+        """
+        if self.token is not None and self.token.cancelled:
+            return True
+        if self.expansion_limit is not None and nodes_expanded >= self.expansion_limit:
+            return True
+        return self.deadline is not None and perf_counter() >= self.deadline
@@ -0,0 +1,175 @@
+from collections import deque
+
+from parents import NodeParents, walk
+
+"""
+Search loops shared by the grid graphs (graph.Graph) and CSRGraph.
+
+The loops only see node ids and reach the graph through a small interface:
+    _neighbors(node_id)     ids of the nodes an edge from node_id leads to
+    _edges(node_id)         (neighbor id, move cost) pairs of those edges
+    _cost(from_id, to_id)   cost of the move from from_id to to_id
+    _path_node(node_id)     what path_nodes stores for a node id
+plus the budget and search_log attributes (search_log is None when searches are not recorded).
+The parent and path cost storage of a search (see parents.py) comes from _acquire_parents and
+goes back through _release_parents once the search is done; by default it is a dict per search.
+The loops leave their counters on the graph and store the path found in path_nodes and path_cost.
+"""
+
+
+class SearchEngine:
+    """
+    ##########################################################################
+                                Private Functions
+    ##########################################################################
+    """
+    def _breadth_first_search(self, start: int, end: int) -> None:
+        """
+        Private function used to find the path from start to end with the fewest edges
+        """
+        frontier = deque([start])
+        came_from = self._acquire_parents(start)
+        budget = self.budget
+        log = self.search_log
+        if log is not None:
+            log.frontier(start)
+        nodes_expanded = 0
+        peak_frontier = 1
+        pushes = 1
+        pops = 0
+
+        while frontier:
+            current = frontier.popleft()
+            pops += 1
+            if log is not None:
+                log.expansion(current)
+
+            if current == end:
+                break
+            if budget is not None and budget.exhausted(nodes_expanded):
+                self.search_interrupted = True
+                break
+
+            nodes_expanded += 1
+            for next in self._neighbors(current):
+                if next not in came_from:
+                    frontier.append(next)
+                    pushes += 1
+                    came_from.set(next, current)
+                    if log is not None:
+                        log.frontier(next)
+            peak_frontier = max(peak_frontier, len(frontier))
+
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.frontier_pushes = pushes
+        self.frontier_pops = pops
+        self.stale_entries = 0
+        if not self.search_interrupted:
+            self._reconstruct_path(came_from, start, end)
+        self._release_parents(came_from)
+
+    def _best_first_search(self, start: int, end: int, frontier, heuristic) -> None:
+        """
+        Private function used to run A* from start to end, or Dijkstra's algorithm when
+        heuristic is None
+
+        Parameters:
+        -----------
+        frontier : PriorityQueue
+            Empty frontier of one of the priority_queues kinds
+        heuristic : callable
+            Function of a node id returning a consistent estimate of its cost to end, or None
+        """
+        frontier.put(start, heuristic(start) if heuristic else 0)
+        came_from = self._acquire_parents(start)
+        cost_so_far = came_from.costs()
+        cost_so_far[start] = 0
+        budget = self.budget
+        log = self.search_log
+        if log is not None:
+            log.frontier(start)
+        nodes_expanded = 0
+        peak_frontier = 1
+        pushes = 1
+        pops = 0
+        stale_entries = 0
+
+        while not frontier.empty():
+            priority = frontier.peek_priority()
+            current = frontier.get()
+            pops += 1
+            current_cost = cost_so_far[current]
+            if priority > (current_cost + heuristic(current) if heuristic else current_cost):
+                stale_entries += 1
+                continue  # stale entry, current was reached more cheaply after it was queued
+            if log is not None:
+                log.expansion(current)
+
+            if current == end:
+                break
+            if budget is not None and budget.exhausted(nodes_expanded):
+                self.search_interrupted = True
+                break
+
+            nodes_expanded += 1
+            for next, cost in self._edges(current):
+                new_cost = current_cost + cost
+                if new_cost < cost_so_far[next]:
+                    cost_so_far[next] = new_cost
+                    frontier.put(next, new_cost + heuristic(next) if heuristic else new_cost)
+                    pushes += 1
+                    came_from.set(next, current)
+                    if log is not None:
+                        log.frontier(next)
+            peak_frontier = max(peak_frontier, len(frontier))
+
+        self.nodes_expanded = nodes_expanded
+        self.peak_frontier = peak_frontier
+        self.frontier_pushes = pushes
+        self.frontier_pops = pops
+        self.stale_entries = stale_entries
+        if not self.search_interrupted:
+            self._reconstruct_path(came_from, start, end)
+        self._release_parents(came_from)
+
+    def _acquire_parents(self, start: int) -> NodeParents:
+        """
+        Private function used to get the parent storage of a search from start
+        """
+        return NodeParents(start)
+
+    def _release_parents(self, parents) -> None:
+        """
+        Private function used to hand back the parent storage of a finished search.
+        Storage of a search that raised is never handed back.
+        """
+
+    def _reconstruct_path(self, came_from, start: int, end: int) -> None:
+        """
+        Private function used to construct the path from a pathfinding algorithm output,
+        the parents of the reached nodes as DirectionParents, NodeParents or a dict of node ids.
+        The start and end nodes are not part of path_nodes.
+        """
+        if end in came_from:
+            self._set_path(walk(came_from, end), start)
+
+    def _set_path(self, path, start: int) -> None:
+        """
+        Private function used to store a path given as node ids from its end back to start
+        """
+        path = iter(path)
+        previous = next(path)
+        path_cost = 0
+        path_ids = []
+        for current in path:
+            path_cost += self._cost(current, previous)
+            if current == start:
+                break
+            path_ids.append(current)
+            previous = current
+        path_ids.reverse()
+        self.path_nodes.extend(map(self._path_node, path_ids))
+        self.path_cost = path_cost
+        if self.search_log is not None:
+            self.search_log.path(path_ids)
@@ -0,0 +1,152 @@
+import struct
+import sys
+from array import array
+from typing import List
+
+"""
+Compact record of what a search did, kept separate from the search itself so the search can
+run at full speed while a UI replays the record at any pace afterwards.
+
+Every event is a kind byte plus a node id; the two are stored in parallel arrays, five bytes
+per event. Logs can be written to disk with save and read back with SearchLog.load.
+"""
+
+# event kinds stored in SearchLog.kinds
+FRONTIER = 0  # node id was pushed onto the frontier
+EXPANSION = 1  # node id was taken off the frontier
+PATH = 2  # node id is the next node of the final path, start and end excluded
+
+LOG_MAGIC = b'PFSL'
+LOG_VERSION = 1
+# magic, version, columns, rows, event count
+LOG_HEADER = struct.Struct('<4sHIIQ')
+
+
+class SearchLog:
+    def __init__(self, columns: int, rows: int):
+        """
+        Initiator
+
+        Parameters:
+        -----------
+        columns: int
+            The number of columns in the graph that was searched
+        rows: int
+            The number of rows in the graph that was searched
+        """
+        self.columns = columns
+        self.rows = rows
+        self.kinds: bytearray = bytearray()
+        self.nodes: array = array('i')
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def frontier(self, node_id: int) -> None:
+        self.kinds.append(FRONTIER)
+        self.nodes.append(node_id)
+
+    def expansion(self, node_id: int) -> None:
+        self.kinds.append(EXPANSION)
+        self.nodes.append(node_id)
+
+    def path(self, node_ids: List[int]) -> None:
+        self.kinds.extend(bytes((PATH,)) * len(node_ids))
+        self.nodes.extend(node_ids)
+
+    def save(self, path: str) -> None:
+        """
+        Public function used to write the log to a binary file
+        """
+        nodes = self.nodes
+        if sys.byteorder == 'big':
+            nodes = array('i', nodes)
+            nodes.byteswap()
+        with open(path, 'wb') as log_file:
+            log_file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, self.columns, self.rows, len(self)))
+            log_file.write(self.kinds)
+            log_file.write(nodes.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'SearchLog':
+        """
+        Public function used to read a log written by save.
+        Raises ValueError when the file is not a search log.
+        """
+        with open(path, 'rb') as log_file:
+            header = log_file.read(LOG_HEADER.size)
+            if len(header) != LOG_HEADER.size:
+                raise ValueError(f"{path}: not a search log")
+            magic, version, columns, rows, count = LOG_HEADER.unpack(header)
+            if magic != LOG_MAGIC or version != LOG_VERSION:
+                raise ValueError(f"{path}: not a version {LOG_VERSION} search log")
+            log = cls(columns, rows)
+            log.kinds = bytearray(log_file.read(count))
+            log.nodes.frombytes(log_file.read(count * log.nodes.itemsize))
+        if len(log.kinds) != count or len(log.nodes) != count:
+            raise ValueError(f"{path}: truncated search log")
+        if sys.byteorder == 'big':
+            log.nodes.byteswap()
+        return log
+
+
+class SearchReplay:
+    def __init__(self, log: SearchLog):
+        """
+        Initiator
+
+        State of a search after the first position events of its log.
+
+        Parameters:
+        -----------
+        log : SearchLog
+            The log to replay
+        """
+        self.log = log
+        self.position: int = 0
+        self.frontier: set = set()
+        self.expanded: set = set()
+        self.path: list = []
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.log)
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def seek(self, position: int) -> None:
+        """
+        Public function used to move the replay to any event position, forwards or backwards.
+        Moving backwards replays the log from its first event.
+        """
+        position = max(0, min(position, len(self.log)))
+        if position < self.position:
+            self.position = 0
+            self.frontier = set()
+            self.expanded = set()
+            self.path = []
+
+        kinds = self.log.kinds
+        nodes = self.log.nodes
+        for index in range(self.position, position):
+            kind = kinds[index]
+            node_id = nodes[index]
+            if kind == FRONTIER:
+                self.frontier.add(node_id)
+            elif kind == EXPANSION:
+                self.frontier.discard(node_id)
+                self.expanded.add(node_id)
+            else:
+                self.path.append(node_id)
+        self.position = position
+
+    def advance(self, count: int = 1) -> None:
+        self.seek(self.position + count)
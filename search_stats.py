@@ -0,0 +1,144 @@
+import cProfile
+import functools
+import io
+import pstats
+import tracemalloc
+from dataclasses import dataclass, asdict
+from math import inf
+from time import perf_counter, thread_time
+from typing import Optional
+
+"""
+Per-search instrumentation.
+
+Every public search of a Graph is wrapped with instrumented: the wrapper times the search
+(wall time and the CPU time of the calling thread), collects the counters the search left on
+the graph into a SearchStats, stores it as graph.search_stats and returns it. The time limit
+of graph.budget starts with the outer search; grid searches restart it once their endpoints
+are checked.
+Setting graph.profiler to one of PROFILERS additionally runs the search under cProfile or
+tracemalloc; the report ends up in the stats as well.
+"""
+
+CPROFILE = 'cprofile'
+TRACEMALLOC = 'tracemalloc'
+PROFILERS = (CPROFILE, TRACEMALLOC)
+PROFILE_LINES = 25  # functions listed in the cProfile report, by cumulative time
+
+
+@dataclass
+class SearchStats:
+    algorithm: str
+    nodes_expanded: int = 0
+    pushes: Optional[int] = None  # frontier pushes, None when the algorithm does not count them
+    pops: Optional[int] = None  # frontier pops, stale entries included
+    stale_entries: Optional[int] = None  # popped entries skipped because a cheaper one was expanded before
+    peak_frontier: int = 0
+    path_length: Optional[int] = None  # moves from start to end, None when no path was found
+    path_cost: float = inf
+    wall_time: float = 0.0  # seconds
+    cpu_time: float = 0.0  # seconds of CPU time of the searching thread
+    cached: bool = False  # the result came from the path cache
+    interrupted: bool = False  # graph.budget stopped the search before it finished
+    suboptimality: Optional[float] = None  # bound of path cost / optimal cost, for anytime searches
+    peak_memory: Optional[int] = None  # peak bytes traced by the tracemalloc profiler
+    profile: Optional[str] = None  # report of the cProfile profiler
+
+    """
+    ##########################################################################
+                                Public Functions
+    ##########################################################################
+    """
+    def to_dict(self) -> dict:
+        """
+        Public function used to convert the stats into a JSON serializable dict,
+        an infinite path cost becomes None
+        """
+        stats = asdict(self)
+        if stats['path_cost'] == inf:
+            stats['path_cost'] = None
+        return stats
+
+    def summary(self) -> list:
+        """
+        Public function used to describe the stats in short lines of text, e.g. for an overlay
+        """
+        def count(value) -> str:
+            return '-' if value is None else f"{value:,}"
+
+        lines = [
+            self.algorithm + (' (cached)' if self.cached else '') + (' (interrupted)' if self.interrupted else ''),
+            f"expanded {self.nodes_expanded:,}",
+            f"pushes {count(self.pushes)}  pops {count(self.pops)}  stale {count(self.stale_entries)}",
+            f"peak frontier {self.peak_frontier:,}",
+            f"path {count(self.path_length)} moves, cost {'-' if self.path_cost == inf else f'{self.path_cost:g}'}",
+            f"time {self.wall_time * 1000:.2f} ms wall, {self.cpu_time * 1000:.2f} ms CPU",
+        ]
+        if self.suboptimality is not None:
+            lines.append(f"cost within {self.suboptimality:.2f} x optimal")
+        if self.peak_memory is not None:
+            lines.append(f"peak memory {self.peak_memory / 1e6:.2f} MB")
+        return lines
+
+
+def instrumented(search):
+    """
+    Decorator used to collect a SearchStats for every call of a graph search method.
+    Searches called from inside another instrumented search (fallbacks) are not measured
+    separately, the outer search's stats cover them.
+    """
+    @functools.wraps(search)
+    def wrapper(graph, start, end) -> SearchStats:
+        if graph._instrumenting:
+            search(graph, start, end)
+            return graph.search_stats
+
+        graph._instrumenting = True
+        if graph.budget is not None:
+            graph.budget.start()
+        profiler = graph.profiler
+        peak_memory = None
+        profile = None
+        try:
+            if profiler == CPROFILE:
+                profile_object = cProfile.Profile()
+                wall_begin, cpu_begin = perf_counter(), thread_time()
+                profile_object.runcall(search, graph, start, end)
+                wall_time, cpu_time = perf_counter() - wall_begin, thread_time() - cpu_begin
+                report = io.StringIO()
+                pstats.Stats(profile_object, stream=report).sort_stats('cumulative').print_stats(PROFILE_LINES)
+                profile = report.getvalue()
+            elif profiler == TRACEMALLOC and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                try:
+                    wall_begin, cpu_begin = perf_counter(), thread_time()
+                    search(graph, start, end)
+                    wall_time, cpu_time = perf_counter() - wall_begin, thread_time() - cpu_begin
+                    peak_memory = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+            else:
+                wall_begin, cpu_begin = perf_counter(), thread_time()
+                search(graph, start, end)
+                wall_time, cpu_time = perf_counter() - wall_begin, thread_time() - cpu_begin
+        finally:
+            graph._instrumenting = False
+
+        graph.search_stats = SearchStats(
+            algorithm=search.__name__,
+            nodes_expanded=graph.nodes_expanded,
+            pushes=graph.frontier_pushes,
+            pops=graph.frontier_pops,
+            stale_entries=graph.stale_entries,
+            peak_frontier=graph.peak_frontier,
+            path_length=len(graph.path_nodes) + (start != end) if graph.path_cost != inf else None,
+            path_cost=graph.path_cost,
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            interrupted=graph.search_interrupted,
+            suboptimality=graph.search_suboptimality,
+            peak_memory=peak_memory,
+            profile=profile,
+        )
+        return graph.search_stats
+    return wrapper
@@ -0,0 +1,11 @@
+import re
+
+# terrain codes stored in Graph.terrain, one byte per cell
+OPEN = 0
+BARRIER = 1
+FOREST = 2
+DESERT = 3
+# used to search terrain buffers without a find method, such as memoryviews of shared memory
+TERRAIN_PATTERNS = {code: re.compile(re.escape(bytes((code,)))) for code in (OPEN, BARRIER, FOREST, DESERT)}
+# maximal runs of passable cells
+PASSABLE_PATTERN = re.compile(b'[^' + re.escape(bytes((BARRIER,))) + b']+')